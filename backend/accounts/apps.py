@@ -4,3 +4,18 @@ from django.apps import AppConfig
 class AccountsConfig(AppConfig):
     default_auto_field = 'django.db.models.BigAutoField'
     name = 'accounts'
+
+    def ready(self):
+        from django.contrib.auth import get_user_model
+        from django.db.models.signals import post_delete, post_save
+
+        from . import authentication
+
+        # Any change to a user, password changes included, drops its cached copy
+        user_model = get_user_model()
+        post_save.connect(
+            authentication.invalidate_saved_user, sender=user_model, dispatch_uid='accounts.invalidate_saved_user'
+        )
+        post_delete.connect(
+            authentication.invalidate_saved_user, sender=user_model, dispatch_uid='accounts.invalidate_deleted_user'
+        )
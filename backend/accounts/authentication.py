@@ -0,0 +1,88 @@
+import uuid
+
+from django.conf import settings
+from django.core.cache import caches
+from django.db import transaction as db_transaction
+from django.utils.translation import gettext_lazy as _
+from rest_framework_simplejwt.authentication import JWTAuthentication
+from rest_framework_simplejwt.exceptions import AuthenticationFailed, InvalidToken
+from rest_framework_simplejwt.settings import api_settings
+from rest_framework_simplejwt.utils import get_md5_hash_password
+
+# Authenticated users are cached for AUTH_USER_CACHE_TIMEOUT seconds, so the
+# dashboard's bursts of API calls do not each load the same User row. Entry
+# keys embed the user's auth version, which is replaced whenever the user is
+# saved or deleted (password changes and profile updates included); the old
+# entries become unreachable at once. A per-process cache only sees the
+# changes its own process makes, so other workers may serve the previous
+# user until the TTL expires; use a shared backend (Redis) to avoid that.
+
+
+def get_cache():
+    return caches[settings.AUTH_CACHE_ALIAS]
+
+
+def _version_key(user_id):
+    return f"auth:version:{user_id}"
+
+
+def _user_key(user_id, version):
+    return f"auth:user:{user_id}:{version}"
+
+
+def get_auth_version(user_id):
+    """Return the user's current auth version, creating one if it was evicted"""
+    cache = get_cache()
+    version = cache.get(_version_key(user_id))
+    if version is None:
+        # Random rather than a counter, so an evicted version is never reused
+        version = uuid.uuid4().hex
+        if not cache.add(_version_key(user_id), version, timeout=None):
+            version = cache.get(_version_key(user_id), version)
+    return version
+
+
+def invalidate_user(user_id):
+    """
+    Drop the user's cached copy. Inside a transaction this waits for the
+    commit, so a request cannot re-cache the row as it was before the change.
+    """
+    def bump():
+        get_cache().set(_version_key(user_id), uuid.uuid4().hex, timeout=None)
+
+    db_transaction.on_commit(bump)
+
+
+def invalidate_saved_user(sender, instance, **kwargs):
+    """post_save/post_delete receiver for the user model"""
+    invalidate_user(instance.pk)
+
+
+class CachedJWTAuthentication(JWTAuthentication):
+    """
+    JWTAuthentication that resolves the token's user from the auth cache,
+    querying the database only on a miss
+    """
+
+    def get_user(self, validated_token):
+        try:
+            user_id = validated_token[api_settings.USER_ID_CLAIM]
+        except KeyError:
+            raise InvalidToken(_("Token contained no recognizable user identification"))
+
+        key = _user_key(user_id, get_auth_version(user_id))
+        cache = get_cache()
+        user = cache.get(key)
+        if user is None:
+            # Raises for unknown, inactive or revoked users, so those are never cached
+            user = super().get_user(validated_token)
+            cache.set(key, user)
+            return user
+
+        # The checks JWTAuthentication makes on a loaded user
+        if api_settings.CHECK_USER_IS_ACTIVE and not user.is_active:
+            raise AuthenticationFailed(_("User is inactive"), code="user_inactive")
+        if api_settings.CHECK_REVOKE_TOKEN:
+            if validated_token.get(api_settings.REVOKE_TOKEN_CLAIM) != get_md5_hash_password(user.password):
+                raise AuthenticationFailed(_("The user's password has been changed."), code="password_changed")
+        return user
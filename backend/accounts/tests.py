@@ -1,3 +1,59 @@
+from django.contrib.auth.models import User
+from django.db import connection
 from django.test import TestCase
+from django.test.utils import CaptureQueriesContext
+from rest_framework.test import APIClient
+from rest_framework_simplejwt.tokens import AccessToken
 
-# Create your tests here.
+from .authentication import get_cache
+
+
+class CachedJWTAuthenticationTests(TestCase):
+    """Authenticated requests load the user once, until the user changes"""
+
+    def setUp(self):
+        # Test databases reuse user ids, so no cached user may outlive its test
+        get_cache().clear()
+        self.user = User.objects.create_user('saver', password='first-Passw0rd', first_name='Sam')
+        self.client = APIClient()
+        self.client.credentials(HTTP_AUTHORIZATION=f"Bearer {AccessToken.for_user(self.user)}")
+
+    def get_profile(self):
+        with CaptureQueriesContext(connection) as captured:
+            response = self.client.get('/api/auth/profile/')
+        return response, len(captured)
+
+    def test_user_is_loaded_once(self):
+        response, queries = self.get_profile()
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(queries, 1)
+        response, queries = self.get_profile()
+        self.assertEqual(response.json()['username'], 'saver')
+        self.assertEqual(queries, 0)
+
+    def test_profile_update_invalidates(self):
+        self.get_profile()
+        with self.captureOnCommitCallbacks(execute=True):
+            response = self.client.put('/api/auth/profile/', {'first_name': 'Samantha'}, format='json')
+        self.assertEqual(response.status_code, 200)
+        response, queries = self.get_profile()
+        self.assertEqual(response.json()['first_name'], 'Samantha')
+        self.assertEqual(queries, 1)
+
+    def test_password_change_invalidates(self):
+        self.get_profile()
+        with self.captureOnCommitCallbacks(execute=True):
+            self.user.set_password('second-Passw0rd')
+            self.user.save()
+        self.assertEqual(self.get_profile()[1], 1)
+
+    def test_deactivated_and_deleted_users_are_refused(self):
+        self.get_profile()
+        with self.captureOnCommitCallbacks(execute=True):
+            self.user.is_active = False
+            self.user.save()
+        self.assertEqual(self.get_profile()[0].status_code, 401)
+
+        with self.captureOnCommitCallbacks(execute=True):
+            self.user.delete()
+        self.assertEqual(self.get_profile()[0].status_code, 401)
@@ -50,6 +50,7 @@ class UserProfileView(APIView):
         """
         serializer = UserSerializer(request.user, data=request.data, partial=True)
         if serializer.is_valid():
+            # Saving the user also drops its cached copy (accounts.authentication)
             serializer.save()
             return Response(serializer.data)
         return Response(serializer.errors, status=status.HTTP_400_BAD_REQUEST)
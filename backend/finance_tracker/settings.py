@@ -11,9 +11,12 @@ https://docs.djangoproject.com/en/5.2/ref/settings/
 """
 
 from pathlib import Path
+import importlib.util
 import os
 from datetime import timedelta
 from dotenv import load_dotenv
+from corsheaders.defaults import default_headers
+from django.core.exceptions import ImproperlyConfigured
 
 # Load environment variables from .env file
 load_dotenv(Path(Path(__file__).resolve().parent.parent, '.env'))
@@ -55,6 +58,10 @@ INSTALLED_APPS = [
 ]
 
 MIDDLEWARE = [
+    # First, so its timings cover every other middleware
+    'finances.middleware.RequestMetricsMiddleware',
+    # Before anything that reads the response body
+    'finances.middleware.CompressionMiddleware',
     'django.middleware.security.SecurityMiddleware',
     'django.contrib.sessions.middleware.SessionMiddleware',
     'corsheaders.middleware.CorsMiddleware',  # CORS middleware
@@ -63,6 +70,8 @@ MIDDLEWARE = [
     'django.contrib.auth.middleware.AuthenticationMiddleware',
     'django.contrib.messages.middleware.MessageMiddleware',
     'django.middleware.clickjacking.XFrameOptionsMiddleware',
+    # Keeps a user's reads on the primary database right after they write
+    'finances.middleware.PrimaryPinMiddleware',
 ]
 
 # CORS Settings
@@ -71,15 +80,23 @@ CORS_ALLOWED_ORIGINS = [
     "http://localhost:3000",  # React development server
     "null",                   # File system origin
 ]
+# Let the frontend revalidate reads with the ETag validators
+CORS_ALLOW_HEADERS = (*default_headers, 'if-none-match')
+CORS_EXPOSE_HEADERS = ['ETag']
 
 # REST Framework settings
 REST_FRAMEWORK = {
     'DEFAULT_AUTHENTICATION_CLASSES': (
-        'rest_framework_simplejwt.authentication.JWTAuthentication',
+        # JWTAuthentication with the user loaded from the 'auth' cache
+        'accounts.authentication.CachedJWTAuthentication',
     ),
     'DEFAULT_PERMISSION_CLASSES': [
         'rest_framework.permissions.IsAuthenticated',
     ],
+    'DEFAULT_RENDERER_CLASSES': [
+        'finances.renderers.TimedJSONRenderer',
+        'rest_framework.renderers.BrowsableAPIRenderer',
+    ],
 }
 
 # JWT settings
@@ -111,13 +128,112 @@ WSGI_APPLICATION = 'finance_tracker.wsgi.application'
 # Database
 # https://docs.djangoproject.com/en/5.2/ref/settings/#databases
 
-DATABASES = {
-    'default': {
-        'ENGINE': 'django.db.backends.sqlite3',
-        'NAME': BASE_DIR / 'db.sqlite3',
+# SQLite by default (at SQLITE_PATH, or db.sqlite3); set DB_ENGINE=postgresql (and the DB_* variables) in production.
+# CONN_MAX_AGE keeps connections open across requests instead of reconnecting
+# each time. DB_POOL=true uses Django's connection pool instead, which needs
+# psycopg 3 (pip install "psycopg[pool]"); behind PgBouncer in transaction mode set DB_DISABLE_SERVER_SIDE_CURSORS=true.
+
+DB_ENGINE = os.getenv('DB_ENGINE', 'sqlite')
+
+if DB_ENGINE == 'postgresql':
+    DATABASES = {
+        'default': {
+            'ENGINE': 'django.db.backends.postgresql',
+            'NAME': os.getenv('DB_NAME', 'finance_tracker'),
+            'USER': os.getenv('DB_USER', 'postgres'),
+            'PASSWORD': os.getenv('DB_PASSWORD', ''),
+            'HOST': os.getenv('DB_HOST', 'localhost'),
+            'PORT': os.getenv('DB_PORT', '5432'),
+            'CONN_MAX_AGE': int(os.getenv('DB_CONN_MAX_AGE', 60)),
+            'CONN_HEALTH_CHECKS': True,
+            'DISABLE_SERVER_SIDE_CURSORS': os.getenv('DB_DISABLE_SERVER_SIDE_CURSORS', 'false').lower() == 'true',
+            'OPTIONS': {
+                'connect_timeout': int(os.getenv('DB_CONNECT_TIMEOUT', 5)),
+            },
+        }
+    }
+    if os.getenv('DB_POOL', 'false').lower() == 'true':
+        # Django only pools with psycopg 3; fail here rather than on the first query
+        if not (importlib.util.find_spec('psycopg') and importlib.util.find_spec('psycopg_pool')):
+            raise ImproperlyConfigured('DB_POOL=true requires psycopg 3: pip install "psycopg[pool]"')
+        # Pooled connections replace persistent ones
+        DATABASES['default']['CONN_MAX_AGE'] = 0
+        DATABASES['default']['OPTIONS']['pool'] = {
+            'min_size': int(os.getenv('DB_POOL_MIN_SIZE', 2)),
+            'max_size': int(os.getenv('DB_POOL_MAX_SIZE', 10)),
+        }
+else:
+    DATABASES = {
+        'default': {
+            'ENGINE': 'django.db.backends.sqlite3',
+            'NAME': os.getenv('SQLITE_PATH', BASE_DIR / 'db.sqlite3'),
+        }
+    }
+
+# Optional read replica for the read-only endpoints (accounts, transactions,
+# analytics). Unset values fall back to the primary's, so a second local
+# instance only needs DB_REPLICA_PORT (or DB_REPLICA_NAME for SQLite).
+DATABASE_REPLICA_ALIAS = 'replica'
+if os.getenv('DB_REPLICA_HOST') or os.getenv('DB_REPLICA_PORT') or os.getenv('DB_REPLICA_NAME'):
+    DATABASES[DATABASE_REPLICA_ALIAS] = {
+        **DATABASES['default'],
+        'NAME': os.getenv('DB_REPLICA_NAME', DATABASES['default']['NAME']),
+        'HOST': os.getenv('DB_REPLICA_HOST', DATABASES['default'].get('HOST', '')),
+        'PORT': os.getenv('DB_REPLICA_PORT', DATABASES['default'].get('PORT', '')),
+        'USER': os.getenv('DB_REPLICA_USER', DATABASES['default'].get('USER', '')),
+        'PASSWORD': os.getenv('DB_REPLICA_PASSWORD', DATABASES['default'].get('PASSWORD', '')),
+        # Tests run against the primary only
+        'TEST': {'MIRROR': 'default'},
     }
+
+DATABASE_ROUTERS = ['finances.db_router.PrimaryReplicaRouter']
+
+# After a user's write, their reads stay on the primary this long (replication lag headroom)
+DATABASE_REPLICA_PIN_SECONDS = int(os.getenv('DB_REPLICA_PIN_SECONDS', 10))
+
+
+# Caches
+# https://docs.djangoproject.com/en/5.2/topics/cache/
+# The 'finances' cache holds per-user query results. Any Django backend works
+# (locmem, file, Redis); LocMemCache evicts least-recently-used entries once
+# MAX_ENTRIES is reached, and every entry expires after TIMEOUT seconds. The
+# per-user data versions that invalidate it live in the database, so results
+# cached by one process go stale when a job worker process changes the data.
+
+FINANCES_CACHE_ALIAS = 'finances'
+FINANCES_CACHE_BACKEND = os.getenv('FINANCES_CACHE_BACKEND', 'django.core.cache.backends.locmem.LocMemCache')
+
+# The 'auth' cache holds authenticated users for a short TTL (see
+# accounts/authentication.py); a shared backend invalidates across workers.
+AUTH_CACHE_ALIAS = 'auth'
+AUTH_CACHE_BACKEND = os.getenv('AUTH_CACHE_BACKEND', 'django.core.cache.backends.locmem.LocMemCache')
+
+CACHES = {
+    'default': {
+        'BACKEND': 'django.core.cache.backends.locmem.LocMemCache',
+    },
+    FINANCES_CACHE_ALIAS: {
+        'BACKEND': FINANCES_CACHE_BACKEND,
+        'LOCATION': os.getenv('FINANCES_CACHE_LOCATION', 'finances'),
+        'TIMEOUT': int(os.getenv('FINANCES_CACHE_TIMEOUT', 300)),
+    },
+    AUTH_CACHE_ALIAS: {
+        'BACKEND': AUTH_CACHE_BACKEND,
+        'LOCATION': os.getenv('AUTH_CACHE_LOCATION', 'auth'),
+        'TIMEOUT': int(os.getenv('AUTH_USER_CACHE_TIMEOUT', 60)),
+    },
 }
 
+# Redis manages its own size limit through maxmemory and maxmemory-policy allkeys-lru
+if not FINANCES_CACHE_BACKEND.endswith('RedisCache'):
+    CACHES[FINANCES_CACHE_ALIAS]['OPTIONS'] = {
+        'MAX_ENTRIES': int(os.getenv('FINANCES_CACHE_MAX_ENTRIES', 1000)),
+    }
+if not AUTH_CACHE_BACKEND.endswith('RedisCache'):
+    CACHES[AUTH_CACHE_ALIAS]['OPTIONS'] = {
+        'MAX_ENTRIES': int(os.getenv('AUTH_CACHE_MAX_ENTRIES', 10000)),
+    }
+
 
 # Password validation
 # https://docs.djangoproject.com/en/5.2/ref/settings/#auth-password-validators
@@ -164,3 +280,69 @@ DEFAULT_AUTO_FIELD = 'django.db.models.BigAutoField'
 PLAID_CLIENT_ID = os.getenv('PLAID_CLIENT_ID')
 PLAID_SECRET = os.getenv('PLAID_SECRET')
 PLAID_ENV = os.getenv('PLAID_ENV')
+# Overrides the host picked from PLAID_ENV (e.g. a local stub server)
+PLAID_API_HOST = os.getenv('PLAID_API_HOST')
+# Where PLAID_ENV=local finds the fake Plaid server (python manage.py run_fake_plaid)
+PLAID_LOCAL_URL = os.getenv('PLAID_LOCAL_URL', 'http://127.0.0.1:8765')
+
+# Shared Plaid client connection pool, timeouts (seconds) and retry policy
+PLAID_POOL_MAXSIZE = int(os.getenv('PLAID_POOL_MAXSIZE', 10))
+PLAID_CONNECT_TIMEOUT = float(os.getenv('PLAID_CONNECT_TIMEOUT', 5))
+PLAID_READ_TIMEOUT = float(os.getenv('PLAID_READ_TIMEOUT', 30))
+# Retries of connection failures, and of 429 responses (kept low: rate limited
+# jobs are rescheduled by the job queue's own backoff)
+PLAID_MAX_RETRIES = int(os.getenv('PLAID_MAX_RETRIES', 3))
+PLAID_RATE_LIMIT_RETRIES = int(os.getenv('PLAID_RATE_LIMIT_RETRIES', 1))
+PLAID_RETRY_BACKOFF = float(os.getenv('PLAID_RETRY_BACKOFF', 0.5))
+# WARNING: certificate verification was historically disabled; enable it in production
+PLAID_VERIFY_SSL = os.getenv('PLAID_VERIFY_SSL', 'false').lower() == 'true'
+
+# Number of rows written per INSERT ... ON CONFLICT batch during Plaid ingestion
+INGEST_BATCH_SIZE = int(os.getenv('INGEST_BATCH_SIZE', 1000))
+
+# Sample data served by /api/mock-transactions/ (see manage.py generate_mock_transactions)
+MOCK_TRANSACTIONS_FILE = os.getenv(
+    'MOCK_TRANSACTIONS_FILE',
+    str(BASE_DIR / 'transaction_data' / 'mock-transactions_4-24_4-25.json')
+)
+
+# Rows fetched per database round trip when streaming transaction exports
+EXPORT_CHUNK_SIZE = int(os.getenv('EXPORT_CHUNK_SIZE', 2000))
+
+# Unlinking deletes transactions this many rows at a time; accounts holding more
+# than the threshold are deleted by a background job instead of in the request
+UNLINK_CHUNK_SIZE = int(os.getenv('UNLINK_CHUNK_SIZE', 5000))
+UNLINK_ASYNC_THRESHOLD = int(os.getenv('UNLINK_ASYNC_THRESHOLD', 50000))
+
+# Responses of at least COMPRESSION_MIN_BYTES are sent Brotli- or gzip-compressed;
+# qualities favour speed, since every body is compressed per request
+COMPRESSION_MIN_BYTES = int(os.getenv('COMPRESSION_MIN_BYTES', 1024))
+BROTLI_QUALITY = int(os.getenv('BROTLI_QUALITY', 4))
+GZIP_LEVEL = int(os.getenv('GZIP_LEVEL', 6))
+
+# Serve link tokens and the accounts, transactions, analytics and mock data
+# reads with async views (finances/async_views.py). finance_tracker/asgi.py
+# turns this on; under WSGI each async view would need its own event loop.
+ASYNC_READ_VIEWS = os.getenv('ASYNC_READ_VIEWS', 'false').lower() == 'true'
+
+# Per-request DB/serialization/Plaid timings, aggregated at /metrics. Outside
+# DEBUG /metrics answers 404 unless METRICS_TOKEN is set, and then requires it
+# as a bearer token; Server-Timing headers are only sent under DEBUG unless
+# SERVER_TIMING_ENABLED says otherwise
+REQUEST_METRICS_ENABLED = os.getenv('REQUEST_METRICS_ENABLED', 'true').lower() == 'true'
+METRICS_TOKEN = os.getenv('METRICS_TOKEN')
+SERVER_TIMING_ENABLED = os.getenv('SERVER_TIMING_ENABLED', str(DEBUG)).lower() == 'true'
+
+# Background job runner (python manage.py run_jobs)
+JOB_MAX_ATTEMPTS = int(os.getenv('JOB_MAX_ATTEMPTS', 5))
+JOB_RETRY_BASE_SECONDS = float(os.getenv('JOB_RETRY_BASE_SECONDS', 2))
+JOB_RETRY_MAX_SECONDS = float(os.getenv('JOB_RETRY_MAX_SECONDS', 300))
+# A running job holds a lease its worker renews every JOB_HEARTBEAT_SECONDS;
+# jobs whose lease expired (the worker died) are returned to the queue
+JOB_LEASE_SECONDS = int(os.getenv('JOB_LEASE_SECONDS', 120))
+JOB_HEARTBEAT_SECONDS = float(os.getenv('JOB_HEARTBEAT_SECONDS', 30))
+
+# Institution metadata cache: serve rows younger than the TTL directly, refresh
+# older rows in the background until they exceed the max stale age
+INSTITUTION_TTL_SECONDS = int(os.getenv('INSTITUTION_TTL_SECONDS', 7 * 24 * 3600))
+INSTITUTION_MAX_STALE_SECONDS = int(os.getenv('INSTITUTION_MAX_STALE_SECONDS', 30 * 24 * 3600))
@@ -21,6 +21,7 @@ from rest_framework_simplejwt.views import (
     TokenRefreshView,
 )
 from accounts.views import RegisterView
+from finances.views import Metrics
 
 urlpatterns = [
     path('admin/', admin.site.urls),
@@ -33,4 +34,7 @@ urlpatterns = [
     
     # Finance and Plaid API URLs
     path('api/', include('finances.urls')),
+    
+    # Prometheus scrape target
+    path('metrics', Metrics.as_view(), name='metrics'),
 ]
@@ -0,0 +1,182 @@
+import datetime
+
+from django.db.models import DecimalField, F, Max, Min, Q, Sum, Value
+from django.db.models.functions import Coalesce, ExtractIsoWeekDay, TruncMonth, TruncWeek
+
+from .serializers import TransactionSerializer
+
+# Every series and total is aggregated from DailyRollup rows (one per account,
+# day and category), which hold income and expenses as absolute amounts, so a
+# multi-year range reads a few hundred rows instead of every transaction
+
+WEEKDAY_NAMES = ['Mon', 'Tue', 'Wed', 'Thu', 'Fri', 'Sat', 'Sun']
+
+ZERO = Value(0, output_field=DecimalField(max_digits=14, decimal_places=2))
+
+
+def _income_expense_totals():
+    """
+    Aggregate expressions for income, expenses and transaction count of a
+    bucket, aliased so they do not clash with the DailyRollup fields they sum
+    """
+    return {
+        'total_income': Coalesce(Sum('income'), ZERO),
+        'total_expenses': Coalesce(Sum('expenses'), ZERO),
+        'total_count': Coalesce(Sum('count'), 0),
+    }
+
+
+def _bucketed(rollups, bucket):
+    """Group rollups by the given expression and total each bucket"""
+    return (
+        rollups
+        .order_by()
+        .annotate(bucket=bucket)
+        .values('bucket')
+        .annotate(**_income_expense_totals())
+        .order_by('bucket')
+    )
+
+
+def monthly_series(rollups):
+    """Income and expenses per calendar month"""
+    return [
+        {
+            'month': row['bucket'].strftime('%Y-%m'),
+            'income': row['total_income'],
+            'expenses': row['total_expenses'],
+            'count': row['total_count'],
+        }
+        for row in _bucketed(rollups, TruncMonth('date'))
+    ]
+
+
+def weekly_series(rollups):
+    """Income and expenses per ISO week (weeks start on Monday)"""
+    series = []
+    for row in _bucketed(rollups, TruncWeek('date')):
+        iso_year, iso_week, _ = row['bucket'].isocalendar()
+        series.append({
+            'week': f"{iso_year}-W{iso_week:02d}",
+            'week_start': row['bucket'],
+            'income': row['total_income'],
+            'expenses': row['total_expenses'],
+            'count': row['total_count'],
+        })
+    return series
+
+
+def weekday_series(rollups):
+    """Income and expenses per day of the week, Monday first"""
+    return [
+        {
+            'day': WEEKDAY_NAMES[row['bucket'] - 1],
+            'income': row['total_income'],
+            'expenses': row['total_expenses'],
+            'count': row['total_count'],
+        }
+        for row in _bucketed(rollups, ExtractIsoWeekDay('date'))
+    ]
+
+
+def category_series(rollups):
+    """Absolute transaction volume per category, largest first"""
+    rows = (
+        rollups
+        .order_by()
+        .annotate(bucket=Coalesce('category', Value('Uncategorized')))
+        .values('bucket')
+        .annotate(total=Coalesce(Sum(F('income') + F('expenses')), ZERO), total_count=Sum('count'))
+        .order_by('-total')
+    )
+    return [
+        {
+            'category': row['bucket'],
+            'total': row['total'],
+            'count': row['total_count'],
+        }
+        for row in rows
+    ]
+
+
+def largest_transaction(rollups, transactions):
+    """
+    The transaction with the largest absolute amount. The rollup holding the
+    largest amount names its account, day and category, so only that day's
+    transactions are read rather than sorting every matching one.
+    """
+    rollup = (
+        rollups
+        .order_by('-largest_amount')
+        .values('account_id', 'date', 'category', 'largest_amount')
+        .first()
+    )
+    if rollup is None:
+        return None
+    amount = rollup['largest_amount']
+    return (
+        transactions
+        .filter(account_id=rollup['account_id'], date=rollup['date'], category=rollup['category'])
+        .filter(Q(amount=amount) | Q(amount=-amount))
+        .select_related('account__plaid_item__institution')
+        .first()
+    )
+
+
+def summary_totals(rollups, transactions, start_date=None, end_date=None):
+    """
+    Overall totals for the filtered rollups, including spending in the first
+    and second half of the date range for trend comparisons. The largest
+    transaction is read from the matching transactions queryset.
+    """
+    if start_date is None or end_date is None:
+        bounds = rollups.order_by().aggregate(
+            first=Min('date'), last=Max('date')
+        )
+        start_date = start_date or bounds['first']
+        end_date = end_date or bounds['last']
+
+    totals = _income_expense_totals()
+    if start_date and end_date:
+        midpoint = start_date + (end_date - start_date) / 2
+        totals['previous_period_spending'] = Coalesce(
+            Sum(F('income') + F('expenses'), filter=Q(date__lt=midpoint)), ZERO
+        )
+        totals['current_period_spending'] = Coalesce(
+            Sum(F('income') + F('expenses'), filter=Q(date__gte=midpoint)), ZERO
+        )
+    aggregates = rollups.order_by().aggregate(**totals)
+
+    count = aggregates.pop('total_count')
+    income = aggregates.pop('total_income')
+    expenses = aggregates.pop('total_expenses')
+    largest = largest_transaction(rollups, transactions)
+
+    return {
+        'total_transactions': count,
+        'total_inflow': income,
+        'total_outflow': expenses,
+        'net_cash_flow': income - expenses,
+        'average_transaction': (income + expenses) / count if count else 0,
+        'largest_transaction': TransactionSerializer(largest).data if largest else None,
+        'previous_period_spending': aggregates.get('previous_period_spending', 0),
+        'current_period_spending': aggregates.get('current_period_spending', 0),
+    }
+
+
+def build_summary(rollups, transactions, start_date=None, end_date=None):
+    """Build every aggregated analytics series from a DailyRollup queryset"""
+    return {
+        'monthly': monthly_series(rollups),
+        'weekly': weekly_series(rollups),
+        'weekday': weekday_series(rollups),
+        'categories': category_series(rollups),
+        'summary': summary_totals(rollups, transactions, start_date, end_date),
+    }
+
+
+def parse_date(value):
+    """Parse a YYYY-MM-DD query parameter, returning None when absent"""
+    if not value:
+        return None
+    return datetime.date.fromisoformat(value)
@@ -1,6 +1,15 @@
 from django.apps import AppConfig
+from django.conf import settings
 
 
 class FinancesConfig(AppConfig):
     default_auto_field = 'django.db.models.BigAutoField'
     name = 'finances'
+
+    def ready(self):
+        from django.db.backends.signals import connection_created
+
+        from . import metrics
+
+        if settings.REQUEST_METRICS_ENABLED:
+            connection_created.connect(metrics.install_query_timer, dispatch_uid='finances.install_query_timer')
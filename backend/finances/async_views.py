@@ -0,0 +1,270 @@
+import logging
+import traceback
+
+import plaid
+from asgiref.sync import sync_to_async
+from django.http import HttpResponse
+from django.shortcuts import aget_object_or_404
+from django.utils.cache import patch_vary_headers
+from django.views import View
+from rest_framework import exceptions, status
+from rest_framework.request import Request
+from rest_framework.response import Response
+from rest_framework.settings import api_settings
+from rest_framework.views import exception_handler
+
+from .models import PlaidItem, Account
+from .serializers import AccountSerializer, transaction_values, serialize_transactions
+from .plaid_client import get_plaid_client
+from .pagination import TransactionKeysetPagination
+from .mock_data import get_mock_dataset
+from .renderers import TimedJSONRenderer, ColumnarJSONRenderer, MessagePackRenderer
+from .views import etag_matches, filter_rollups, filter_transactions, search_transactions
+from . import analytics, cache, db_router, metrics, plaid_client
+
+# Async versions of the hot read endpoints and of link token creation, which
+# the ASGI deployment (finance_tracker/asgi.py sets ASYNC_READ_VIEWS) serves
+# in place of the REST framework views of the same names. The REST framework
+# has no async views, so these are Django async views that reuse its
+# authentication classes, exception handler and renderers together with the
+# same query builders, response cache and ETags; only the Browsable API is
+# left out. Queries go through Django's async ORM and Plaid calls through the
+# Plaid thread pool, so a worker's event loop keeps serving other requests
+# while one waits on the database or on Plaid.
+
+logger = logging.getLogger(__name__)
+
+
+class AsyncAPIView(View):
+    """
+    Base class of the async views: authenticates the request like an APIView
+    (every view requires a user), negotiates a renderer and returns handler
+    Responses to Django for rendering, off the event loop
+    """
+    authentication_classes = api_settings.DEFAULT_AUTHENTICATION_CLASSES
+    content_negotiation_class = api_settings.DEFAULT_CONTENT_NEGOTIATION_CLASS
+    renderer_classes = [TimedJSONRenderer]
+    # Serve the view's queries from the read replica, as ReplicaReadMixin does
+    replica_reads = True
+
+    async def dispatch(self, request, *args, **kwargs):
+        request = Request(
+            request,
+            authenticators=[auth() for auth in self.authentication_classes],
+            negotiator=self.content_negotiation_class(),
+        )
+        self.request = request
+        try:
+            request.accepted_renderer, request.accepted_media_type = self.perform_content_negotiation(request)
+            # Authentication may look the user up in the database
+            user = await sync_to_async(lambda: request.user)()
+            if not user or not user.is_authenticated:
+                raise exceptions.NotAuthenticated()
+
+            handler = None
+            if request.method.lower() in self.http_method_names:
+                handler = getattr(self, request.method.lower(), None)
+            if handler is None:
+                raise exceptions.MethodNotAllowed(request.method)
+
+            if self.replica_reads:
+                async with db_router.areading_from_replica(user.id):
+                    response = await handler(request, *args, **kwargs)
+            else:
+                response = await handler(request, *args, **kwargs)
+        except Exception as exc:
+            response = self.handle_exception(exc)
+        return self.finalize_response(request, response)
+
+    def perform_content_negotiation(self, request, force=False):
+        renderers = [renderer() for renderer in self.renderer_classes]
+        try:
+            return request.negotiator.select_renderer(request, renderers)
+        except Exception:
+            if force:
+                return renderers[0], renderers[0].media_type
+            raise
+
+    def handle_exception(self, exc):
+        """Turn REST framework exceptions and Http404 into error responses, as an APIView would"""
+        if isinstance(exc, (exceptions.NotAuthenticated, exceptions.AuthenticationFailed)):
+            # WWW-Authenticate header for 401 responses, else coerce to 403
+            authenticators = self.request.authenticators
+            auth_header = authenticators[0].authenticate_header(self.request) if authenticators else None
+            if auth_header:
+                exc.auth_header = auth_header
+            else:
+                exc.status_code = status.HTTP_403_FORBIDDEN
+
+        response = exception_handler(exc, {'view': self, 'request': self.request})
+        if response is None:
+            raise exc
+        response.exception = True
+        return response
+
+    def finalize_response(self, request, response):
+        if isinstance(response, Response):
+            if not getattr(request, 'accepted_renderer', None):
+                request.accepted_renderer, request.accepted_media_type = (
+                    self.perform_content_negotiation(request, force=True)
+                )
+            # Django renders the response in a worker thread, after the view returns
+            response.accepted_renderer = request.accepted_renderer
+            response.accepted_media_type = request.accepted_media_type
+            response.renderer_context = {'view': self, 'request': request}
+
+        response['Allow'] = ', '.join(self._allowed_methods())
+        if len(self.renderer_classes) > 1:
+            patch_vary_headers(response, ('Accept',))
+        return response
+
+
+async def conditional_response(request, namespace, params, build):
+    """views.conditional_response() for async views, awaiting the coroutine function build() on a miss"""
+    version = await sync_to_async(cache.get_data_version)(request.user.id)
+    etag = cache.etag(request.user.id, namespace, params, request.accepted_renderer.format, version)
+    # Browsers must revalidate each time, and shared caches must not store per-user data
+    headers = {'ETag': etag, 'Cache-Control': 'private, no-cache'}
+    if etag_matches(request.headers.get('If-None-Match'), etag):
+        return Response(status=status.HTTP_304_NOT_MODIFIED, headers=headers)
+    return Response(await cache.aget_or_build(request.user.id, namespace, params, build, version), headers=headers)
+
+
+class CreateLinkToken(AsyncAPIView):
+    replica_reads = False
+
+    async def get(self, request):
+        """
+        Create a link_token for Plaid Link's initialization
+        """
+        client = get_plaid_client()
+
+        try:
+            link_token_request = {
+                'user': {
+                    'client_user_id': str(request.user.id),
+                },
+                'products': ['transactions'],
+                'client_name': 'Finance Tracker',
+                'country_codes': ['US'],
+                'language': 'en'
+            }
+
+            logger.info(f"Creating link token with request: {link_token_request}")
+            response = await plaid_client.call_async(client.link_token_create, link_token_request)
+            logger.info("Link token created successfully")
+            return Response({'link_token': response['link_token']})
+        except plaid.ApiException as e:
+            logger.error(f"Plaid API Exception: {str(e)}")
+            return Response({'error': str(e)}, status=status.HTTP_400_BAD_REQUEST)
+        except Exception as e:
+            logger.error(f"Unexpected error: {str(e)}")
+            logger.error(traceback.format_exc())
+            return Response({'error': str(e)}, status=status.HTTP_500_INTERNAL_SERVER_ERROR)
+
+
+class AccountsList(AsyncAPIView):
+
+    async def get(self, request):
+        """Get all accounts for the authenticated user (supports If-None-Match)"""
+        async def build():
+            plaid_items = PlaidItem.objects.filter(user=request.user)
+            accounts = [
+                account async for account in
+                Account.objects.filter(plaid_item__in=plaid_items, unlinking=False)
+                .select_related('plaid_item__institution')
+            ]
+            with metrics.timing_serialization():
+                return AccountSerializer(accounts, many=True).data
+
+        return await conditional_response(request, 'accounts', {}, build)
+
+
+class TransactionsList(AsyncAPIView):
+    # Bulk reads can also be negotiated as columnar JSON or MessagePack
+    renderer_classes = [TimedJSONRenderer, ColumnarJSONRenderer, MessagePackRenderer]
+
+    async def get(self, request):
+        """
+        Get transactions for the authenticated user, with the same filters,
+        search, keyset pagination, conditional GET and formats as
+        views.TransactionsList
+        """
+        async def build():
+            transactions_query = transaction_values(search_transactions(filter_transactions(request), request))
+
+            paginator = TransactionKeysetPagination()
+            if paginator.is_requested(request):
+                page = await paginator.apaginate_queryset(transactions_query, request, view=self)
+                with metrics.timing_serialization():
+                    return paginator.get_paginated_response(serialize_transactions(page)).data
+
+            if request.query_params.get('q', '').strip():
+                transactions_query = transactions_query.order_by('-search_rank', '-date', '-id')
+            rows = [row async for row in transactions_query]
+            # A full history can take a while to serialize, so keep it off the event loop
+            with metrics.timing_serialization():
+                return await sync_to_async(serialize_transactions, thread_sensitive=False)(rows)
+
+        return await conditional_response(request, 'transactions', request.query_params, build)
+
+
+class AnalyticsSummary(AsyncAPIView):
+
+    async def get(self, request):
+        """
+        Get income/expense rollups by month, ISO week, weekday and category,
+        aggregated from the daily rollups with the same filters as TransactionsList
+        """
+        try:
+            start_date = analytics.parse_date(request.query_params.get('start_date'))
+            end_date = analytics.parse_date(request.query_params.get('end_date'))
+        except ValueError:
+            return Response(
+                {"error": "Dates must be formatted as YYYY-MM-DD"},
+                status=status.HTTP_400_BAD_REQUEST
+            )
+
+        async def build():
+            # The summary's handful of aggregate queries run back to back in
+            # one worker thread, as the async ORM would run each of them
+            return await sync_to_async(analytics.build_summary)(
+                filter_rollups(request), filter_transactions(request), start_date, end_date
+            )
+
+        return await conditional_response(request, 'analytics', request.query_params, build)
+
+
+class MockTransactions(AsyncAPIView):
+    replica_reads = False
+
+    async def get(self, request):
+        """Get mock transaction data from the sample file"""
+        account_id = request.query_params.get('account_id')
+
+        # Outside the try block, so an unknown account is a 404 rather than a 500
+        if account_id:
+            account = await aget_object_or_404(Account.objects.select_related('plaid_item'), id=account_id)
+            if account.plaid_item.user_id != request.user.id:
+                return Response(
+                    {"error": "You do not have permission to access this account"},
+                    status=status.HTTP_403_FORBIDDEN
+                )
+
+        try:
+            # Parsed once per process; the first load reads a large file, so not on the event loop
+            mock_data = await sync_to_async(get_mock_dataset, thread_sensitive=False)()
+            body = await sync_to_async(mock_data.render, thread_sensitive=False)(account_id or None)
+            return HttpResponse(body, content_type='application/json')
+        except FileNotFoundError:
+            return Response(
+                {"error": "Mock transaction data file not found"},
+                status=status.HTTP_404_NOT_FOUND
+            )
+        except Exception as e:
+            logger.error(f"Error fetching mock transactions: {str(e)}")
+            logger.error(traceback.format_exc())
+            return Response(
+                {"error": "Failed to fetch mock transactions"},
+                status=status.HTTP_500_INTERNAL_SERVER_ERROR
+            )
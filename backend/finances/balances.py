@@ -0,0 +1,156 @@
+import datetime
+import math
+
+from django.db.models import OuterRef, Subquery
+from django.utils import timezone
+
+from .models import Account, BalanceSnapshot
+
+# Balance history. upsert_accounts() appends a BalanceSnapshot whenever an
+# account's balance differs from its latest one, so a balance that holds
+# still costs no rows and each account's history is a step function. The
+# history endpoint samples it at the end of each daily, weekly or monthly
+# bucket, coarsening the buckets until the series fits in max_points.
+
+INTERVALS = ('daily', 'weekly', 'monthly')
+DEFAULT_MAX_POINTS = 400
+MAX_POINTS_LIMIT = 2000
+
+
+def latest_balances(account_ids, before=None):
+    """
+    The balance of each account's latest snapshot, taken before `before` if
+    given, keyed by account id (None for accounts without one), in one query
+    """
+    snapshots = BalanceSnapshot.objects.filter(account=OuterRef('pk'))
+    if before is not None:
+        snapshots = snapshots.filter(taken_at__lt=before)
+    latest = snapshots.order_by('-taken_at', '-id').values('balance')[:1]
+    return dict(
+        Account.objects.filter(pk__in=account_ids)
+        .annotate(latest_balance=Subquery(latest))
+        .values_list('pk', 'latest_balance')
+    )
+
+
+def record_snapshots(accounts, taken_at=None):
+    """
+    Append a snapshot for each account whose current_balance differs from its
+    latest snapshot, returning the number written
+    """
+    accounts = [account for account in accounts if account.current_balance is not None]
+    if not accounts:
+        return 0
+    latest = latest_balances([account.pk for account in accounts])
+    taken_at = taken_at or timezone.now()
+    snapshots = [
+        BalanceSnapshot(account=account, taken_at=taken_at, balance=account.current_balance)
+        for account in accounts
+        if latest.get(account.pk) != account.current_balance
+    ]
+    BalanceSnapshot.objects.bulk_create(snapshots)
+    return len(snapshots)
+
+
+def bucket_ends(start_date, end_date, interval):
+    """
+    The last day of each interval bucket from start_date to end_date, with
+    the final bucket cut short at end_date. Weeks end on Sunday (ISO weeks).
+    """
+    if interval == 'daily':
+        day, step = start_date, None
+    elif interval == 'weekly':
+        day, step = start_date + datetime.timedelta(days=6 - start_date.weekday()), None
+    else:
+        day, step = start_date, 'month'
+
+    ends = []
+    while day < end_date:
+        if step == 'month':
+            # The last day of day's month
+            following = (day.replace(day=1) + datetime.timedelta(days=32)).replace(day=1)
+            day = following - datetime.timedelta(days=1)
+            if day >= end_date:
+                break
+            ends.append(day)
+            day = following
+        else:
+            ends.append(day)
+            day += datetime.timedelta(days=1 if interval == 'daily' else 7)
+    ends.append(end_date)
+    return ends
+
+
+def downsample(start_date, end_date, interval, max_points):
+    """
+    Pick the bucket end dates for the series: the requested interval, or the
+    first coarser one with at most max_points buckets. When even monthly
+    buckets are too many, every n-th month is kept, always ending at end_date.
+    """
+    for candidate in INTERVALS[INTERVALS.index(interval):]:
+        ends = bucket_ends(start_date, end_date, candidate)
+        if len(ends) <= max_points:
+            return candidate, ends
+    step = math.ceil(len(ends) / max_points)
+    return candidate, ends[::-1][::step][::-1]
+
+
+def _start_of(day):
+    return timezone.make_aware(datetime.datetime.combine(day, datetime.time.min))
+
+
+def history(accounts, start_date, end_date, interval='daily', max_points=DEFAULT_MAX_POINTS):
+    """
+    Each account's balance at the end of every bucket between start_date and
+    end_date, and their total. Balances share one `dates` list; an account
+    has None for dates before its first snapshot, and the total adds up the
+    accounts with a known balance.
+    """
+    interval, ends = downsample(start_date, end_date, interval, max_points)
+    account_ids = [account.pk for account in accounts]
+    range_start = _start_of(start_date)
+    # A bucket holds the balance of the last snapshot taken before its end day is over
+    boundaries = [_start_of(day + datetime.timedelta(days=1)) for day in ends]
+
+    balances = latest_balances(account_ids, before=range_start)
+    snapshots = (
+        BalanceSnapshot.objects
+        .filter(account__in=account_ids, taken_at__gte=range_start, taken_at__lt=boundaries[-1])
+        .order_by('account', 'taken_at', 'id')
+        .values_list('account_id', 'taken_at', 'balance')
+    )
+    by_account = {account_id: [] for account_id in account_ids}
+    for account_id, taken_at, balance in snapshots:
+        by_account[account_id].append((taken_at, balance))
+
+    series = []
+    for account in accounts:
+        balance = balances.get(account.pk)
+        changes = by_account[account.pk]
+        position = 0
+        points = []
+        for boundary in boundaries:
+            while position < len(changes) and changes[position][0] < boundary:
+                balance = changes[position][1]
+                position += 1
+            points.append(balance)
+        series.append({
+            'id': account.pk,
+            'name': account.name,
+            'institution_name': account.plaid_item.institution_name,
+            'balances': points,
+        })
+
+    total = []
+    for index in range(len(ends)):
+        known = [entry['balances'][index] for entry in series if entry['balances'][index] is not None]
+        total.append(sum(known) if known else None)
+
+    return {
+        'interval': interval,
+        'start_date': start_date,
+        'end_date': end_date,
+        'dates': ends,
+        'accounts': series,
+        'total': total,
+    }
@@ -0,0 +1,95 @@
+import hashlib
+import uuid
+
+from asgiref.sync import sync_to_async
+from django.conf import settings
+from django.core.cache import caches
+from django.db import transaction as db_transaction
+
+from . import db_router
+from .models import DataVersion
+
+# Per-user query-result cache. Every entry key embeds the user's current data
+# version, so bumping the version makes all of that user's entries unreachable
+# at once; the cache backend's TTL and LRU culling then reclaim them. The
+# version itself is a DataVersion row rather than a cache entry: job workers
+# bump it from their own processes, and a process-local cache would keep
+# serving the web process's old version (and its ETags) forever.
+
+
+def get_cache():
+    return caches[settings.FINANCES_CACHE_ALIAS]
+
+
+def _new_version():
+    # A fresh random token rather than a counter, so a version row deleted
+    # with its user can never be recreated with a value that matches stale entries
+    return uuid.uuid4().hex
+
+
+def get_data_version(user_id):
+    """Return the user's current data version, creating one on first use"""
+    # Always the primary: a lagging replica would hand out the version from before a write
+    versions = DataVersion.objects.using('default')
+    version = versions.filter(user_id=user_id).values_list('version', flat=True).first()
+    if version is None:
+        version = versions.get_or_create(user_id=user_id, defaults={'version': _new_version()})[0].version
+    return version
+
+
+def bump_data_version(user_id):
+    """
+    Invalidate every cached result for the user. The new version is written
+    in the caller's transaction, so it becomes visible together with the data
+    it covers and readers never re-cache uncommitted data under it.
+    """
+    DataVersion.objects.update_or_create(user_id=user_id, defaults={'version': _new_version()})
+    # Results rebuilt under the new version must not come from a lagging replica
+    db_transaction.on_commit(lambda: db_router.pin_to_primary(user_id))
+
+
+def _params_hash(params):
+    encoded = '&'.join(f"{key}={value}" for key, value in sorted(params.items()))
+    return hashlib.md5(encoded.encode()).hexdigest()
+
+
+def _entry_key(user_id, namespace, params, version=None):
+    version = version or get_data_version(user_id)
+    return f"finances:{namespace}:{user_id}:{version}:{_params_hash(params)}"
+
+
+def etag(user_id, namespace, params, variant='', version=None):
+    """
+    A strong ETag for the result get_or_build() returns for the same
+    arguments, rendered as `variant` (e.g. the response format). It changes
+    whenever the user's data version does, so it is derived from the version
+    alone, without building or serializing the result. Pass the version when
+    the caller already read it.
+    """
+    tag = hashlib.md5(f"{_entry_key(user_id, namespace, params, version)}:{variant}".encode()).hexdigest()
+    return f'"{tag}"'
+
+
+def get_or_build(user_id, namespace, params, builder, version=None):
+    """
+    Return the cached result for (user, namespace, params) at the user's
+    current data version, calling builder() and caching its result on a miss
+    """
+    cache = get_cache()
+    key = _entry_key(user_id, namespace, params, version)
+    data = cache.get(key)
+    if data is None:
+        data = builder()
+        cache.set(key, data)
+    return data
+
+
+async def aget_or_build(user_id, namespace, params, builder, version=None):
+    """get_or_build() for async views, awaiting the coroutine function builder() on a miss"""
+    cache = get_cache()
+    key = await sync_to_async(_entry_key)(user_id, namespace, params, version)
+    data = await cache.aget(key)
+    if data is None:
+        data = await builder()
+        await cache.aset(key, data)
+    return data
@@ -0,0 +1,81 @@
+import contextlib
+import contextvars
+
+from asgiref.sync import sync_to_async
+from django.conf import settings
+from django.db import connections
+
+from . import cache
+
+# Reads go to the primary unless the current request opted in to the replica
+_replica_allowed = contextvars.ContextVar('replica_allowed', default=False)
+
+
+def replica_alias():
+    """The replica's database alias, or None when no replica is configured"""
+    alias = settings.DATABASE_REPLICA_ALIAS
+    return alias if alias in connections.settings else None
+
+
+def _pin_key(user_id):
+    return f"finances:primary:{user_id}"
+
+
+def pin_to_primary(user_id):
+    """
+    Send the user's reads to the primary for DATABASE_REPLICA_PIN_SECONDS, so
+    they never read data older than their own writes while the replica catches up
+    """
+    if replica_alias():
+        cache.get_cache().set(_pin_key(user_id), True, timeout=settings.DATABASE_REPLICA_PIN_SECONDS)
+
+
+def read_alias(user_id):
+    """The alias the user's read-only queries should use right now"""
+    alias = replica_alias()
+    if alias is None or cache.get_cache().get(_pin_key(user_id)):
+        return 'default'
+    return alias
+
+
+@contextlib.contextmanager
+def reading_from_replica(user_id):
+    """Route reads inside the block to the replica unless the user wrote recently"""
+    token = _replica_allowed.set(read_alias(user_id) != 'default')
+    try:
+        yield
+    finally:
+        _replica_allowed.reset(token)
+
+
+@contextlib.asynccontextmanager
+async def areading_from_replica(user_id):
+    """reading_from_replica() for async views; the async ORM's worker threads inherit the choice"""
+    token = _replica_allowed.set(await sync_to_async(read_alias)(user_id) != 'default')
+    try:
+        yield
+    finally:
+        _replica_allowed.reset(token)
+
+
+class PrimaryReplicaRouter:
+    """
+    Writes always go to the primary ('default'). Reads go to the replica only
+    inside reading_from_replica(), which read-only views opt into.
+    """
+
+    def db_for_read(self, model, **hints):
+        if _replica_allowed.get():
+            return replica_alias() or 'default'
+        return 'default'
+
+    def db_for_write(self, model, **hints):
+        return 'default'
+
+    def allow_relation(self, obj1, obj2, **hints):
+        # The replica holds the same rows as the primary
+        return True
+
+    def allow_migrate(self, db, app_label, model_name=None, **hints):
+        # The replica receives schema changes through replication
+        return db != settings.DATABASE_REPLICA_ALIAS
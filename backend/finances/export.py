@@ -0,0 +1,68 @@
+import csv
+import io
+import json
+import zlib
+
+from .serializers import TRANSACTION_VALUE_FIELDS, serialize_transaction_row
+
+# Column order for exports, matching the TransactionsList payload
+EXPORT_FIELDS = TRANSACTION_VALUE_FIELDS + ['account_name', 'institution_name']
+
+CSV = 'csv'
+NDJSON = 'ndjson'
+
+CONTENT_TYPES = {
+    CSV: 'text/csv; charset=utf-8',
+    NDJSON: 'application/x-ndjson',
+}
+
+
+def _grouped(rows, size):
+    """Yield lists of up to `size` rows so each write covers many rows"""
+    group = []
+    for row in rows:
+        group.append(row)
+        if len(group) >= size:
+            yield group
+            group = []
+    if group:
+        yield group
+
+
+def csv_lines(rows, chunk_size):
+    """Yield the CSV header, then one string per chunk of transaction_values() rows"""
+    buffer = io.StringIO()
+    writer = csv.writer(buffer)
+    writer.writerow(EXPORT_FIELDS)
+    yield buffer.getvalue()
+
+    for group in _grouped(rows, chunk_size):
+        buffer.seek(0)
+        buffer.truncate()
+        for row in group:
+            data = serialize_transaction_row(row)
+            writer.writerow([data[field] for field in EXPORT_FIELDS])
+        yield buffer.getvalue()
+
+
+def ndjson_lines(rows, chunk_size):
+    """Yield one string of newline-delimited JSON objects per chunk of rows"""
+    for group in _grouped(rows, chunk_size):
+        yield ''.join(json.dumps(serialize_transaction_row(row)) + '\n' for row in group)
+
+
+def gzipped(chunks):
+    """Compress a stream of strings into a gzip stream without buffering it"""
+    compressor = zlib.compressobj(wbits=16 + zlib.MAX_WBITS)
+    for chunk in chunks:
+        data = compressor.compress(chunk.encode())
+        if data:
+            yield data
+    yield compressor.flush()
+
+
+def export_stream(rows, export_format, chunk_size, gzip=False):
+    """Stream rows in the requested format, as bytes when gzip is requested"""
+    lines = csv_lines if export_format == CSV else ndjson_lines
+    chunks = lines(rows, chunk_size)
+    return gzipped(chunks) if gzip else chunks
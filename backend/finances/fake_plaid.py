@@ -0,0 +1,356 @@
+import datetime
+import hashlib
+import json
+import random
+import threading
+import time
+import uuid
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+from .synthetic import synthetic_transactions
+
+# A stand-in for the Plaid API, selected with PLAID_ENV=local. It speaks the
+# same JSON-over-POST protocol as Plaid, so the real plaid-python client (and
+# its pooling, timeouts and retries) is exercised unchanged. Items are derived
+# from their access token, so the server keeps no state that a restart loses.
+
+INSTITUTIONS = [
+    'Chase', 'Bank of America', 'Wells Fargo', 'Citi', 'Capital One',
+    'US Bank', 'PNC', 'Ally Bank', 'American Express', 'Discover',
+]
+
+ACCOUNT_TYPES = [
+    ('Everyday Checking', 'depository', 'checking'),
+    ('High Yield Savings', 'depository', 'savings'),
+    ('Rewards Credit Card', 'credit', 'credit card'),
+]
+
+MAX_SYNC_COUNT = 500
+MAX_GET_COUNT = 500
+
+
+class FakePlaidConfig:
+    """Data volume and fault injection for the fake Plaid server"""
+
+    def __init__(self, accounts_per_item=3, transactions_per_account=500, history_days=730,
+                 latency_ms=0.0, latency_jitter_ms=0.0, rate_limit_rate=0.0, changes_per_sync=0, seed=0):
+        self.accounts_per_item = accounts_per_item
+        self.transactions_per_account = transactions_per_account
+        self.history_days = history_days
+        # Once an item's history is synced, each further sync modifies and
+        # removes this many of its transactions
+        self.changes_per_sync = changes_per_sync
+        self.latency_ms = latency_ms
+        self.latency_jitter_ms = latency_jitter_ms
+        self.rate_limit_rate = rate_limit_rate
+        self.seed = seed
+
+
+class FakePlaidError(Exception):
+    def __init__(self, status, error_type, error_code, message):
+        super().__init__(message)
+        self.status = status
+        self.body = {
+            'error_type': error_type,
+            'error_code': error_code,
+            'error_message': message,
+            'display_message': None,
+        }
+
+
+def _request_id():
+    return uuid.uuid4().hex[:16]
+
+
+class FakePlaidData:
+    """Deterministic accounts and transactions for each fake item"""
+
+    def __init__(self, config):
+        self.config = config
+        self._transactions = {}
+        self._lock = threading.Lock()
+
+    def exchange_item_number(self, public_token):
+        """
+        The item a public token links: a hash of the token and the seed, so
+        the same token always names the same item, even after a restart,
+        and different tokens name different items
+        """
+        digest = hashlib.sha256(f"{self.config.seed}-{public_token}".encode()).digest()
+        return int.from_bytes(digest[:6], 'big')
+
+    def item_number(self, access_token):
+        prefix = 'access-local-'
+        if not access_token or not access_token.startswith(prefix) or not access_token[len(prefix):].isdigit():
+            raise FakePlaidError(400, 'INVALID_INPUT', 'INVALID_ACCESS_TOKEN', 'provided access token is in an invalid format')
+        return int(access_token[len(prefix):])
+
+    def institution_id(self, number):
+        return f"ins_local_{number % len(INSTITUTIONS)}"
+
+    def institution(self, institution_id):
+        prefix = 'ins_local_'
+        index = institution_id[len(prefix):] if institution_id and institution_id.startswith(prefix) else ''
+        if not index.isdigit() or int(index) >= len(INSTITUTIONS):
+            raise FakePlaidError(400, 'INVALID_INPUT', 'INVALID_INSTITUTION', 'invalid institution_id provided')
+        return {
+            'institution_id': institution_id,
+            'name': INSTITUTIONS[int(index)],
+            'products': ['transactions'],
+            'country_codes': ['US'],
+            'routing_numbers': [],
+            'oauth': False,
+            'url': f"https://www.{INSTITUTIONS[int(index)].lower().replace(' ', '')}.com",
+        }
+
+    def item(self, number):
+        return {
+            'item_id': f"local-item-{number}",
+            'institution_id': self.institution_id(number),
+            'webhook': None,
+            'error': None,
+            'available_products': [],
+            'billed_products': ['transactions'],
+            'consent_expiration_time': None,
+            'update_type': 'background',
+        }
+
+    def accounts(self, number):
+        accounts = []
+        for index in range(self.config.accounts_per_item):
+            name, account_type, subtype = ACCOUNT_TYPES[index % len(ACCOUNT_TYPES)]
+            balance = round(random.Random(f"{self.config.seed}-{number}-{index}").uniform(100, 25000), 2)
+            accounts.append({
+                'account_id': f"local-{number}-account-{index}",
+                'balances': {
+                    'available': balance,
+                    'current': balance,
+                    'limit': None,
+                    'iso_currency_code': 'USD',
+                    'unofficial_currency_code': None,
+                },
+                'mask': f"{1000 + index}",
+                'name': name,
+                'official_name': None,
+                'type': account_type,
+                'subtype': subtype,
+            })
+        return accounts
+
+    def transactions(self, number):
+        """All of an item's transactions, newest first, generated once per item"""
+        with self._lock:
+            cached = self._transactions.get(number)
+        if cached is not None:
+            return cached
+
+        account_ids = [account['account_id'] for account in self.accounts(number)]
+        count = self.config.transactions_per_account * len(account_ids)
+        transactions = []
+        for index, transaction in enumerate(synthetic_transactions(
+            count,
+            days=self.config.history_days,
+            seed=f"{self.config.seed}-{number}",
+            id_prefix=f"local-{number}-txn",
+        )):
+            transactions.append({
+                'account_id': account_ids[index % len(account_ids)],
+                'amount': transaction['amount'],
+                'iso_currency_code': 'USD',
+                'unofficial_currency_code': None,
+                'date': transaction['date'].isoformat(),
+                'pending': transaction['pending'],
+                'transaction_id': transaction['transaction_id'],
+                'name': transaction['name'],
+                'merchant_name': transaction['name'],
+                'category': transaction['category'],
+                'category_id': None,
+                'pending_transaction_id': None,
+                'account_owner': None,
+                'authorized_date': None,
+                'authorized_datetime': None,
+                'datetime': None,
+                'payment_channel': 'in store',
+                'transaction_code': None,
+            })
+
+        with self._lock:
+            return self._transactions.setdefault(number, transactions)
+
+
+class FakePlaidHandler(BaseHTTPRequestHandler):
+    protocol_version = 'HTTP/1.1'
+
+    def log_message(self, format, *args):
+        pass
+
+    def do_POST(self):
+        server = self.server
+        length = int(self.headers.get('Content-Length', 0))
+        try:
+            body = json.loads(self.rfile.read(length) or b'{}')
+        except ValueError:
+            body = {}
+
+        server.record_request(self.path)
+        config = server.config
+        delay = config.latency_ms + random.uniform(0, config.latency_jitter_ms)
+        if delay:
+            time.sleep(delay / 1000)
+
+        try:
+            if config.rate_limit_rate and random.random() < config.rate_limit_rate:
+                raise FakePlaidError(429, 'RATE_LIMIT_EXCEEDED', 'RATE_LIMIT_EXCEEDED', 'rate limit exceeded (injected)')
+            route = ROUTES.get(self.path)
+            if route is None:
+                raise FakePlaidError(404, 'INVALID_REQUEST', 'NOT_FOUND', f"unknown endpoint {self.path}")
+            status, payload = 200, route(server.data, body)
+        except FakePlaidError as e:
+            status, payload = e.status, e.body
+        payload['request_id'] = _request_id()
+
+        data = json.dumps(payload).encode()
+        self.send_response(status)
+        self.send_header('Content-Type', 'application/json')
+        self.send_header('Content-Length', str(len(data)))
+        self.end_headers()
+        self.wfile.write(data)
+
+
+def link_token_create(data, body):
+    expiration = datetime.datetime.now(datetime.timezone.utc) + datetime.timedelta(hours=4)
+    return {
+        'link_token': f"link-local-{uuid.uuid4()}",
+        'expiration': expiration.isoformat().replace('+00:00', 'Z'),
+    }
+
+
+def item_public_token_exchange(data, body):
+    # Any public token is accepted; each distinct token links its own item
+    if not body.get('public_token'):
+        raise FakePlaidError(400, 'INVALID_INPUT', 'INVALID_PUBLIC_TOKEN', 'public_token is required')
+    number = data.exchange_item_number(body['public_token'])
+    return {'access_token': f"access-local-{number}", 'item_id': f"local-item-{number}"}
+
+
+def item_get(data, body):
+    return {'item': data.item(data.item_number(body.get('access_token')))}
+
+
+def institutions_get_by_id(data, body):
+    return {'institution': data.institution(body.get('institution_id'))}
+
+
+def accounts_get(data, body):
+    number = data.item_number(body.get('access_token'))
+    return {'accounts': data.accounts(number), 'item': data.item(number)}
+
+
+def item_remove(data, body):
+    data.item_number(body.get('access_token'))
+    return {}
+
+
+def transactions_get(data, body):
+    number = data.item_number(body.get('access_token'))
+    options = body.get('options') or {}
+    start_date = body.get('start_date', '')
+    end_date = body.get('end_date', '9999-12-31')
+    matching = [t for t in data.transactions(number) if start_date <= t['date'] <= end_date]
+    offset = options.get('offset', 0)
+    count = min(options.get('count', 100), MAX_GET_COUNT)
+    return {
+        'accounts': data.accounts(number),
+        'transactions': matching[offset:offset + count],
+        'total_transactions': len(matching),
+        'item': data.item(number),
+    }
+
+
+def _changes(transactions, generation, count):
+    """
+    The transactions modified and removed by the generation-th sync after
+    the history: the next `count` of the history are posted with a new
+    amount and the `count` after them are removed, so no generation touches
+    a transaction an earlier one changed
+    """
+    start = generation * 2 * count
+    modified = [
+        {**transaction, 'amount': round(transaction['amount'] + 1, 2), 'pending': False}
+        for transaction in transactions[start:start + count]
+    ]
+    removed = [
+        {'transaction_id': transaction['transaction_id'], 'account_id': transaction['account_id']}
+        for transaction in transactions[start + count:start + 2 * count]
+    ]
+    return modified, removed
+
+
+def transactions_sync(data, body):
+    # The cursor is the offset into the item's history, followed, once the
+    # history is exhausted, by the number of change generations delivered
+    number = data.item_number(body.get('access_token'))
+    cursor = body.get('cursor') or 'local-0'
+    parts = cursor[len('local-'):].split('-') if cursor.startswith('local-') else []
+    if not 1 <= len(parts) <= 2 or not all(part.isdigit() for part in parts):
+        raise FakePlaidError(400, 'INVALID_INPUT', 'INVALID_CURSOR', 'cursor is invalid')
+    offset = int(parts[0])
+    count = min(body.get('count', 100), MAX_SYNC_COUNT)
+
+    transactions = data.transactions(number)
+    added = transactions[offset:offset + count]
+    next_offset = offset + len(added)
+    modified, removed = [], []
+    next_cursor = f"local-{next_offset}"
+    if not added and data.config.changes_per_sync:
+        generation = int(parts[1]) if len(parts) == 2 else 0
+        modified, removed = _changes(transactions, generation, data.config.changes_per_sync)
+        next_cursor = f"local-{next_offset}-{generation + 1}"
+    return {
+        'transactions_update_status': 'HISTORICAL_UPDATE_COMPLETE',
+        'accounts': data.accounts(number),
+        'added': added,
+        'modified': modified,
+        'removed': removed,
+        'next_cursor': next_cursor,
+        'has_more': next_offset < len(transactions),
+    }
+
+
+ROUTES = {
+    '/link/token/create': link_token_create,
+    '/item/public_token/exchange': item_public_token_exchange,
+    '/item/get': item_get,
+    '/item/remove': item_remove,
+    '/institutions/get_by_id': institutions_get_by_id,
+    '/accounts/get': accounts_get,
+    '/transactions/get': transactions_get,
+    '/transactions/sync': transactions_sync,
+}
+
+
+class FakePlaidServer(ThreadingHTTPServer):
+    daemon_threads = True
+
+    def __init__(self, address, config=None):
+        super().__init__(address, FakePlaidHandler)
+        self.config = config or FakePlaidConfig()
+        self.data = FakePlaidData(self.config)
+        self.request_counts = {}
+        self._counts_lock = threading.Lock()
+
+    @property
+    def url(self):
+        host, port = self.server_address[:2]
+        return f"http://{host}:{port}"
+
+    def record_request(self, path):
+        with self._counts_lock:
+            self.request_counts[path] = self.request_counts.get(path, 0) + 1
+
+
+def start_fake_plaid(config=None, host='127.0.0.1', port=0):
+    """Start a FakePlaidServer on a background thread and return it; call shutdown() to stop"""
+    server = FakePlaidServer((host, port), config)
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    return server
@@ -0,0 +1,163 @@
+from django.conf import settings
+from django.db import transaction as db_transaction
+
+from . import balances, recurring, rollups
+from .cache import bump_data_version
+from .models import Account, Transaction
+
+ACCOUNT_UPDATE_FIELDS = ['name', 'type', 'subtype', 'current_balance']
+TRANSACTION_UPDATE_FIELDS = ['amount', 'date', 'name', 'category', 'pending', 'merchant']
+
+
+def default_batch_size():
+    return settings.INGEST_BATCH_SIZE
+
+
+def _chunks(rows, size):
+    for start in range(0, len(rows), size):
+        yield rows[start:start + size]
+
+
+def account_fields(account_data):
+    """Map a Plaid account onto Account model fields"""
+    return {
+        'account_id': account_data['account_id'],
+        'name': account_data['name'],
+        'type': str(account_data['type']),
+        'subtype': str(account_data['subtype']) if account_data.get('subtype') else None,
+        'current_balance': account_data['balances']['current'],
+    }
+
+
+def transaction_fields(transaction):
+    """Map a Plaid transaction onto Transaction model fields"""
+    return {
+        'transaction_id': transaction['transaction_id'],
+        'amount': transaction['amount'],
+        'date': transaction['date'],
+        'name': transaction['name'],
+        'category': transaction['category'][0] if transaction.get('category') else 'Uncategorized',
+        'pending': transaction['pending'],
+        # Plaid's cleaned merchant name when it has one, else the raw description
+        'merchant': recurring.normalize_merchant(transaction.get('merchant_name') or transaction['name']),
+    }
+
+
+def upsert_accounts(plaid_item, accounts_data, batch_size=None):
+    """
+    Insert or update the item's accounts keyed on (plaid_item, account_id),
+    snapshot the balances that changed, and return every account of the item
+    keyed by Plaid account_id
+    """
+    batch_size = batch_size or default_batch_size()
+    accounts = [Account(plaid_item=plaid_item, **account_fields(data)) for data in accounts_data]
+    Account.objects.bulk_create(
+        accounts,
+        batch_size=batch_size,
+        update_conflicts=True,
+        unique_fields=['plaid_item', 'account_id'],
+        update_fields=ACCOUNT_UPDATE_FIELDS,
+    )
+    accounts = {account.account_id: account for account in Account.objects.filter(plaid_item=plaid_item)}
+    balances.record_snapshots(accounts.values())
+    bump_data_version(plaid_item.user_id)
+    return accounts
+
+
+def upsert_transactions(accounts, transactions, batch_size=None, touched_days=None, touched_merchants=None,
+                        inserted=None):
+    """
+    Insert or update transactions keyed on (account, transaction_id).
+    `accounts` maps Plaid account_id to Account; rows for unknown accounts
+    are skipped. Returns the number of rows written. Every (account_id, date)
+    a row moves from or to is added to the `touched_days` set, and every
+    merchant an updated row moves from or to to `touched_merchants`, if
+    given; rows that did not exist yet are appended to the `inserted` list.
+    """
+    batch_size = batch_size or default_batch_size()
+
+    # A row may appear more than once (added, then modified); keep the latest
+    # version, since one INSERT ... ON CONFLICT cannot touch a row twice
+    latest = {}
+    for transaction in transactions:
+        latest[(transaction['account_id'], transaction['transaction_id'])] = transaction
+
+    written = 0
+    for batch in _chunks(list(latest.values()), batch_size):
+        rows = []
+        for transaction in batch:
+            account = accounts.get(transaction['account_id'])
+            if account:
+                rows.append(Transaction(account=account, **transaction_fields(transaction)))
+        # A modified transaction may have moved day or merchant, so collect its old ones too
+        existing = Transaction.objects.filter(
+            account__in={row.account_id for row in rows},
+            transaction_id__in=[row.transaction_id for row in rows],
+        )
+        if touched_days is not None and rows:
+            touched_days |= rollups.touched_days(existing)
+            touched_days.update((row.account_id, row.date) for row in rows)
+        previous = {}
+        if (touched_merchants is not None or inserted is not None) and rows:
+            previous = {
+                (account_id, transaction_id): merchant
+                for account_id, transaction_id, merchant
+                in existing.order_by().values_list('account_id', 'transaction_id', 'merchant')
+            }
+        Transaction.objects.bulk_create(
+            rows,
+            update_conflicts=True,
+            unique_fields=['account', 'transaction_id'],
+            update_fields=TRANSACTION_UPDATE_FIELDS,
+        )
+        for row in rows:
+            merchant = previous.get((row.account_id, row.transaction_id))
+            if merchant is None:
+                if inserted is not None:
+                    inserted.append(row)
+            elif touched_merchants is not None:
+                touched_merchants.update((merchant, row.merchant))
+        written += len(rows)
+    return written
+
+
+def remove_transactions(plaid_item, transaction_ids, batch_size=None, touched_days=None, touched_merchants=None):
+    """
+    Delete the item's transactions with the given Plaid ids, batch_size ids
+    at a time, adding the (account_id, date) of each to `touched_days` and
+    its merchant to `touched_merchants` if given
+    """
+    batch_size = batch_size or default_batch_size()
+    removed = 0
+    for batch in _chunks(list(transaction_ids), batch_size):
+        queryset = Transaction.objects.filter(
+            account__plaid_item=plaid_item,
+            transaction_id__in=batch,
+        )
+        if touched_days is not None:
+            touched_days |= rollups.touched_days(queryset)
+        if touched_merchants is not None:
+            touched_merchants |= recurring.touched_merchants(queryset)
+        removed += queryset.delete()[0]
+    return removed
+
+
+def ingest_item(plaid_item, accounts_data=None, upserted=(), removed_ids=(), batch_size=None):
+    """
+    Write one item's accounts and transaction deltas, and refresh the daily
+    rollups of every day and the recurring charges of every merchant they
+    touched, inside a single atomic block, so a failure part-way through
+    leaves the item untouched
+    """
+    with db_transaction.atomic():
+        if accounts_data is not None:
+            accounts = upsert_accounts(plaid_item, accounts_data, batch_size)
+        else:
+            accounts = {account.account_id: account for account in Account.objects.filter(plaid_item=plaid_item)}
+        touched_days, touched_merchants, inserted = set(), set(), []
+        written = upsert_transactions(accounts, list(upserted), batch_size, touched_days, touched_merchants, inserted)
+        removed = remove_transactions(plaid_item, removed_ids, batch_size, touched_days, touched_merchants)
+        rollups.refresh_days(touched_days, batch_size)
+        recurring.refresh_merchants(plaid_item.user_id, touched_merchants, batch_size, added=inserted)
+        bump_data_version(plaid_item.user_id)
+    return written, removed
@@ -0,0 +1,102 @@
+import datetime
+import logging
+import threading
+
+import plaid
+from django.conf import settings
+from django.db import connection
+from django.utils import timezone
+
+from .models import Institution
+from .plaid_client import get_plaid_client, get_plaid_executor
+
+logger = logging.getLogger(__name__)
+
+# Institution ids with a refresh queued or running in this process
+_refreshing = set()
+_refreshing_lock = threading.Lock()
+
+
+def _fetch(client, institution_id):
+    """Fetch institution metadata from Plaid and store it"""
+    response = client.institutions_get_by_id({
+        'institution_id': institution_id,
+        'country_codes': ['US']
+    })
+    institution, _ = Institution.objects.update_or_create(
+        institution_id=institution_id,
+        defaults={
+            'name': response['institution']['name'],
+            'url': response['institution'].get('url') or '',
+            'fetched_at': timezone.now(),
+        },
+    )
+    return institution
+
+
+def _refresh(institution_id):
+    """Fetch one institution on a Plaid pool thread, then release its claim however the fetch ended"""
+    try:
+        _fetch(get_plaid_client(), institution_id)
+    except Exception:
+        logger.exception(f"Could not refresh institution {institution_id}")
+    finally:
+        with _refreshing_lock:
+            _refreshing.discard(institution_id)
+        # The pool thread opened its own database connection
+        connection.close()
+
+
+def _revalidate(institution_id):
+    """
+    Refresh one institution in the background. Single-flight: an id already
+    being refreshed is skipped, and so is every id while as many refreshes
+    are in flight as the Plaid pool has threads, so stale reads never queue
+    up more work than the pool can run.
+    """
+    with _refreshing_lock:
+        if institution_id in _refreshing or len(_refreshing) >= settings.PLAID_POOL_MAXSIZE:
+            return
+        _refreshing.add(institution_id)
+
+    submitted = False
+    try:
+        get_plaid_executor().submit(_refresh, institution_id)
+        submitted = True
+    finally:
+        if not submitted:
+            with _refreshing_lock:
+                _refreshing.discard(institution_id)
+
+
+def get_institution(institution_id, client=None):
+    """
+    Return the Institution for a Plaid institution_id, calling Plaid only
+    when needed:
+
+    - fresh (younger than INSTITUTION_TTL_SECONDS): served from the table
+    - stale but within INSTITUTION_MAX_STALE_SECONDS: served from the table
+      while a background refresh runs (stale-while-revalidate)
+    - missing or older than that: fetched synchronously, falling back to the
+      stale row if Plaid is unavailable
+    """
+    institution = Institution.objects.filter(institution_id=institution_id).first()
+    if institution is not None and institution.fetched_at is None:
+        # Legacy rows carry synthetic ids that Plaid cannot resolve
+        return institution
+
+    if institution is not None:
+        age = timezone.now() - institution.fetched_at
+        if age <= datetime.timedelta(seconds=settings.INSTITUTION_TTL_SECONDS):
+            return institution
+        if age <= datetime.timedelta(seconds=settings.INSTITUTION_MAX_STALE_SECONDS):
+            _revalidate(institution_id)
+            return institution
+
+    try:
+        return _fetch(client or get_plaid_client(), institution_id)
+    except plaid.ApiException:
+        if institution is None:
+            raise
+        logger.warning(f"Serving stale institution {institution_id} after refresh failed")
+        return institution
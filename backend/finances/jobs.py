@@ -0,0 +1,249 @@
+import datetime
+import logging
+import random
+import threading
+import traceback
+
+import plaid
+from django.conf import settings
+from django.db import connection
+from django.db.models import F, Q
+from django.utils import timezone
+
+from . import unlink
+from .ingestion import upsert_accounts
+from .institutions import get_institution
+from .models import Job
+from .plaid_client import get_plaid_client
+from .sync import sync_item
+
+logger = logging.getLogger(__name__)
+
+IMPORT_ITEM = 'import_item'
+UNLINK_ACCOUNTS = 'unlink_accounts'
+REMOVE_ITEM = 'remove_item'
+
+# Plaid errors meaning the item is already gone upstream
+ITEM_GONE_ERRORS = ('ITEM_NOT_FOUND', 'INVALID_ACCESS_TOKEN')
+
+
+class RetryableError(Exception):
+    """Raised by a handler when the job should be retried later"""
+
+
+def is_rate_limited(error):
+    """True when a Plaid error asks us to slow down"""
+    return error.status == 429 or 'RATE_LIMIT_EXCEEDED' in str(error.body)
+
+
+def import_item(job):
+    """
+    Fetch institution metadata, accounts and the full transaction history
+    for a freshly linked PlaidItem
+    """
+    plaid_item = job.plaid_item
+    client = get_plaid_client()
+
+    try:
+        if plaid_item.institution_id is None:
+            item_response = client.item_get({'access_token': plaid_item.access_token})
+            # Usually served from the Institution table without calling Plaid
+            plaid_item.institution = get_institution(item_response['item']['institution_id'], client)
+            plaid_item.save(update_fields=['institution'])
+
+        accounts_response = client.accounts_get({'access_token': plaid_item.access_token})
+        accounts = upsert_accounts(plaid_item, accounts_response['accounts'])
+        sync_result = sync_item(plaid_item, client)
+    except plaid.ApiException as e:
+        if is_rate_limited(e):
+            raise RetryableError(str(e)) from e
+        raise
+
+    return {
+        'institution_name': plaid_item.institution_name,
+        'accounts': len(accounts),
+        'transactions': sync_result.as_dict(),
+    }
+
+
+def unlink_accounts(job):
+    """Delete accounts that were too large to unlink inside the request"""
+    if job.plaid_item is None:
+        # The item, and with it every account, is already gone
+        return {'accounts': 0, 'transactions': 0, 'item_removed': True}
+    result = unlink.unlink_accounts(job.plaid_item, job.params['account_ids'])
+    if result['item_removed']:
+        # The row is gone (the database already set this job's reference to null)
+        job.plaid_item = None
+    return result
+
+
+def remove_item(job):
+    """Tell Plaid to remove an unlinked item so it stops accruing upstream"""
+    try:
+        get_plaid_client().item_remove({'access_token': job.params['access_token']})
+    except plaid.ApiException as e:
+        if is_rate_limited(e):
+            raise RetryableError(str(e)) from e
+        if not any(code in str(e.body) for code in ITEM_GONE_ERRORS):
+            raise
+    return {'item_id': job.params['item_id']}
+
+
+HANDLERS = {
+    IMPORT_ITEM: import_item,
+    UNLINK_ACCOUNTS: unlink_accounts,
+    REMOVE_ITEM: remove_item,
+}
+
+
+def enqueue(kind, user, plaid_item=None, params=None):
+    """Queue a job of the given kind to run as soon as a worker is free"""
+    if kind not in HANDLERS:
+        raise ValueError(f"Unknown job kind: {kind}")
+    return Job.objects.create(kind=kind, user=user, plaid_item=plaid_item, params=params or {})
+
+
+def retry_delay(attempts):
+    """Exponential backoff with jitter: base * 2^(attempts - 1), capped"""
+    delay = settings.JOB_RETRY_BASE_SECONDS * 2 ** (attempts - 1)
+    delay = min(delay, settings.JOB_RETRY_MAX_SECONDS)
+    return delay * random.uniform(0.5, 1.0)
+
+
+def claim_next_job(worker_id):
+    """
+    Atomically move the oldest due job from queued to running. The claim is a
+    conditional UPDATE, so two workers can never take the same job, on SQLite
+    as well as PostgreSQL. The claim holds a lease that the worker renews
+    while the job runs (see Heartbeat).
+    """
+    now = timezone.now()
+    candidates = (
+        Job.objects
+        .filter(status=Job.QUEUED, run_after__lte=now)
+        .order_by('run_after', 'id')
+        .values_list('id', flat=True)[:10]
+    )
+    for job_id in candidates:
+        claimed = Job.objects.filter(id=job_id, status=Job.QUEUED).update(
+            status=Job.RUNNING,
+            locked_by=worker_id,
+            attempts=F('attempts') + 1,
+            lease_expires_at=now + datetime.timedelta(seconds=settings.JOB_LEASE_SECONDS),
+            updated_at=now,
+        )
+        if claimed:
+            return Job.objects.select_related('plaid_item__institution', 'user').get(id=job_id)
+    return None
+
+
+def renew_lease(job):
+    """Extend a running job's lease; False when the worker no longer holds it"""
+    now = timezone.now()
+    return bool(Job.objects.filter(id=job.id, status=Job.RUNNING, locked_by=job.locked_by).update(
+        lease_expires_at=now + datetime.timedelta(seconds=settings.JOB_LEASE_SECONDS),
+        updated_at=now,
+    ))
+
+
+class Heartbeat:
+    """
+    Renews a job's lease every JOB_HEARTBEAT_SECONDS from a background thread
+    for as long as the block runs, so requeue_stale_jobs never takes a job
+    from a live worker however long the import or unlink lasts
+    """
+
+    def __init__(self, job):
+        self.job = job
+        self._stopped = threading.Event()
+        self._thread = threading.Thread(target=self._beat, name=f'job-{job.id}-heartbeat', daemon=True)
+
+    def __enter__(self):
+        self._thread.start()
+        return self
+
+    def __exit__(self, *exc_info):
+        self._stopped.set()
+        self._thread.join()
+
+    def _beat(self):
+        try:
+            while not self._stopped.wait(settings.JOB_HEARTBEAT_SECONDS):
+                try:
+                    if not renew_lease(self.job):
+                        logger.warning(f"Job {self.job.id} lost its lease")
+                        return
+                except Exception as e:
+                    # A busy database only delays the next beat
+                    logger.warning(f"Job {self.job.id} heartbeat failed: {e}")
+        finally:
+            # The thread has its own database connection
+            connection.close()
+
+
+def run_job(job):
+    """Run one claimed job, recording success, scheduling a retry or marking it failed"""
+    handler = HANDLERS[job.kind]
+    try:
+        # Handlers manage their own atomic blocks so no database transaction
+        # stays open while they wait on Plaid
+        with Heartbeat(job):
+            result = handler(job)
+    except RetryableError as e:
+        if job.attempts >= settings.JOB_MAX_ATTEMPTS:
+            _finish(job, Job.FAILED, error=str(e))
+            return job
+        delay = retry_delay(job.attempts)
+        logger.warning(f"Job {job.id} rate limited, retrying in {delay:.1f}s: {e}")
+        job.status = Job.QUEUED
+        job.run_after = timezone.now() + datetime.timedelta(seconds=delay)
+        job.last_error = str(e)
+        job.locked_by = ''
+        job.lease_expires_at = None
+        job.save(update_fields=['status', 'run_after', 'last_error', 'locked_by', 'lease_expires_at', 'updated_at'])
+        return job
+    except Exception as e:
+        logger.error(f"Job {job.id} failed: {str(e)}")
+        logger.error(traceback.format_exc())
+        _finish(job, Job.FAILED, error=str(e))
+        return job
+
+    _finish(job, Job.SUCCEEDED, result=result)
+    return job
+
+
+def _finish(job, status, result=None, error=''):
+    job.status = status
+    job.result = result
+    job.last_error = error
+    job.locked_by = ''
+    job.lease_expires_at = None
+    job.save(update_fields=['status', 'result', 'last_error', 'locked_by', 'lease_expires_at', 'updated_at'])
+
+
+def requeue_stale_jobs():
+    """
+    Return jobs whose worker died mid-run to the queue. Live workers keep
+    renewing their leases, so only jobs whose lease expired are taken back.
+    """
+    now = timezone.now()
+    expired = Q(lease_expires_at__lt=now) | Q(lease_expires_at__isnull=True)
+    return Job.objects.filter(expired, status=Job.RUNNING).update(
+        status=Job.QUEUED,
+        locked_by='',
+        lease_expires_at=None,
+        run_after=now,
+    )
+
+
+def run_pending(worker_id, limit=None):
+    """Run due jobs until the queue is empty (or `limit` jobs ran); returns the count"""
+    count = 0
+    while limit is None or count < limit:
+        job = claim_next_job(worker_id)
+        if job is None:
+            break
+        run_job(job)
+        count += 1
+    return count
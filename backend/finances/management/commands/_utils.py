@@ -0,0 +1,13 @@
+from django.contrib.auth.models import User
+from django.core.management.base import CommandError
+
+
+def get_user(lookup):
+    """The user named by a --user option, given as a username or an id"""
+    users = User.objects.filter(username=lookup)
+    if lookup.isdigit():
+        users = users | User.objects.filter(id=int(lookup))
+    user = users.first()
+    if user is None:
+        raise CommandError(f"User '{lookup}' does not exist")
+    return user
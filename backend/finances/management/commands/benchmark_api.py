@@ -0,0 +1,302 @@
+import datetime
+import io
+import json
+import math
+import os
+import tempfile
+import time
+import tracemalloc
+
+from django.contrib.auth.models import User
+from django.core.management import call_command
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connection, reset_queries, transaction as db_transaction
+from django.test import override_settings
+from django.test.utils import CaptureQueriesContext
+from rest_framework.settings import api_settings
+from rest_framework.test import APIClient
+from rest_framework_simplejwt.tokens import AccessToken
+
+from accounts.authentication import get_cache as get_auth_cache
+from finances.cache import get_cache, get_data_version
+from finances.mock_data import reset_mock_dataset
+from finances.models import Account, Institution, PlaidItem, Transaction
+from finances.recurring import normalize_merchant, refresh_merchants
+from finances.rollups import rebuild
+from finances.synthetic import synthetic_transactions
+
+# Metrics compared against a baseline, and how much each may grow before it
+# counts as a regression (latency is noisy, query counts should not move)
+COMPARED_METRICS = {
+    'p95_ms': 'tolerance',
+    'queries': 0,
+    'peak_memory_kb': 'tolerance',
+}
+
+
+class Rollback(Exception):
+    """Raised to discard the seeded rows once every scenario has run"""
+
+
+def percentile(values, percent):
+    """Nearest-rank percentile of a list of numbers"""
+    ordered = sorted(values)
+    rank = max(1, math.ceil(percent / 100 * len(ordered)))
+    return ordered[rank - 1]
+
+
+def seed_user(rows, items, accounts_per_item, batch_size=10_000):
+    """Create a benchmark user owning `rows` transactions spread over items x accounts"""
+    user = User.objects.create(username=f"api-benchmark-{rows}")
+    institution, _ = Institution.objects.get_or_create(
+        institution_id='ins_benchmark',
+        defaults={'name': 'Benchmark Bank'},
+    )
+    plaid_items = PlaidItem.objects.bulk_create([
+        PlaidItem(user=user, item_id=f"bench-{rows}-item-{index}", access_token='bench-token', institution=institution)
+        for index in range(items)
+    ])
+    accounts = Account.objects.bulk_create([
+        Account(
+            plaid_item=plaid_item,
+            account_id=f"bench-{plaid_item.id}-account-{index}",
+            name=f"Account {index}",
+            type='depository',
+            subtype='checking',
+            current_balance=1000,
+        )
+        for plaid_item in plaid_items
+        for index in range(accounts_per_item)
+    ])
+
+    # About three transactions a day, over one to ten years of history
+    days = min(3650, max(365, rows // 3))
+    batch = []
+    for index, transaction in enumerate(synthetic_transactions(rows, days=days, seed=rows, id_prefix='bench')):
+        batch.append(Transaction(
+            account=accounts[index % len(accounts)],
+            transaction_id=transaction['transaction_id'],
+            date=transaction['date'],
+            name=transaction['name'],
+            amount=transaction['amount'],
+            category=transaction['category'][0],
+            pending=transaction['pending'],
+            merchant=normalize_merchant(transaction['name']),
+        ))
+        if len(batch) >= batch_size:
+            Transaction.objects.bulk_create(batch)
+            batch = []
+    if batch:
+        Transaction.objects.bulk_create(batch)
+    rebuild(accounts)
+    refresh_merchants(user.id)
+    # Created outside the per-request savepoints, so warm requests find it
+    get_data_version(user.id)
+    return user, accounts
+
+
+class Command(BaseCommand):
+    help = "Benchmark the API endpoints against seeded datasets and report latency, queries and memory as JSON"
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--rows',
+            type=int,
+            nargs='+',
+            default=[1_000, 100_000],
+            help="Transaction counts to seed, one benchmark run each (default: 1000 100000)",
+        )
+        parser.add_argument('--items', type=int, default=2, help="Plaid items per benchmark user")
+        parser.add_argument('--accounts', type=int, default=2, help="Accounts per item")
+        parser.add_argument('--iterations', type=int, default=20, help="Timed requests per scenario")
+        parser.add_argument('--output', help="Also write the JSON report to this file")
+        parser.add_argument('--baseline', help="Compare against a previously saved report")
+        parser.add_argument(
+            '--tolerance',
+            type=float,
+            default=0.2,
+            help="Allowed growth in p95 latency and peak memory before flagging a regression (default: 0.2)",
+        )
+
+    def handle(self, *args, **options):
+        report = {
+            'meta': {
+                'created_at': datetime.datetime.now(datetime.timezone.utc).isoformat(),
+                'database': connection.vendor,
+                'items': options['items'],
+                'accounts_per_item': options['accounts'],
+                'iterations': options['iterations'],
+                # Query counts depend on whether the user lookup is cached
+                'authentication': [
+                    f"{auth.__module__}.{auth.__qualname__}" for auth in api_settings.DEFAULT_AUTHENTICATION_CLASSES
+                ],
+            },
+            'results': {},
+            # Cost of RequestMetricsMiddleware on the cheapest request, per dataset
+            'metrics_overhead': {},
+        }
+
+        for rows in options['rows']:
+            try:
+                with db_transaction.atomic():
+                    started = time.perf_counter()
+                    user, accounts = seed_user(rows, options['items'], options['accounts'])
+                    # Users seeded by earlier runs were rolled back, so their ids are reused
+                    get_auth_cache().clear()
+                    self.stderr.write(f"Seeded {rows} rows in {time.perf_counter() - started:.1f}s")
+                    report['results'][str(rows)] = self._run_scenarios(user, accounts, rows, options['iterations'])
+                    report['metrics_overhead'][str(rows)] = self._metrics_overhead(user, options['iterations'])
+                    raise Rollback
+            except Rollback:
+                pass
+
+        output = json.dumps(report, indent=2)
+        self.stdout.write(output)
+        if options['output']:
+            with open(options['output'], 'w') as f:
+                f.write(output + '\n')
+
+        if options['baseline']:
+            with open(options['baseline']) as f:
+                baseline = json.load(f)
+            regressions = self._compare(baseline, report, options['tolerance'])
+            if regressions:
+                for regression in regressions:
+                    self.stderr.write(regression)
+                raise CommandError(f"{len(regressions)} regressions against {options['baseline']}")
+            self.stderr.write(self.style.SUCCESS(f"No regressions against {options['baseline']}"))
+
+    def _run_scenarios(self, user, accounts, rows, iterations):
+        client = APIClient()
+        client.credentials(HTTP_AUTHORIZATION=f"Bearer {AccessToken.for_user(user)}")
+        account = accounts[0]
+        end_date = datetime.date.today()
+        last_quarter = {
+            'start_date': (end_date - datetime.timedelta(days=90)).isoformat(),
+            'end_date': end_date.isoformat(),
+        }
+
+        mock_file = tempfile.NamedTemporaryFile(suffix='.json', delete=False)
+        mock_file.close()
+        call_command('generate_mock_transactions', rows=rows, output=mock_file.name, stdout=io.StringIO())
+
+        # (name, method, url, params, serve from a warm response cache)
+        scenarios = [
+            ('accounts', 'get', '/api/accounts/', {}, False),
+            ('accounts_cached', 'get', '/api/accounts/', {}, True),
+            ('transactions', 'get', '/api/transactions/', {}, False),
+            ('transactions_cached', 'get', '/api/transactions/', {}, True),
+            ('transactions_last_quarter', 'get', '/api/transactions/', last_quarter, False),
+            ('transactions_page', 'get', '/api/transactions/', {'limit': 100}, False),
+            ('transactions_search', 'get', '/api/transactions/', {'q': 'starbucks'}, False),
+            ('analytics_summary', 'get', '/api/analytics/summary/', {}, False),
+            ('recurring_charges', 'get', '/api/recurring/', {}, False),
+            ('mock_transactions', 'get', '/api/mock-transactions/', {}, True),
+            ('unlink_account', 'delete', f"/api/accounts/{account.id}/unlink/", {}, False),
+            ('unlink_all_accounts', 'delete', '/api/accounts/unlink-all/', {}, False),
+        ]
+
+        results = {}
+        try:
+            with override_settings(MOCK_TRANSACTIONS_FILE=mock_file.name):
+                reset_mock_dataset()
+                for name, method, url, params, warm in scenarios:
+                    results[name] = self._measure(client, method, url, params, warm, iterations)
+                    self.stderr.write(f"  {rows:>9} rows  {name:<26} p95 {results[name]['p95_ms']:>10.2f} ms")
+        finally:
+            reset_mock_dataset()
+            os.remove(mock_file.name)
+        return results
+
+    def _request(self, client, method, url, params, warm, traced=False):
+        """
+        Issue one request inside a savepoint, so destructive endpoints can be
+        repeated. Traced requests also count queries and peak Python memory;
+        tracing slows Python down, so latency is only taken from untraced runs.
+        """
+        if not warm:
+            get_cache().clear()
+        savepoint = db_transaction.savepoint()
+        try:
+            if traced:
+                # The DEBUG query log is a bounded deque; once full, counting would read zero
+                reset_queries()
+                tracemalloc.start()
+            with CaptureQueriesContext(connection) as captured:
+                started = time.perf_counter()
+                response = getattr(client, method)(url, params)
+                content = b''.join(response.streaming_content) if response.streaming else response.content
+                seconds = time.perf_counter() - started
+            peak = tracemalloc.get_traced_memory()[1] if traced else None
+            return {
+                'status': response.status_code,
+                'bytes': len(content),
+                'seconds': seconds,
+                'queries': len(captured),
+                'peak': peak,
+            }
+        finally:
+            if traced:
+                tracemalloc.stop()
+            db_transaction.savepoint_rollback(savepoint)
+
+    def _measure(self, client, method, url, params, warm, iterations):
+        if warm:
+            # Prime the cache so every timed request is a hit
+            self._request(client, method, url, params, warm=False)
+
+        traced = self._request(client, method, url, params, warm, traced=True)
+        timings = [self._request(client, method, url, params, warm)['seconds'] * 1000 for _ in range(iterations)]
+        return {
+            'status': traced['status'],
+            'response_bytes': traced['bytes'],
+            'queries': traced['queries'],
+            'peak_memory_kb': round(traced['peak'] / 1024, 1),
+            'p50_ms': round(percentile(timings, 50), 3),
+            'p95_ms': round(percentile(timings, 95), 3),
+            'p99_ms': round(percentile(timings, 99), 3),
+            'mean_ms': round(sum(timings) / len(timings), 3),
+        }
+
+    def _metrics_overhead(self, user, iterations):
+        """
+        Time a response cache hit, the cheapest request, with the metrics
+        middleware installed and without it. Each client builds its own
+        middleware chain on first use, under the setting in force then. The
+        query timer stays on the connection either way, where it costs one
+        context variable lookup per query outside a measured request.
+        """
+        medians = {}
+        for enabled in (True, False):
+            with override_settings(REQUEST_METRICS_ENABLED=enabled):
+                client = APIClient()
+                client.credentials(HTTP_AUTHORIZATION=f"Bearer {AccessToken.for_user(user)}")
+                self._request(client, 'get', '/api/accounts/', {}, warm=False)
+                # Many more runs than a scenario, as the difference is microseconds
+                timings = [
+                    self._request(client, 'get', '/api/accounts/', {}, warm=True)['seconds'] * 1_000_000
+                    for _ in range(iterations * 10)
+                ]
+            medians[enabled] = percentile(timings, 50)
+        overhead = medians[True] - medians[False]
+        return {
+            'p50_with_metrics_us': round(medians[True], 1),
+            'p50_without_metrics_us': round(medians[False], 1),
+            'overhead_us': round(overhead, 1),
+            'overhead_percent': round(overhead / medians[False] * 100, 2),
+        }
+
+    def _compare(self, baseline, report, tolerance):
+        regressions = []
+        for rows, scenarios in report['results'].items():
+            for name, current in scenarios.items():
+                previous = baseline.get('results', {}).get(rows, {}).get(name)
+                if previous is None:
+                    continue
+                for metric, allowed in COMPARED_METRICS.items():
+                    growth = tolerance if allowed == 'tolerance' else allowed
+                    if current[metric] > previous[metric] * (1 + growth):
+                        regressions.append(
+                            f"{rows} rows {name}: {metric} {previous[metric]} -> {current[metric]}"
+                        )
+        return regressions
@@ -0,0 +1,136 @@
+import datetime
+import gzip
+import json
+import statistics
+import time
+
+import brotli
+import msgpack
+from django.conf import settings
+from django.core.management.base import BaseCommand, CommandError
+
+from finances.renderers import ColumnarJSONRenderer, TimedJSONRenderer, from_columnar
+from finances.synthetic import synthetic_transactions
+
+ACCOUNTS = [
+    ('Everyday Checking', 'Chase'),
+    ('High Yield Savings', 'Chase'),
+    ('Rewards Credit Card', 'American Express'),
+    ('Joint Checking', 'Wells Fargo'),
+]
+
+# name -> (encode, decode back to a list of row dicts)
+FORMATS = {
+    'json': (
+        lambda rows: TimedJSONRenderer().render(rows),
+        json.loads,
+    ),
+    'columnar': (
+        lambda rows: ColumnarJSONRenderer().render(rows),
+        lambda body: from_columnar(json.loads(body)),
+    ),
+    'msgpack': (
+        lambda rows: msgpack.packb(rows, use_bin_type=True),
+        lambda body: msgpack.unpackb(body, raw=False),
+    ),
+}
+
+
+def transaction_rows(count):
+    """Rows shaped like TransactionsList's response, spread over a few accounts"""
+    rows = []
+    for index, transaction in enumerate(synthetic_transactions(count, seed=count, id_prefix='format')):
+        account_name, institution_name = ACCOUNTS[index % len(ACCOUNTS)]
+        rows.append({
+            'id': index + 1,
+            'transaction_id': transaction['transaction_id'],
+            'date': transaction['date'].isoformat(),
+            'name': transaction['name'],
+            'amount': format(transaction['amount'], '.2f'),
+            'category': transaction['category'][0],
+            'pending': transaction['pending'],
+            'account_name': account_name,
+            'institution_name': institution_name,
+        })
+    return rows
+
+
+def timed(function, argument, iterations):
+    """The function's result and its median run time in milliseconds"""
+    timings = []
+    for _ in range(iterations):
+        started = time.perf_counter()
+        result = function(argument)
+        timings.append((time.perf_counter() - started) * 1000)
+    return result, round(statistics.median(timings), 3)
+
+
+class Command(BaseCommand):
+    help = (
+        "Compare the transaction response formats (row JSON, columnar JSON, MessagePack) "
+        "by bytes on the wire, with and without gzip/Brotli, and encode/decode time"
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--rows',
+            type=int,
+            nargs='+',
+            default=[1_000, 100_000],
+            help="Row counts to compare, one run each (default: 1000 100000)",
+        )
+        parser.add_argument('--iterations', type=int, default=5, help="Timed runs per measurement (median is reported)")
+        parser.add_argument('--output', help="Also write the JSON report to this file")
+
+    def handle(self, *args, **options):
+        iterations = options['iterations']
+        report = {
+            'meta': {
+                'created_at': datetime.datetime.now(datetime.timezone.utc).isoformat(),
+                'iterations': iterations,
+                'gzip_level': settings.GZIP_LEVEL,
+                'brotli_quality': settings.BROTLI_QUALITY,
+            },
+            'results': {},
+        }
+
+        for count in options['rows']:
+            rows = transaction_rows(count)
+            results = {}
+            for name, (encode, decode) in FORMATS.items():
+                body, encode_ms = timed(encode, rows, iterations)
+                decoded, decode_ms = timed(decode, body, iterations)
+                if decoded != rows:
+                    raise CommandError(f"{name} did not round-trip")
+                gzipped, gzip_ms = timed(
+                    lambda data: gzip.compress(data, compresslevel=settings.GZIP_LEVEL, mtime=0), body, iterations
+                )
+                brotlied, brotli_ms = timed(
+                    lambda data: brotli.compress(data, quality=settings.BROTLI_QUALITY), body, iterations
+                )
+                results[name] = {
+                    'bytes': len(body),
+                    'gzip_bytes': len(gzipped),
+                    'br_bytes': len(brotlied),
+                    'encode_ms': encode_ms,
+                    'decode_ms': decode_ms,
+                    'gzip_ms': gzip_ms,
+                    'br_ms': brotli_ms,
+                }
+
+            baseline = results['json']
+            for name, result in results.items():
+                result['bytes_vs_json'] = round(result['bytes'] / baseline['bytes'], 3)
+                result['br_bytes_vs_json'] = round(result['br_bytes'] / baseline['bytes'], 3)
+                self.stderr.write(
+                    f"  {count:>9} rows  {name:<9} {result['bytes']:>11} B  gzip {result['gzip_bytes']:>10} B  "
+                    f"br {result['br_bytes']:>10} B  encode {result['encode_ms']:>9.2f} ms  "
+                    f"decode {result['decode_ms']:>9.2f} ms"
+                )
+            report['results'][str(count)] = results
+
+        output = json.dumps(report, indent=2)
+        self.stdout.write(output)
+        if options['output']:
+            with open(options['output'], 'w') as f:
+                f.write(output + '\n')
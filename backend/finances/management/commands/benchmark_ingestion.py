@@ -0,0 +1,96 @@
+import datetime
+import time
+
+from django.contrib.auth.models import User
+from django.core.management.base import BaseCommand
+from django.db import transaction as db_transaction
+
+from finances.ingestion import ingest_item
+from finances.models import PlaidItem
+
+
+class Rollback(Exception):
+    """Raised to discard the benchmark rows once a run is measured"""
+
+
+def _synthetic_accounts(count):
+    return [
+        {
+            'account_id': f"bench-account-{index}",
+            'name': f"Benchmark Account {index}",
+            'type': 'depository',
+            'subtype': 'checking',
+            'balances': {'current': 1000},
+        }
+        for index in range(count)
+    ]
+
+
+def _synthetic_transactions(count, accounts, amount_offset=0):
+    start = datetime.date(2020, 1, 1)
+    return [
+        {
+            'transaction_id': f"bench-txn-{index}",
+            'account_id': accounts[index % len(accounts)]['account_id'],
+            'amount': round((index % 500) - 100 + amount_offset + 0.25, 2),
+            'date': start + datetime.timedelta(days=index % 1800),
+            'name': f"Merchant {index % 250}",
+            'category': ['Food and Drink'] if index % 3 else None,
+            'pending': False,
+        }
+        for index in range(count)
+    ]
+
+
+class Command(BaseCommand):
+    help = "Measure ingestion throughput (rows/sec) for fresh imports and idempotent re-imports"
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--rows',
+            type=int,
+            nargs='+',
+            default=[10_000, 100_000],
+            help="Transaction counts to import (default: 10000 100000)",
+        )
+        parser.add_argument('--accounts', type=int, default=4, help="Accounts per item")
+        parser.add_argument('--batch-size', type=int, help="Rows per upsert batch (defaults to INGEST_BATCH_SIZE)")
+        parser.add_argument('--keep', action='store_true', help="Keep the benchmark rows instead of rolling back")
+
+    def handle(self, *args, **options):
+        accounts = _synthetic_accounts(options['accounts'])
+
+        for rows in options['rows']:
+            transactions = _synthetic_transactions(rows, accounts)
+            # Same ids with different amounts, so the second pass updates every row
+            updated = _synthetic_transactions(rows, accounts, amount_offset=1)
+
+            try:
+                with db_transaction.atomic():
+                    user, _ = User.objects.get_or_create(username='ingestion-benchmark')
+                    plaid_item = PlaidItem.objects.create(
+                        user=user,
+                        item_id=f"bench-item-{rows}",
+                        access_token='bench-token',
+                    )
+
+                    started = time.perf_counter()
+                    ingest_item(plaid_item, accounts, transactions, batch_size=options['batch_size'])
+                    insert_seconds = time.perf_counter() - started
+
+                    started = time.perf_counter()
+                    ingest_item(plaid_item, accounts, updated, batch_size=options['batch_size'])
+                    upsert_seconds = time.perf_counter() - started
+
+                    self._report(rows, 'insert', insert_seconds)
+                    self._report(rows, 'upsert', upsert_seconds)
+
+                    if not options['keep']:
+                        raise Rollback
+            except Rollback:
+                pass
+
+    def _report(self, rows, phase, seconds):
+        self.stdout.write(
+            f"{rows:>9} rows  {phase:<6}  {seconds:8.2f}s  {rows / seconds:>10,.0f} rows/sec"
+        )
@@ -0,0 +1,29 @@
+import time
+
+from django.contrib.auth.models import User
+from django.core.management.base import BaseCommand
+
+from finances.recurring import refresh_merchants
+
+from ._utils import get_user
+
+
+class Command(BaseCommand):
+    help = "Re-detect recurring charges from every transaction, replacing the stored results"
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--user',
+            help="Username or id of the user to scan (defaults to all users)",
+        )
+
+    def handle(self, *args, **options):
+        users = User.objects.all()
+        if options['user']:
+            users = users.filter(id=get_user(options['user']).id)
+
+        started = time.perf_counter()
+        found = sum(refresh_merchants(user_id) for user_id in users.values_list('id', flat=True))
+        self.stdout.write(self.style.SUCCESS(
+            f"Found {found} recurring charges in {time.perf_counter() - started:.1f}s"
+        ))
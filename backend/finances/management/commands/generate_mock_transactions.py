@@ -0,0 +1,67 @@
+import datetime
+import json
+import os
+import time
+
+from django.core.management.base import BaseCommand
+
+from finances.mock_data import get_mock_file_path
+from finances.synthetic import synthetic_transactions
+
+ACCOUNTS = [
+    ('Everyday Checking', 'Chase'),
+    ('Rewards Credit Card', 'American Express'),
+    ('Savings', 'Ally Bank'),
+]
+
+
+class Command(BaseCommand):
+    help = "Generate a synthetic mock transactions file for /api/mock-transactions/ and load testing"
+
+    def add_arguments(self, parser):
+        parser.add_argument('--rows', type=int, default=1000, help="Number of transactions (default: 1000)")
+        parser.add_argument('--days', type=int, default=365, help="Days of history to spread them over")
+        parser.add_argument('--end-date', type=datetime.date.fromisoformat, help="Newest date (default: today)")
+        parser.add_argument('--seed', type=int, default=0, help="Random seed, for reproducible datasets")
+        parser.add_argument('--output', help="File to write (defaults to MOCK_TRANSACTIONS_FILE)")
+
+    def handle(self, *args, **options):
+        output = options['output'] or get_mock_file_path()
+        os.makedirs(os.path.dirname(os.path.abspath(output)), exist_ok=True)
+        started = time.perf_counter()
+
+        rows = synthetic_transactions(
+            options['rows'],
+            days=options['days'],
+            end_date=options['end_date'],
+            seed=options['seed'],
+            id_prefix='mock',
+        )
+
+        # Stream rows to a temporary file and swap it in, so a running server
+        # never reads a half-written dataset (the mtime change triggers a reload)
+        temporary = f"{output}.tmp"
+        with open(temporary, 'w') as f:
+            f.write('[')
+            for index, transaction in enumerate(rows):
+                account_name, institution_name = ACCOUNTS[index % len(ACCOUNTS)]
+                if index:
+                    f.write(',\n')
+                f.write(json.dumps({
+                    'id': index + 1,
+                    'transaction_id': transaction['transaction_id'],
+                    'date': transaction['date'].isoformat(),
+                    'name': transaction['name'],
+                    'amount': format(transaction['amount'], '.2f'),
+                    'category': transaction['category'][0],
+                    'pending': transaction['pending'],
+                    'account_name': account_name,
+                    'institution_name': institution_name,
+                }))
+            f.write(']\n')
+        os.replace(temporary, output)
+
+        elapsed = time.perf_counter() - started
+        self.stdout.write(self.style.SUCCESS(
+            f"Wrote {options['rows']} transactions to {output} in {elapsed:.1f}s"
+        ))
@@ -0,0 +1,282 @@
+import argparse
+import asyncio
+import datetime
+import json
+import os
+import shutil
+import socket
+import subprocess
+import sys
+import tempfile
+import time
+
+from django.conf import settings
+from django.contrib.auth.models import User
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connection
+from rest_framework_simplejwt.tokens import AccessToken
+
+from finances.fake_plaid import FakePlaidConfig, start_fake_plaid
+from finances.management.commands.benchmark_api import percentile, seed_user
+
+# How each server is started; {port}, {workers} and {threads} are filled in per run.
+# gunicorn's threaded workers are the WSGI counterpart of uvicorn's event
+# loop workers: both serve many connections per process.
+SERVERS = {
+    'wsgi': {
+        'command': [
+            '-m', 'gunicorn', 'finance_tracker.wsgi:application',
+            '--bind', '127.0.0.1:{port}', '--workers', '{workers}', '--threads', '{threads}',
+            '--worker-class', 'gthread', '--log-level', 'warning',
+        ],
+        'env': {'ASYNC_READ_VIEWS': 'false'},
+    },
+    'asgi': {
+        'command': [
+            '-m', 'uvicorn', 'finance_tracker.asgi:application',
+            '--host', '127.0.0.1', '--port', '{port}', '--workers', '{workers}',
+            '--no-access-log', '--log-level', 'warning',
+        ],
+        'env': {'ASYNC_READ_VIEWS': 'true'},
+    },
+}
+
+# (name, path, defeat the response cache). Uncached scenarios add a unique
+# query parameter to every request, so each one reaches the database.
+SCENARIOS = [
+    ('accounts', '/api/accounts/', False),
+    ('transactions_page', '/api/transactions/?limit=100', True),
+    ('analytics_summary', '/api/analytics/summary/', True),
+    ('link_token', '/api/link-token/', False),
+]
+
+
+def free_port():
+    with socket.socket() as sock:
+        sock.bind(('127.0.0.1', 0))
+        return sock.getsockname()[1]
+
+
+async def fetch(reader, writer, path, headers):
+    """Send one keep-alive GET and read the whole response; returns (status, keep the connection)"""
+    writer.write(f"GET {path} HTTP/1.1\r\n{headers}\r\n".encode())
+    await writer.drain()
+    status_line = await reader.readline()
+    if not status_line:
+        raise ConnectionError("Server closed the connection")
+    status = int(status_line.split()[1])
+    length, chunked, keep_alive = 0, False, True
+    while (line := await reader.readline()) not in (b'\r\n', b''):
+        name, _, value = line.decode('latin-1').partition(':')
+        name, value = name.strip().lower(), value.strip().lower()
+        if name == 'content-length':
+            length = int(value)
+        elif name == 'transfer-encoding':
+            chunked = 'chunked' in value
+        elif name == 'connection':
+            keep_alive = value != 'close'
+    if chunked:
+        while size := int((await reader.readline()).split(b';')[0], 16):
+            await reader.readexactly(size + 2)
+        await reader.readline()
+    else:
+        await reader.readexactly(length)
+    return status, keep_alive
+
+
+async def run_client(port, path, headers, uncached, deadline, latencies, errors, counter):
+    """One virtual user issuing requests back to back on a keep-alive connection until the deadline"""
+    connection = None
+    while time.perf_counter() < deadline:
+        if connection is None:
+            connection = await asyncio.open_connection('127.0.0.1', port)
+        if uncached:
+            counter[0] += 1
+            request_path = f"{path}{'&' if '?' in path else '?'}load_test={counter[0]}"
+        else:
+            request_path = path
+        started = time.perf_counter()
+        try:
+            status, keep_alive = await fetch(*connection, request_path, headers)
+        except (ConnectionError, asyncio.IncompleteReadError, ValueError):
+            errors.append('connection')
+            connection[1].close()
+            connection = None
+            continue
+        latencies.append((time.perf_counter() - started) * 1000)
+        if status != 200:
+            errors.append(status)
+        if not keep_alive:
+            connection[1].close()
+            connection = None
+    if connection is not None:
+        connection[1].close()
+
+
+async def drive(port, path, token, uncached, concurrency, duration):
+    """Run `concurrency` virtual users for `duration` seconds and summarize their requests"""
+    headers = f"Host: 127.0.0.1:{port}\r\nAuthorization: Bearer {token}\r\nAccept: application/json\r\n"
+    latencies, errors, counter = [], [], [0]
+    deadline = time.perf_counter() + duration
+    started = time.perf_counter()
+    await asyncio.gather(*(
+        run_client(port, path, headers, uncached, deadline, latencies, errors, counter)
+        for _ in range(concurrency)
+    ))
+    elapsed = time.perf_counter() - started
+    if not latencies:
+        return {'requests': 0, 'errors': len(errors)}
+    return {
+        'requests': len(latencies),
+        'errors': len(errors),
+        'requests_per_second': round(len(latencies) / elapsed, 1),
+        'p50_ms': round(percentile(latencies, 50), 2),
+        'p95_ms': round(percentile(latencies, 95), 2),
+        'p99_ms': round(percentile(latencies, 99), 2),
+    }
+
+
+class Command(BaseCommand):
+    help = (
+        "Load test the API under uvicorn (ASGI, async read views) and gunicorn "
+        "(WSGI, threaded workers) against a seeded database, and report the "
+        "concurrent-request throughput and latency of each as JSON"
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--rows', type=int, default=10_000, help="Transactions to seed for the test user")
+        parser.add_argument(
+            '--concurrency',
+            type=int,
+            nargs='+',
+            default=[1, 10, 50],
+            help="Concurrent connections to test, one run each (default: 1 10 50)",
+        )
+        parser.add_argument('--duration', type=float, default=10, help="Seconds per run")
+        parser.add_argument('--workers', type=int, default=1, help="Server worker processes")
+        parser.add_argument('--threads', type=int, default=8, help="Threads per gunicorn worker")
+        parser.add_argument(
+            '--plaid-latency-ms',
+            type=float,
+            default=200,
+            help="Response delay of the fake Plaid server that link tokens are created on",
+        )
+        parser.add_argument(
+            '--servers', nargs='+', choices=list(SERVERS), default=list(SERVERS), help="Servers to test"
+        )
+        parser.add_argument('--output', help="Also write the JSON report to this file")
+        # Used internally to seed the load test database from a child process
+        parser.add_argument('--seed-only', action='store_true', help=argparse.SUPPRESS)
+
+    def handle(self, *args, **options):
+        if options['seed_only']:
+            user, _ = seed_user(options['rows'], items=2, accounts_per_item=2)
+            self.stdout.write(json.dumps({'user_id': user.id, 'token': str(AccessToken.for_user(user))}))
+            return
+
+        for server in options['servers']:
+            module = SERVERS[server]['command'][1]
+            if not self._importable(module):
+                raise CommandError(f"{module} is not installed (pip install -r requirements.txt)")
+
+        workdir = tempfile.mkdtemp(prefix='load-test-')
+        plaid = start_fake_plaid(FakePlaidConfig(latency_ms=options['plaid_latency_ms']))
+        env = {
+            **os.environ,
+            'PLAID_ENV': 'local',
+            'PLAID_LOCAL_URL': plaid.url,
+            'PLAID_API_HOST': '',
+            'PYTHONUNBUFFERED': '1',
+        }
+        if connection.vendor == 'sqlite':
+            # A throwaway database, so the load test never writes to the real one
+            env['SQLITE_PATH'] = os.path.join(workdir, 'load_test.sqlite3')
+
+        seeded = None
+        try:
+            seeded = self._prepare_database(env, options['rows'])
+            report = {
+                'meta': {
+                    'created_at': datetime.datetime.now(datetime.timezone.utc).isoformat(),
+                    'database': connection.vendor,
+                    'rows': options['rows'],
+                    'duration_seconds': options['duration'],
+                    'workers': options['workers'],
+                    'gunicorn_threads': options['threads'],
+                    'plaid_latency_ms': options['plaid_latency_ms'],
+                },
+                'results': {},
+            }
+            for server in options['servers']:
+                report['results'][server] = self._test_server(server, env, seeded['token'], options)
+        finally:
+            if seeded and 'SQLITE_PATH' not in env:
+                # Other databases are the configured one, so remove the seeded user's data
+                User.objects.filter(id=seeded['user_id']).delete()
+            plaid.shutdown()
+            plaid.server_close()
+            shutil.rmtree(workdir, ignore_errors=True)
+
+        output = json.dumps(report, indent=2)
+        self.stdout.write(output)
+        if options['output']:
+            with open(options['output'], 'w') as f:
+                f.write(output + '\n')
+
+    def _importable(self, module):
+        return subprocess.run([sys.executable, '-c', f'import {module}'], capture_output=True).returncode == 0
+
+    def _manage(self, env, *arguments):
+        result = subprocess.run(
+            [sys.executable, 'manage.py', *arguments],
+            cwd=settings.BASE_DIR, env=env, capture_output=True, text=True,
+        )
+        if result.returncode:
+            raise CommandError(f"manage.py {' '.join(arguments)} failed:\n{result.stderr}")
+        return result.stdout
+
+    def _prepare_database(self, env, rows):
+        """Migrate the load test database and seed a user, returning its id and access token"""
+        self._manage(env, 'migrate', '--noinput')
+        started = time.perf_counter()
+        seeded = json.loads(self._manage(env, 'load_test', '--seed-only', '--rows', str(rows)))
+        self.stderr.write(f"Seeded {rows} rows in {time.perf_counter() - started:.1f}s")
+        return seeded
+
+    def _test_server(self, server, env, token, options):
+        port = free_port()
+        values = {'port': port, 'workers': options['workers'], 'threads': options['threads']}
+        command = [sys.executable] + [part.format(**values) for part in SERVERS[server]['command']]
+        process = subprocess.Popen(command, cwd=settings.BASE_DIR, env={**env, **SERVERS[server]['env']})
+        try:
+            self._wait_until_ready(process, port)
+            results = {}
+            for name, path, uncached in SCENARIOS:
+                results[name] = {}
+                for concurrency in options['concurrency']:
+                    result = asyncio.run(drive(port, path, token, uncached, concurrency, options['duration']))
+                    results[name][str(concurrency)] = result
+                    self.stderr.write(
+                        f"  {server}  {name:<18} x{concurrency:<4} "
+                        f"{result.get('requests_per_second', 0):>9.1f} req/s  "
+                        f"p95 {result.get('p95_ms', 0):>9.2f} ms  errors {result['errors']}"
+                    )
+            return results
+        finally:
+            process.terminate()
+            try:
+                process.wait(timeout=15)
+            except subprocess.TimeoutExpired:
+                process.kill()
+
+    def _wait_until_ready(self, process, port, timeout=30):
+        deadline = time.monotonic() + timeout
+        while time.monotonic() < deadline:
+            if process.poll() is not None:
+                raise CommandError(f"Server exited with status {process.returncode}")
+            try:
+                socket.create_connection(('127.0.0.1', port), timeout=1).close()
+                return
+            except OSError:
+                time.sleep(0.2)
+        raise CommandError(f"Server did not start listening on port {port} within {timeout}s")
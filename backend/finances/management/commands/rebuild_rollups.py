@@ -0,0 +1,34 @@
+import time
+
+from django.core.management.base import BaseCommand
+
+from finances.models import Account
+from finances.rollups import rebuild
+
+from ._utils import get_user
+
+
+class Command(BaseCommand):
+    help = "Recompute the daily spend/income rollups from transactions"
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--user',
+            help="Username or id of the user to rebuild (defaults to all users)",
+        )
+        parser.add_argument(
+            '--batch-size',
+            type=int,
+            help="Number of rows written per database batch (defaults to INGEST_BATCH_SIZE)",
+        )
+
+    def handle(self, *args, **options):
+        accounts = None
+        if options['user']:
+            accounts = Account.objects.filter(plaid_item__user=get_user(options['user']))
+
+        started = time.perf_counter()
+        count = rebuild(accounts, batch_size=options['batch_size'])
+        self.stdout.write(self.style.SUCCESS(
+            f"Rebuilt {count} daily rollups in {time.perf_counter() - started:.1f}s"
+        ))
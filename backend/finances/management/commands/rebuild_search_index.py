@@ -0,0 +1,25 @@
+import time
+
+from django.core.management.base import BaseCommand
+from django.db import DEFAULT_DB_ALIAS, connections
+
+from finances import search
+
+
+class Command(BaseCommand):
+    help = "Recreate the transaction full-text search index and re-index every transaction"
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--database',
+            default=DEFAULT_DB_ALIAS,
+            help="Database alias to index (defaults to 'default')",
+        )
+
+    def handle(self, *args, **options):
+        connection = connections[options['database']]
+        started = time.perf_counter()
+        search.install(connection)
+        self.stdout.write(self.style.SUCCESS(
+            f"Rebuilt the {connection.vendor} search index in {time.perf_counter() - started:.1f}s"
+        ))
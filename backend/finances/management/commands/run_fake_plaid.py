@@ -0,0 +1,55 @@
+from urllib.parse import urlparse
+
+from django.conf import settings
+from django.core.management.base import BaseCommand
+
+from finances.fake_plaid import FakePlaidConfig, FakePlaidServer
+
+
+class Command(BaseCommand):
+    help = "Serve a local stand-in for the Plaid API (use with PLAID_ENV=local)"
+
+    def add_arguments(self, parser):
+        default = urlparse(settings.PLAID_LOCAL_URL)
+        parser.add_argument('--host', default=default.hostname or '127.0.0.1')
+        parser.add_argument('--port', type=int, default=default.port or 8765)
+        parser.add_argument('--accounts', type=int, default=3, help="Accounts per linked item")
+        parser.add_argument('--transactions', type=int, default=500, help="Transactions per account")
+        parser.add_argument('--days', type=int, default=730, help="Days of transaction history")
+        parser.add_argument('--latency-ms', type=float, default=0, help="Delay added to every response")
+        parser.add_argument('--jitter-ms', type=float, default=0, help="Random extra delay, up to this many ms")
+        parser.add_argument(
+            '--rate-limit-rate',
+            type=float,
+            default=0,
+            help="Fraction of requests answered with 429 RATE_LIMIT_EXCEEDED (0-1)",
+        )
+        parser.add_argument(
+            '--changes-per-sync',
+            type=int,
+            default=0,
+            help="Transactions modified, and as many removed, by each sync after an item's history",
+        )
+        parser.add_argument('--seed', type=int, default=0, help="Seed for the generated data")
+
+    def handle(self, *args, **options):
+        config = FakePlaidConfig(
+            accounts_per_item=options['accounts'],
+            transactions_per_account=options['transactions'],
+            history_days=options['days'],
+            latency_ms=options['latency_ms'],
+            latency_jitter_ms=options['jitter_ms'],
+            rate_limit_rate=options['rate_limit_rate'],
+            changes_per_sync=options['changes_per_sync'],
+            seed=options['seed'],
+        )
+        server = FakePlaidServer((options['host'], options['port']), config)
+        self.stdout.write(self.style.SUCCESS(f"Fake Plaid listening on {server.url}"))
+        try:
+            server.serve_forever()
+        except KeyboardInterrupt:
+            pass
+        finally:
+            server.server_close()
+            for path, count in sorted(server.request_counts.items()):
+                self.stdout.write(f"{path}: {count} requests")
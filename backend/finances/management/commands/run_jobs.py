@@ -0,0 +1,57 @@
+import multiprocessing
+import os
+import socket
+import time
+
+from django.core.management.base import BaseCommand
+from django.db import connections
+
+from finances.jobs import requeue_stale_jobs, run_pending
+
+
+def work(poll_interval, burst):
+    """Worker process loop: drain due jobs, then sleep until more arrive"""
+    # Never share a database connection inherited from the parent process
+    connections.close_all()
+    worker_id = f"{socket.gethostname()}:{os.getpid()}"
+    while True:
+        # Leases let every worker take back jobs of workers that died, not just at startup
+        requeue_stale_jobs()
+        ran = run_pending(worker_id)
+        if burst and not ran:
+            return
+        if not ran:
+            time.sleep(poll_interval)
+
+
+class Command(BaseCommand):
+    help = "Run background jobs (Plaid imports) from the database-backed queue"
+
+    def add_arguments(self, parser):
+        parser.add_argument('--workers', type=int, default=1, help="Number of worker processes")
+        parser.add_argument('--poll-interval', type=float, default=1.0, help="Seconds to sleep when the queue is empty")
+        parser.add_argument('--burst', action='store_true', help="Exit once the queue is empty")
+
+    def handle(self, *args, **options):
+        requeued = requeue_stale_jobs()
+        if requeued:
+            self.stdout.write(f"Requeued {requeued} stale jobs")
+
+        if options['workers'] == 1:
+            work(options['poll_interval'], options['burst'])
+            return
+
+        connections.close_all()
+        processes = [
+            multiprocessing.Process(target=work, args=(options['poll_interval'], options['burst']))
+            for _ in range(options['workers'])
+        ]
+        for process in processes:
+            process.start()
+        self.stdout.write(f"Started {len(processes)} job workers")
+        try:
+            for process in processes:
+                process.join()
+        except KeyboardInterrupt:
+            for process in processes:
+                process.terminate()
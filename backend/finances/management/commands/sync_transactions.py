@@ -0,0 +1,30 @@
+from django.core.management.base import BaseCommand
+
+from finances.models import PlaidItem
+from finances.sync import sync_items
+
+from ._utils import get_user
+
+
+class Command(BaseCommand):
+    help = "Incrementally sync Plaid transactions for one user or for every user"
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--user',
+            help="Username or id of the user to sync (defaults to all users)",
+        )
+        parser.add_argument(
+            '--batch-size',
+            type=int,
+            help="Number of rows written per database batch (defaults to INGEST_BATCH_SIZE)",
+        )
+
+    def handle(self, *args, **options):
+        plaid_items = PlaidItem.objects.all()
+
+        if options['user']:
+            plaid_items = plaid_items.filter(user=get_user(options['user']))
+
+        result = sync_items(plaid_items.order_by('id'), batch_size=options['batch_size'])
+        self.stdout.write(self.style.SUCCESS(f"Synced {plaid_items.count()} items: {result}"))
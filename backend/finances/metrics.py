@@ -0,0 +1,271 @@
+import bisect
+import contextlib
+import contextvars
+import os
+import threading
+import time
+
+from . import plaid_client
+
+# Request profiling: RequestMetricsMiddleware opens a RequestTimings for each
+# request, database queries, serialization and Plaid calls add their time to
+# it, and the totals are returned as a Server-Timing header and folded into
+# process-wide histograms rendered in the Prometheus text format at /metrics.
+#
+# Each worker process keeps its own histograms, so scrape every worker (or
+# run a single worker per scrape target) to see the whole service.
+
+DURATION_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+QUERY_COUNT_BUCKETS = (0, 1, 2, 5, 10, 20, 50, 100, 200, 500)
+
+CONTENT_TYPE = 'text/plain; version=0.0.4; charset=utf-8'
+
+# One lock for every metric, so a finished request is recorded with a single acquire
+_lock = threading.Lock()
+
+
+def _escape(value):
+    return str(value).replace('\\', r'\\').replace('"', r'\"').replace('\n', r'\n')
+
+
+def _labels(names, values, extra=()):
+    pairs = [f'{name}="{_escape(value)}"' for name, value in zip(names, values)]
+    pairs.extend(f'{name}="{_escape(value)}"' for name, value in extra)
+    return '{' + ','.join(pairs) + '}' if pairs else ''
+
+
+def _number(value):
+    if value == float('inf'):
+        return '+Inf'
+    return repr(float(value)) if isinstance(value, float) else str(value)
+
+
+class Counter:
+    """A monotonically increasing count with one series per label set"""
+
+    def __init__(self, name, documentation, labelnames=()):
+        self.name = name
+        self.documentation = documentation
+        self.labelnames = labelnames
+        self._values = {}
+
+    def inc(self, labels=(), amount=1):
+        # Callers hold _lock
+        self._values[labels] = self._values.get(labels, 0) + amount
+
+    def reset(self):
+        self._values.clear()
+
+    def expose(self):
+        with _lock:
+            values = dict(self._values)
+        lines = [f"# HELP {self.name} {self.documentation}", f"# TYPE {self.name} counter"]
+        for labels, value in sorted(values.items()):
+            lines.append(f"{self.name}{_labels(self.labelnames, labels)} {_number(value)}")
+        return lines
+
+
+class Histogram:
+    """Cumulative bucket counts and a running sum, with one series per label set"""
+
+    def __init__(self, name, documentation, labelnames=(), buckets=DURATION_BUCKETS):
+        self.name = name
+        self.documentation = documentation
+        self.labelnames = labelnames
+        self.buckets = tuple(buckets)
+        self._series = {}
+
+    def observe(self, labels, value):
+        # Callers hold _lock. Bucket bounds are inclusive, so a value equal to
+        # a bound lands in it; the extra last slot is the +Inf bucket
+        series = self._series.get(labels)
+        if series is None:
+            series = self._series[labels] = [[0] * (len(self.buckets) + 1), 0.0]
+        series[0][bisect.bisect_left(self.buckets, value)] += 1
+        series[1] += value
+
+    def reset(self):
+        self._series.clear()
+
+    def expose(self):
+        with _lock:
+            snapshot = {labels: (list(counts), total) for labels, (counts, total) in self._series.items()}
+        lines = [f"# HELP {self.name} {self.documentation}", f"# TYPE {self.name} histogram"]
+        for labels, (counts, total) in sorted(snapshot.items()):
+            cumulative = 0
+            for bound, count in zip(self.buckets + (float('inf'),), counts):
+                cumulative += count
+                lines.append(
+                    f"{self.name}_bucket{_labels(self.labelnames, labels, [('le', _number(bound))])} {cumulative}"
+                )
+            lines.append(f"{self.name}_sum{_labels(self.labelnames, labels)} {_number(total)}")
+            lines.append(f"{self.name}_count{_labels(self.labelnames, labels)} {cumulative}")
+        return lines
+
+
+REQUESTS = Counter(
+    'finance_http_requests_total',
+    "HTTP requests served, by route, method and status code",
+    ('route', 'method', 'status'),
+)
+REQUEST_DURATION = Histogram(
+    'finance_http_request_duration_seconds',
+    "Time spent producing each response, by route and method",
+    ('route', 'method'),
+)
+DB_QUERIES = Histogram(
+    'finance_http_request_db_queries',
+    "Database queries issued per request, by route",
+    ('route',),
+    buckets=QUERY_COUNT_BUCKETS,
+)
+DB_DURATION = Histogram(
+    'finance_http_request_db_seconds',
+    "Time spent in database queries per request, by route",
+    ('route',),
+)
+SERIALIZATION_DURATION = Histogram(
+    'finance_http_request_serialization_seconds',
+    "Time spent serializing and rendering response bodies per request, by route",
+    ('route',),
+)
+PLAID_DURATION = Histogram(
+    'finance_http_request_plaid_seconds',
+    "Time spent waiting on the Plaid API per request, by route",
+    ('route',),
+)
+
+METRICS = [REQUESTS, REQUEST_DURATION, DB_QUERIES, DB_DURATION, SERIALIZATION_DURATION, PLAID_DURATION]
+
+
+class RequestTimings:
+    """Time spent in each phase of the current request"""
+
+    __slots__ = ('db_queries', 'db_seconds', 'serialization_seconds', 'plaid_calls', 'plaid_seconds')
+
+    def __init__(self):
+        self.db_queries = 0
+        self.db_seconds = 0.0
+        self.serialization_seconds = 0.0
+        self.plaid_calls = 0
+        self.plaid_seconds = 0.0
+
+
+_current = contextvars.ContextVar('request_timings', default=None)
+
+
+@contextlib.contextmanager
+def measuring():
+    """Collect the timings of everything run inside the block"""
+    timings = RequestTimings()
+    token = _current.set(timings)
+    try:
+        yield timings
+    finally:
+        _current.reset(token)
+
+
+def time_query(execute, sql, params, many, context):
+    """
+    Database execute_wrapper adding each query's time to the current request.
+    install_query_timer() adds it to every connection, where it costs one
+    context variable lookup per query outside a request.
+    """
+    timings = _current.get()
+    if timings is None:
+        return execute(sql, params, many, context)
+    started = time.perf_counter()
+    try:
+        return execute(sql, params, many, context)
+    finally:
+        timings.db_queries += 1
+        timings.db_seconds += time.perf_counter() - started
+
+
+def install_query_timer(connection, **kwargs):
+    """connection_created receiver that times every query run on the new connection"""
+    if time_query not in connection.execute_wrappers:
+        connection.execute_wrappers.append(time_query)
+
+
+@contextlib.contextmanager
+def timing_serialization():
+    """Count the block as serialization time of the current request"""
+    timings = _current.get()
+    if timings is None:
+        yield
+        return
+    started = time.perf_counter()
+    try:
+        yield
+    finally:
+        timings.serialization_seconds += time.perf_counter() - started
+
+
+def record_plaid_call(seconds):
+    """Add a Plaid API call to the current request, if there is one"""
+    timings = _current.get()
+    if timings is not None:
+        timings.plaid_calls += 1
+        timings.plaid_seconds += seconds
+
+
+def observe_request(route, method, status, seconds, timings):
+    """Fold one finished request into the histograms"""
+    by_route = (route,)
+    with _lock:
+        REQUESTS.inc((route, method, str(status)))
+        REQUEST_DURATION.observe((route, method), seconds)
+        DB_QUERIES.observe(by_route, timings.db_queries)
+        DB_DURATION.observe(by_route, timings.db_seconds)
+        SERIALIZATION_DURATION.observe(by_route, timings.serialization_seconds)
+        PLAID_DURATION.observe(by_route, timings.plaid_seconds)
+
+
+def server_timing(timings, seconds):
+    """Format the timings as a Server-Timing header value (durations in milliseconds)"""
+    parts = [
+        f'db;dur={timings.db_seconds * 1000:.2f};desc="{timings.db_queries} queries"',
+        f'serialize;dur={timings.serialization_seconds * 1000:.2f}',
+    ]
+    if timings.plaid_calls:
+        parts.append(f'plaid;dur={timings.plaid_seconds * 1000:.2f};desc="{timings.plaid_calls} calls"')
+    parts.append(f'total;dur={seconds * 1000:.2f}')
+    return ', '.join(parts)
+
+
+def _plaid_lines():
+    """The Plaid client's per-endpoint counters, which also cover background jobs"""
+    stats = plaid_client.get_latency_stats()
+    series = [
+        ('finance_plaid_requests_total', 'counter', "Plaid API calls, by endpoint", 'count'),
+        ('finance_plaid_request_errors_total', 'counter', "Failed Plaid API calls, by endpoint", 'errors'),
+        ('finance_plaid_request_seconds_total', 'counter', "Time spent in Plaid API calls, by endpoint", 'total_seconds'),
+        ('finance_plaid_request_max_seconds', 'gauge', "Slowest Plaid API call, by endpoint", 'max_seconds'),
+    ]
+    lines = []
+    for name, kind, documentation, key in series:
+        lines.append(f"# HELP {name} {documentation}")
+        lines.append(f"# TYPE {name} {kind}")
+        for endpoint, values in sorted(stats.items()):
+            lines.append(f"{name}{_labels(('endpoint',), (endpoint,))} {_number(values[key])}")
+    return lines
+
+
+def render_latest():
+    """Every metric of this process in the Prometheus text exposition format"""
+    lines = []
+    for metric in METRICS:
+        lines.extend(metric.expose())
+    lines.extend(_plaid_lines())
+    lines.append("# HELP finance_process_pid Process id of the worker that served this scrape")
+    lines.append("# TYPE finance_process_pid gauge")
+    lines.append(f"finance_process_pid {os.getpid()}")
+    return '\n'.join(lines) + '\n'
+
+
+def reset_metrics():
+    """Clear every request metric of this process"""
+    with _lock:
+        for metric in METRICS:
+            metric.reset()
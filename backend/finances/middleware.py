@@ -0,0 +1,131 @@
+import gzip
+import time
+
+import brotli
+from asgiref.sync import iscoroutinefunction, markcoroutinefunction
+from django.conf import settings
+from django.core.exceptions import MiddlewareNotUsed
+from django.utils.cache import patch_vary_headers
+from django.utils.deprecation import MiddlewareMixin
+from rest_framework.permissions import SAFE_METHODS
+
+from . import db_router, metrics
+
+
+class PrimaryPinMiddleware(MiddlewareMixin):
+    """
+    After a successful write request, pin the user's reads to the primary
+    database for a few seconds so the replica cannot hide their own changes
+    """
+
+    def process_response(self, request, response):
+        user = getattr(request, 'user', None)
+        if (
+            request.method not in SAFE_METHODS
+            and response.status_code < 400
+            and user is not None
+            and user.is_authenticated
+        ):
+            db_router.pin_to_primary(user.id)
+        return response
+
+
+class RequestMetricsMiddleware:
+    """
+    Time each request's database queries, serialization and Plaid calls and
+    record them for /metrics, also reporting them in a Server-Timing header
+    when SERVER_TIMING_ENABLED (by default only under DEBUG). Disable with
+    REQUEST_METRICS_ENABLED=false.
+    """
+    sync_capable = True
+    async_capable = True
+
+    def __init__(self, get_response):
+        if not settings.REQUEST_METRICS_ENABLED:
+            raise MiddlewareNotUsed
+        self.get_response = get_response
+        self.is_async = iscoroutinefunction(get_response)
+        if self.is_async:
+            markcoroutinefunction(self)
+
+    def __call__(self, request):
+        if self.is_async:
+            return self.__acall__(request)
+        started = time.perf_counter()
+        # Queries are timed by the wrapper FinancesConfig installs on every connection
+        with metrics.measuring() as timings:
+            response = self.get_response(request)
+        return self.record(request, response, started, timings)
+
+    async def __acall__(self, request):
+        started = time.perf_counter()
+        # Async ORM queries run in worker threads that inherit this context
+        with metrics.measuring() as timings:
+            response = await self.get_response(request)
+        return self.record(request, response, started, timings)
+
+    def record(self, request, response, started, timings):
+        seconds = time.perf_counter() - started
+
+        # A streamed body is produced after this returns, so its time is not included
+        if settings.SERVER_TIMING_ENABLED:
+            response['Server-Timing'] = metrics.server_timing(timings, seconds)
+        match = getattr(request, 'resolver_match', None)
+        route = match.view_name if match else 'unmatched'
+        metrics.observe_request(route, request.method, response.status_code, seconds, timings)
+        return response
+
+
+def accepted_encodings(header):
+    """The content codings an Accept-Encoding header allows, leaving out any refused with q=0"""
+    encodings = set()
+    for part in header.split(','):
+        coding, _, parameters = part.partition(';')
+        quality = parameters.replace(' ', '')
+        if quality.startswith('q='):
+            try:
+                if float(quality[2:]) <= 0:
+                    continue
+            except ValueError:
+                continue
+        if coding.strip():
+            encodings.add(coding.strip().lower())
+    return encodings
+
+
+class CompressionMiddleware(MiddlewareMixin):
+    """
+    Compress response bodies of at least COMPRESSION_MIN_BYTES with Brotli
+    when the client accepts it, otherwise gzip. Streamed responses are left
+    alone (the export compresses itself with gzip=true). Under ASGI,
+    MiddlewareMixin runs process_response() in a worker thread, so
+    compressing never blocks the event loop.
+    """
+
+    def process_response(self, request, response):
+        if response.streaming or response.has_header('Content-Encoding'):
+            return response
+        patch_vary_headers(response, ('Accept-Encoding',))
+        if len(response.content) < settings.COMPRESSION_MIN_BYTES:
+            return response
+
+        encodings = accepted_encodings(request.headers.get('Accept-Encoding', ''))
+        if 'br' in encodings:
+            encoding = 'br'
+            compressed = brotli.compress(response.content, quality=settings.BROTLI_QUALITY)
+        elif 'gzip' in encodings:
+            encoding = 'gzip'
+            compressed = gzip.compress(response.content, compresslevel=settings.GZIP_LEVEL, mtime=0)
+        else:
+            return response
+        if len(compressed) >= len(response.content):
+            return response
+
+        response.content = compressed
+        response['Content-Length'] = str(len(compressed))
+        response['Content-Encoding'] = encoding
+        # The compressed bytes are a different representation of the same data
+        etag = response.get('ETag')
+        if etag and etag.startswith('"'):
+            response['ETag'] = 'W/' + etag
+        return response
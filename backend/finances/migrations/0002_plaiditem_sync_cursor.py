@@ -0,0 +1,23 @@
+# Generated by Django 5.2 on 2026-10-17 12:28
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('finances', '0001_initial'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='plaiditem',
+            name='last_synced_at',
+            field=models.DateTimeField(blank=True, null=True),
+        ),
+        migrations.AddField(
+            model_name='plaiditem',
+            name='sync_cursor',
+            field=models.TextField(blank=True, default=''),
+        ),
+    ]
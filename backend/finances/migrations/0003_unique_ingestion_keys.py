@@ -0,0 +1,41 @@
+# Generated by Django 5.2 on 2026-10-17 12:29
+
+from django.db import migrations, models
+from django.db.models import Count, Min
+
+
+def remove_duplicates(apps, schema_editor):
+    """Keep the oldest row of each key so the unique constraints can be created"""
+    Account = apps.get_model('finances', 'Account')
+    Transaction = apps.get_model('finances', 'Transaction')
+
+    for model, fields in ((Account, ['plaid_item', 'account_id']), (Transaction, ['account', 'transaction_id'])):
+        duplicates = (
+            model.objects.order_by()
+            .values(*fields)
+            .annotate(keep_id=Min('id'), rows=Count('id'))
+            .filter(rows__gt=1)
+        )
+        for duplicate in duplicates:
+            keep_id = duplicate.pop('keep_id')
+            duplicate.pop('rows')
+            model.objects.filter(**duplicate).exclude(id=keep_id).delete()
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('finances', '0002_plaiditem_sync_cursor'),
+    ]
+
+    operations = [
+        migrations.RunPython(remove_duplicates, migrations.RunPython.noop),
+        migrations.AddConstraint(
+            model_name='account',
+            constraint=models.UniqueConstraint(fields=('plaid_item', 'account_id'), name='unique_item_account'),
+        ),
+        migrations.AddConstraint(
+            model_name='transaction',
+            constraint=models.UniqueConstraint(fields=('account', 'transaction_id'), name='unique_account_transaction'),
+        ),
+    ]
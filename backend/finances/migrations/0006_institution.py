@@ -0,0 +1,52 @@
+# Generated by Django 5.2 on 2026-10-17 12:36
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+def copy_institution_names(apps, schema_editor):
+    """
+    Existing items only stored a name, so each distinct name becomes a legacy
+    Institution row. fetched_at stays null, so these rows are never refreshed
+    from Plaid under their synthetic ids.
+    """
+    Institution = apps.get_model('finances', 'Institution')
+    PlaidItem = apps.get_model('finances', 'PlaidItem')
+
+    names = PlaidItem.objects.exclude(institution_name='').values_list('institution_name', flat=True).distinct()
+    for name in names:
+        institution, _ = Institution.objects.get_or_create(
+            institution_id=f"legacy:{name}"[:255],
+            defaults={'name': name},
+        )
+        PlaidItem.objects.filter(institution_name=name).update(institution=institution)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('finances', '0005_job'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='Institution',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('institution_id', models.CharField(max_length=255, unique=True)),
+                ('name', models.CharField(max_length=255)),
+                ('url', models.CharField(blank=True, max_length=255)),
+                ('fetched_at', models.DateTimeField(blank=True, null=True)),
+            ],
+        ),
+        migrations.AddField(
+            model_name='plaiditem',
+            name='institution',
+            field=models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.SET_NULL, related_name='items', to='finances.institution'),
+        ),
+        migrations.RunPython(copy_institution_names, migrations.RunPython.noop),
+        migrations.RemoveField(
+            model_name='plaiditem',
+            name='institution_name',
+        ),
+    ]
@@ -0,0 +1,51 @@
+# Generated by Django 5.2 on 2026-10-17 12:49
+
+import django.db.models.deletion
+from django.db import migrations, models
+from django.db.models import Count, DecimalField, Q, Sum, Value
+from django.db.models.functions import Abs, Coalesce
+
+
+def build_rollups(apps, schema_editor):
+    """Aggregate the existing transactions into daily rollups"""
+    DailyRollup = apps.get_model('finances', 'DailyRollup')
+    Transaction = apps.get_model('finances', 'Transaction')
+
+    zero = Value(0, output_field=DecimalField(max_digits=14, decimal_places=2))
+    rows = (
+        Transaction.objects
+        .order_by()
+        .values('account_id', 'date', 'category')
+        .annotate(
+            income=Coalesce(Sum(Abs('amount'), filter=Q(amount__lte=0)), zero),
+            expenses=Coalesce(Sum('amount', filter=Q(amount__gt=0)), zero),
+            count=Count('id'),
+        )
+    )
+    DailyRollup.objects.bulk_create((DailyRollup(**row) for row in rows.iterator()), batch_size=1000)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('finances', '0007_unlink_jobs'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='DailyRollup',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('date', models.DateField()),
+                ('category', models.CharField(blank=True, max_length=100, null=True)),
+                ('income', models.DecimalField(decimal_places=2, default=0, max_digits=14)),
+                ('expenses', models.DecimalField(decimal_places=2, default=0, max_digits=14)),
+                ('count', models.PositiveIntegerField(default=0)),
+                ('account', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='daily_rollups', to='finances.account')),
+            ],
+            options={
+                'constraints': [models.UniqueConstraint(fields=('account', 'date', 'category'), name='unique_daily_rollup')],
+            },
+        ),
+        migrations.RunPython(build_rollups, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,85 @@
+# Generated by Django 5.2 on 2026-10-17 14:05
+
+from django.db import migrations
+
+# A frozen copy of finances.search's install SQL as of this migration, so
+# later edits to that module cannot change what it does
+
+SQLITE_INSTALL = [
+    """
+    CREATE VIRTUAL TABLE IF NOT EXISTS finances_transaction_fts USING fts5(
+        name, category,
+        content='finances_transaction', content_rowid='id',
+        tokenize='unicode61 remove_diacritics 2', prefix='2 3'
+    )
+    """,
+    """
+    CREATE TRIGGER IF NOT EXISTS finances_transaction_fts_insert AFTER INSERT ON finances_transaction BEGIN
+        INSERT INTO finances_transaction_fts(rowid, name, category) VALUES (new.id, new.name, new.category);
+    END
+    """,
+    """
+    CREATE TRIGGER IF NOT EXISTS finances_transaction_fts_delete AFTER DELETE ON finances_transaction BEGIN
+        INSERT INTO finances_transaction_fts(finances_transaction_fts, rowid, name, category)
+        VALUES ('delete', old.id, old.name, old.category);
+    END
+    """,
+    """
+    CREATE TRIGGER IF NOT EXISTS finances_transaction_fts_update AFTER UPDATE OF name, category ON finances_transaction BEGIN
+        INSERT INTO finances_transaction_fts(finances_transaction_fts, rowid, name, category)
+        VALUES ('delete', old.id, old.name, old.category);
+        INSERT INTO finances_transaction_fts(rowid, name, category) VALUES (new.id, new.name, new.category);
+    END
+    """,
+    # Index whatever the table already holds
+    "INSERT INTO finances_transaction_fts(finances_transaction_fts) VALUES ('rebuild')",
+]
+
+SQLITE_UNINSTALL = [
+    "DROP TRIGGER IF EXISTS finances_transaction_fts_insert",
+    "DROP TRIGGER IF EXISTS finances_transaction_fts_delete",
+    "DROP TRIGGER IF EXISTS finances_transaction_fts_update",
+    "DROP TABLE IF EXISTS finances_transaction_fts",
+]
+
+# The 'simple' configuration does not stem, which suits merchant names
+POSTGRES_INSTALL = [
+    """
+    ALTER TABLE finances_transaction ADD COLUMN IF NOT EXISTS search_vector tsvector
+    GENERATED ALWAYS AS (to_tsvector('simple', coalesce(name, '') || ' ' || coalesce(category, ''))) STORED
+    """,
+    "CREATE INDEX IF NOT EXISTS txn_search_vector_idx ON finances_transaction USING GIN (search_vector)",
+]
+
+POSTGRES_UNINSTALL = [
+    "DROP INDEX IF EXISTS txn_search_vector_idx",
+    "ALTER TABLE finances_transaction DROP COLUMN IF EXISTS search_vector",
+]
+
+INSTALL = {'sqlite': SQLITE_INSTALL, 'postgresql': POSTGRES_INSTALL}
+UNINSTALL = {'sqlite': SQLITE_UNINSTALL, 'postgresql': POSTGRES_UNINSTALL}
+
+
+def run(schema_editor, statements):
+    with schema_editor.connection.cursor() as cursor:
+        for sql in statements.get(schema_editor.connection.vendor, []):
+            cursor.execute(sql)
+
+
+def install_search_index(apps, schema_editor):
+    run(schema_editor, INSTALL)
+
+
+def uninstall_search_index(apps, schema_editor):
+    run(schema_editor, UNINSTALL)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('finances', '0008_daily_rollup'),
+    ]
+
+    operations = [
+        migrations.RunPython(install_search_index, uninstall_search_index),
+    ]
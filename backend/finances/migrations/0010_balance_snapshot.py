@@ -0,0 +1,39 @@
+# Generated by Django 5.2 on 2026-10-17 13:42
+
+import django.db.models.deletion
+import django.utils.timezone
+from django.db import migrations, models
+
+
+def snapshot_current_balances(apps, schema_editor):
+    """Start every account's history with the balance it holds now"""
+    Account = apps.get_model('finances', 'Account')
+    BalanceSnapshot = apps.get_model('finances', 'BalanceSnapshot')
+    accounts = Account.objects.filter(current_balance__isnull=False).values_list('id', 'current_balance')
+    BalanceSnapshot.objects.bulk_create(
+        (BalanceSnapshot(account_id=account_id, balance=balance) for account_id, balance in accounts.iterator()),
+        batch_size=1000,
+    )
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('finances', '0009_transaction_search'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='BalanceSnapshot',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('taken_at', models.DateTimeField(default=django.utils.timezone.now)),
+                ('balance', models.DecimalField(decimal_places=2, max_digits=12)),
+                ('account', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='balance_snapshots', to='finances.account')),
+            ],
+            options={
+                'indexes': [models.Index(fields=['account', 'taken_at'], name='balance_account_time_idx')],
+            },
+        ),
+        migrations.RunPython(snapshot_current_balances, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,121 @@
+# Generated by Django 5.2 on 2026-10-17 13:49
+
+import re
+
+import django.db.models.deletion
+from django.conf import settings
+from django.db import migrations, models
+
+# Frozen copies of finances.search's SQLite triggers and of
+# finances.recurring.normalize_merchant as of this migration, so later edits
+# to those modules cannot change what it does
+SEARCH_TRIGGERS = [
+    """
+    CREATE TRIGGER IF NOT EXISTS finances_transaction_fts_insert AFTER INSERT ON finances_transaction BEGIN
+        INSERT INTO finances_transaction_fts(rowid, name, category) VALUES (new.id, new.name, new.category);
+    END
+    """,
+    """
+    CREATE TRIGGER IF NOT EXISTS finances_transaction_fts_delete AFTER DELETE ON finances_transaction BEGIN
+        INSERT INTO finances_transaction_fts(finances_transaction_fts, rowid, name, category)
+        VALUES ('delete', old.id, old.name, old.category);
+    END
+    """,
+    """
+    CREATE TRIGGER IF NOT EXISTS finances_transaction_fts_update AFTER UPDATE OF name, category ON finances_transaction BEGIN
+        INSERT INTO finances_transaction_fts(finances_transaction_fts, rowid, name, category)
+        VALUES ('delete', old.id, old.name, old.category);
+        INSERT INTO finances_transaction_fts(rowid, name, category) VALUES (new.id, new.name, new.category);
+    END
+    """,
+]
+
+PREFIXES = re.compile(r'^(?:sq|tst|sp|pp|paypal|py|in|dd|ach)\s*\*\s*')
+SEPARATORS = re.compile(r"[^a-z0-9&']+")
+SUFFIXES = {'com', 'net', 'inc', 'llc', 'ltd', 'co', 'corp', 'us', 'usa', 'www'}
+
+
+def normalize_merchant(name):
+    if not name:
+        return ''
+    key = PREFIXES.sub('', name.lower().strip())
+    words = [
+        word for word in SEPARATORS.split(key)
+        if len(word) > 1 and word not in SUFFIXES and not any(char.isdigit() for char in word)
+    ]
+    return ' '.join(words)[:255] or name.lower().strip()[:255]
+
+
+def reinstall_search_index(apps, schema_editor):
+    # Adding the merchant column rebuilds the SQLite table, dropping the search
+    # triggers; the rows keep their ids, so the FTS table itself stays valid
+    if schema_editor.connection.vendor != 'sqlite':
+        return
+    with schema_editor.connection.cursor() as cursor:
+        for sql in SEARCH_TRIGGERS:
+            cursor.execute(sql)
+
+
+def fill_merchants(apps, schema_editor):
+    """Derive the merchant of existing transactions from their names, one UPDATE per merchant and 1000 rows"""
+    Transaction = apps.get_model('finances', 'Transaction')
+    ids_by_merchant = {}
+    for transaction_id, name in Transaction.objects.order_by().values_list('id', 'name').iterator():
+        ids_by_merchant.setdefault(normalize_merchant(name), []).append(transaction_id)
+    for merchant, ids in ids_by_merchant.items():
+        if not merchant:
+            continue
+        for start in range(0, len(ids), 1000):
+            Transaction.objects.filter(id__in=ids[start:start + 1000]).update(merchant=merchant)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('finances', '0010_balance_snapshot'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='RecurringCharge',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('merchant', models.CharField(max_length=255)),
+                ('name', models.CharField(max_length=255)),
+                ('frequency', models.CharField(choices=[('weekly', 'Weekly'), ('monthly', 'Monthly'), ('annual', 'Annual')], max_length=10)),
+                ('amount', models.DecimalField(decimal_places=2, max_digits=12)),
+                ('last_amount', models.DecimalField(decimal_places=2, max_digits=12)),
+                ('occurrences', models.PositiveIntegerField()),
+                ('first_date', models.DateField()),
+                ('last_date', models.DateField()),
+                ('next_date', models.DateField()),
+                ('confidence', models.FloatField()),
+            ],
+        ),
+        migrations.AddField(
+            model_name='transaction',
+            name='merchant',
+            field=models.CharField(blank=True, default='', max_length=255),
+        ),
+        migrations.RunPython(reinstall_search_index, migrations.RunPython.noop),
+        migrations.AddIndex(
+            model_name='transaction',
+            index=models.Index(fields=['account', 'merchant', '-date', '-id'], name='txn_account_merchant_idx'),
+        ),
+        migrations.AddField(
+            model_name='recurringcharge',
+            name='account',
+            field=models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.SET_NULL, related_name='recurring_charges', to='finances.account'),
+        ),
+        migrations.AddField(
+            model_name='recurringcharge',
+            name='user',
+            field=models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='recurring_charges', to=settings.AUTH_USER_MODEL),
+        ),
+        migrations.AddConstraint(
+            model_name='recurringcharge',
+            constraint=models.UniqueConstraint(fields=('user', 'merchant'), name='unique_recurring_merchant'),
+        ),
+        migrations.RunPython(fill_merchants, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,47 @@
+# Generated by Django 5.2 on 2026-10-17 15:02
+
+from django.db import migrations, models
+from django.db.models import Max
+from django.db.models.functions import Abs
+
+
+def fill_largest_amounts(apps, schema_editor):
+    """Store each existing rollup's largest absolute transaction amount"""
+    DailyRollup = apps.get_model('finances', 'DailyRollup')
+    Transaction = apps.get_model('finances', 'Transaction')
+
+    largest = {
+        (row['account_id'], row['date'], row['category']): row['largest_amount']
+        for row in (
+            Transaction.objects
+            .order_by()
+            .values('account_id', 'date', 'category')
+            .annotate(largest_amount=Max(Abs('amount')))
+            .iterator()
+        )
+    }
+    batch = []
+    for rollup in DailyRollup.objects.iterator():
+        rollup.largest_amount = largest.get((rollup.account_id, rollup.date, rollup.category), 0)
+        batch.append(rollup)
+        if len(batch) >= 1000:
+            DailyRollup.objects.bulk_update(batch, ['largest_amount'])
+            batch = []
+    if batch:
+        DailyRollup.objects.bulk_update(batch, ['largest_amount'])
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('finances', '0013_merchant_activity'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='dailyrollup',
+            name='largest_amount',
+            field=models.DecimalField(decimal_places=2, default=0, max_digits=12),
+        ),
+        migrations.RunPython(fill_largest_amounts, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,26 @@
+# Generated by Django 5.2 on 2026-10-17 14:42
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('finances', '0014_dailyrollup_largest_amount'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='TransactionSearchEntry',
+            fields=[
+                ('transaction', models.OneToOneField(db_column='rowid', db_constraint=False, on_delete=django.db.models.deletion.DO_NOTHING, primary_key=True, related_name='search_entry', serialize=False, to='finances.transaction')),
+                ('document', models.TextField(db_column='finances_transaction_fts')),
+                ('rank', models.FloatField()),
+            ],
+            options={
+                'db_table': 'finances_transaction_fts',
+                'managed': False,
+            },
+        ),
+    ]
@@ -0,0 +1,81 @@
+import json
+import os
+import threading
+
+from django.conf import settings
+
+# Parsed mock dataset for this process, reloaded only when the file changes.
+# Rows are kept as pre-encoded JSON fragments (each object minus its closing
+# brace) so requests can be answered, with or without an account_id stamp,
+# without re-parsing, copying or mutating any shared dicts.
+_dataset = None
+_dataset_lock = threading.Lock()
+
+
+class MockDataset:
+    def __init__(self, signature, fragments):
+        self.signature = signature
+        self.fragments = fragments
+        self._body = None
+
+    def __len__(self):
+        return len(self.fragments)
+
+    def render(self, account_id=None):
+        """Return the dataset as a JSON array, optionally stamping account_id on every row"""
+        if account_id is None:
+            # The unstamped body is identical for every request, so build it once
+            if self._body is None:
+                self._body = self._join(b'}')
+            return self._body
+        return self._join(b',"account_id":' + json.dumps(account_id).encode() + b'}')
+
+    def _join(self, suffix):
+        # An empty object encodes to a bare '{', which must not get a leading comma
+        empty_row = b'{' + suffix.lstrip(b',')
+        return b'[' + b','.join(
+            fragment + suffix if fragment != b'{' else empty_row
+            for fragment in self.fragments
+        ) + b']'
+
+
+def get_mock_file_path():
+    return settings.MOCK_TRANSACTIONS_FILE
+
+
+def _signature(path):
+    stat = os.stat(path)
+    return stat.st_mtime_ns, stat.st_size
+
+
+def _load(path, signature):
+    with open(path, 'rb') as f:
+        rows = json.load(f)
+    fragments = [json.dumps(row, separators=(',', ':')).encode()[:-1] for row in rows]
+    return MockDataset(signature, fragments)
+
+
+def get_mock_dataset(path=None):
+    """
+    Return the cached MockDataset for the mock transactions file, re-reading
+    it only when its mtime or size has changed. Raises FileNotFoundError if
+    the file does not exist.
+    """
+    global _dataset
+    path = path or get_mock_file_path()
+    signature = (path,) + _signature(path)
+
+    dataset = _dataset
+    if dataset is not None and dataset.signature == signature:
+        return dataset
+
+    with _dataset_lock:
+        if _dataset is None or _dataset.signature != signature:
+            _dataset = _load(path, signature)
+        return _dataset
+
+
+def reset_mock_dataset():
+    global _dataset
+    with _dataset_lock:
+        _dataset = None
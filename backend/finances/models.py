@@ -1,13 +1,32 @@
 from django.db import models
 from django.contrib.auth.models import User
+from django.utils import timezone
 
 # Create your models here.
 
+class Institution(models.Model):
+    """Plaid institution metadata, shared by every item linked to that institution"""
+    institution_id = models.CharField(max_length=255, unique=True)
+    name = models.CharField(max_length=255)
+    url = models.CharField(max_length=255, blank=True)
+    # When the metadata was last fetched from Plaid; null means never refresh
+    fetched_at = models.DateTimeField(null=True, blank=True)
+    
+    def __str__(self):
+        return self.name
+
 class PlaidItem(models.Model):
     user = models.ForeignKey(User, on_delete=models.CASCADE)
     item_id = models.CharField(max_length=255)
     access_token = models.CharField(max_length=255)
-    institution_name = models.CharField(max_length=255, blank=True)
+    institution = models.ForeignKey(Institution, on_delete=models.SET_NULL, null=True, blank=True, related_name='items')
+    # Plaid /transactions/sync cursor; empty until the first sync completes
+    sync_cursor = models.TextField(blank=True, default='')
+    last_synced_at = models.DateTimeField(null=True, blank=True)
+    
+    @property
+    def institution_name(self):
+        return self.institution.name if self.institution else ''
     
     def __str__(self):
         return f"{self.user.username} - {self.institution_name}"
@@ -19,9 +38,35 @@ class Account(models.Model):
     type = models.CharField(max_length=50)
     subtype = models.CharField(max_length=50, null=True, blank=True)
     current_balance = models.DecimalField(max_digits=12, decimal_places=2, null=True)
+    # Set while a background unlink deletes the account's transactions; hidden from reads
+    unlinking = models.BooleanField(default=False)
     
     def __str__(self):
         return f"{self.name} ({self.type})"
+    
+    class Meta:
+        constraints = [
+            models.UniqueConstraint(fields=['plaid_item', 'account_id'], name='unique_item_account'),
+        ]
+
+class BalanceSnapshot(models.Model):
+    """
+    An account's balance from taken_at on. Append-only: ingestion adds a row
+    only when the balance differs from the account's latest snapshot, so the
+    balance at any moment is that of the latest snapshot taken before it.
+    """
+    account = models.ForeignKey(Account, on_delete=models.CASCADE, related_name='balance_snapshots')
+    taken_at = models.DateTimeField(default=timezone.now)
+    balance = models.DecimalField(max_digits=12, decimal_places=2)
+    
+    def __str__(self):
+        return f"{self.account_id} {self.balance} at {self.taken_at}"
+    
+    class Meta:
+        indexes = [
+            # Latest snapshot per account, and each account's snapshots in a date range
+            models.Index(fields=['account', 'taken_at'], name='balance_account_time_idx'),
+        ]
 
 class Transaction(models.Model):
     account = models.ForeignKey(Account, on_delete=models.CASCADE, related_name='transactions')
@@ -31,9 +76,178 @@ class Transaction(models.Model):
     amount = models.DecimalField(max_digits=12, decimal_places=2)
     category = models.CharField(max_length=100, null=True, blank=True)
     pending = models.BooleanField(default=False)
+    # Normalized merchant name that recurring charge detection groups by
+    merchant = models.CharField(max_length=255, blank=True, default='')
     
     def __str__(self):
         return f"{self.name} - ${self.amount} on {self.date}"
     
     class Meta:
         ordering = ['-date']
+        indexes = [
+            # TransactionsList/analytics: account + date range, newest first, keyset on (date, id)
+            models.Index(fields=['account', '-date', '-id'], name='txn_account_date_idx'),
+            # TransactionsList with a category filter
+            models.Index(fields=['account', 'category', '-date'], name='txn_account_category_idx'),
+            # Recurring charge detection: per-merchant counts and a merchant's latest charges
+            models.Index(fields=['account', 'merchant', '-date', '-id'], name='txn_account_merchant_idx'),
+        ]
+        constraints = [
+            models.UniqueConstraint(fields=['account', 'transaction_id'], name='unique_account_transaction'),
+        ]
+
+class TransactionSearchEntry(models.Model):
+    """
+    A row of the SQLite full-text index over transaction names and categories.
+    The FTS5 table and its triggers are created by finances.search rather
+    than by migrations; this model only lets queries join it.
+    """
+    transaction = models.OneToOneField(
+        Transaction, on_delete=models.DO_NOTHING, primary_key=True, db_column='rowid',
+        db_constraint=False, related_name='search_entry',
+    )
+    # FTS5's hidden column named after the table, the left side of a MATCH
+    document = models.TextField(db_column='finances_transaction_fts')
+    # bm25() score of the current MATCH; lower is a better match
+    rank = models.FloatField()
+    
+    class Meta:
+        managed = False
+        db_table = 'finances_transaction_fts'
+
+class DailyRollup(models.Model):
+    """
+    Income, expenses and transaction count per account, day and category.
+    Maintained by finances.rollups whenever ingestion writes transactions.
+    """
+    account = models.ForeignKey(Account, on_delete=models.CASCADE, related_name='daily_rollups')
+    date = models.DateField()
+    category = models.CharField(max_length=100, null=True, blank=True)
+    # Absolute totals: Plaid inflows are negative amounts, outflows positive
+    income = models.DecimalField(max_digits=14, decimal_places=2, default=0)
+    expenses = models.DecimalField(max_digits=14, decimal_places=2, default=0)
+    count = models.PositiveIntegerField(default=0)
+    # Largest absolute amount among the rows, so the summary's largest
+    # transaction is found without sorting every transaction
+    largest_amount = models.DecimalField(max_digits=12, decimal_places=2, default=0)
+    
+    def __str__(self):
+        return f"{self.account_id} {self.date} {self.category}"
+    
+    class Meta:
+        constraints = [
+            models.UniqueConstraint(fields=['account', 'date', 'category'], name='unique_daily_rollup'),
+        ]
+
+class MerchantActivity(models.Model):
+    """
+    What recurring charge detection knows about one of the user's merchants:
+    how often and since when it was charged, and its latest posted outflows.
+    Maintained by finances.recurring, so a sync that only adds transactions
+    updates it without reading the merchant's history again.
+    """
+    user = models.ForeignKey(User, on_delete=models.CASCADE, related_name='merchant_activity')
+    merchant = models.CharField(max_length=255)
+    # Transactions with the merchant in total, and the date of the first
+    occurrences = models.PositiveIntegerField()
+    first_date = models.DateField()
+    # Up to recurring.RECENT_CHARGES [date, id, amount, name, account id] lists, newest first
+    recent_charges = models.JSONField(default=list)
+    
+    def __str__(self):
+        return f"{self.user_id} {self.merchant}"
+    
+    class Meta:
+        constraints = [
+            models.UniqueConstraint(fields=['user', 'merchant'], name='unique_merchant_activity'),
+        ]
+
+class RecurringCharge(models.Model):
+    """
+    A merchant the user pays on a weekly, monthly or annual schedule.
+    Maintained by finances.recurring whenever ingestion writes transactions.
+    """
+    WEEKLY = 'weekly'
+    MONTHLY = 'monthly'
+    ANNUAL = 'annual'
+    FREQUENCY_CHOICES = [
+        (WEEKLY, 'Weekly'),
+        (MONTHLY, 'Monthly'),
+        (ANNUAL, 'Annual'),
+    ]
+    
+    user = models.ForeignKey(User, on_delete=models.CASCADE, related_name='recurring_charges')
+    # The account the latest charge was made from
+    account = models.ForeignKey(Account, on_delete=models.SET_NULL, null=True, blank=True, related_name='recurring_charges')
+    merchant = models.CharField(max_length=255)
+    # The latest charge's transaction name
+    name = models.CharField(max_length=255)
+    frequency = models.CharField(max_length=10, choices=FREQUENCY_CHOICES)
+    # Typical (median) amount of the recent charges
+    amount = models.DecimalField(max_digits=12, decimal_places=2)
+    last_amount = models.DecimalField(max_digits=12, decimal_places=2)
+    # Transactions with the merchant in total, and the date of the first
+    occurrences = models.PositiveIntegerField()
+    first_date = models.DateField()
+    last_date = models.DateField()
+    next_date = models.DateField()
+    # Share of regular intervals times share of steady amounts, from 0 to 1
+    confidence = models.FloatField()
+    
+    def __str__(self):
+        return f"{self.user_id} {self.merchant} {self.frequency}"
+    
+    class Meta:
+        constraints = [
+            models.UniqueConstraint(fields=['user', 'merchant'], name='unique_recurring_merchant'),
+        ]
+
+class DataVersion(models.Model):
+    """
+    A token that changes whenever any of the user's finance data does. The
+    response cache keys and ETags embed it; it lives in the database so a
+    bump by a job worker process is seen by every web process.
+    """
+    user = models.OneToOneField(User, on_delete=models.CASCADE, primary_key=True, related_name='data_version')
+    version = models.CharField(max_length=32)
+    
+    def __str__(self):
+        return f"{self.user_id} {self.version}"
+
+class Job(models.Model):
+    """A unit of background work picked up by the run_jobs worker processes"""
+    QUEUED = 'queued'
+    RUNNING = 'running'
+    SUCCEEDED = 'succeeded'
+    FAILED = 'failed'
+    STATUS_CHOICES = [
+        (QUEUED, 'Queued'),
+        (RUNNING, 'Running'),
+        (SUCCEEDED, 'Succeeded'),
+        (FAILED, 'Failed'),
+    ]
+    
+    user = models.ForeignKey(User, on_delete=models.CASCADE, related_name='jobs')
+    # Kept when the item is deleted so unlink jobs can still report their status
+    plaid_item = models.ForeignKey(PlaidItem, on_delete=models.SET_NULL, null=True, blank=True, related_name='jobs')
+    kind = models.CharField(max_length=50)
+    params = models.JSONField(default=dict, blank=True)
+    status = models.CharField(max_length=20, choices=STATUS_CHOICES, default=QUEUED)
+    attempts = models.PositiveIntegerField(default=0)
+    run_after = models.DateTimeField(default=timezone.now)
+    locked_by = models.CharField(max_length=100, blank=True)
+    # Renewed by the running worker's heartbeat; expired leases are requeued
+    lease_expires_at = models.DateTimeField(null=True, blank=True)
+    last_error = models.TextField(blank=True)
+    result = models.JSONField(null=True, blank=True)
+    created_at = models.DateTimeField(auto_now_add=True)
+    updated_at = models.DateTimeField(auto_now=True)
+    
+    def __str__(self):
+        return f"{self.kind} #{self.id} ({self.status})"
+    
+    class Meta:
+        indexes = [
+            # Workers claim the oldest due job in the queue
+            models.Index(fields=['status', 'run_after'], name='job_queue_idx'),
+        ]
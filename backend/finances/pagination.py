@@ -0,0 +1,91 @@
+import base64
+import datetime
+
+from django.db.models import Q
+from rest_framework.exceptions import ValidationError
+from rest_framework.pagination import BasePagination
+from rest_framework.response import Response
+
+
+class TransactionKeysetPagination(BasePagination):
+    """
+    Opt-in keyset pagination over (date, id), newest first.
+
+    Pagination is enabled by passing `limit` (or a `cursor` from a previous
+    page). Each page seeks directly past the last row of the previous one,
+    so deep pages cost the same as the first page.
+    """
+    limit_query_param = 'limit'
+    cursor_query_param = 'cursor'
+    default_limit = 100
+    max_limit = 1000
+
+    def is_requested(self, request):
+        params = request.query_params
+        return self.limit_query_param in params or self.cursor_query_param in params
+
+    def get_limit(self, request):
+        value = request.query_params.get(self.limit_query_param)
+        if value is None:
+            return self.default_limit
+        try:
+            limit = int(value)
+        except ValueError:
+            raise ValidationError({'limit': 'Must be a positive integer'})
+        if limit < 1:
+            raise ValidationError({'limit': 'Must be a positive integer'})
+        return min(limit, self.max_limit)
+
+    def encode_cursor(self, date, pk):
+        raw = f"{date.isoformat()}|{pk}".encode()
+        return base64.urlsafe_b64encode(raw).decode().rstrip('=')
+
+    def decode_cursor(self, cursor):
+        try:
+            padded = cursor + '=' * (-len(cursor) % 4)
+            date, pk = base64.urlsafe_b64decode(padded).decode().split('|')
+            date, pk = datetime.date.fromisoformat(date), int(pk)
+        except (ValueError, UnicodeDecodeError):
+            raise ValidationError({'cursor': 'Invalid cursor'})
+        # Ids beyond a 64-bit integer would overflow the database driver
+        if not 0 < pk < 2 ** 63:
+            raise ValidationError({'cursor': 'Invalid cursor'})
+        return date, pk
+
+    def row_key(self, row):
+        # Rows are model instances or .values() dicts
+        if isinstance(row, dict):
+            return row['date'], row['id']
+        return row.date, row.id
+
+    def page_queryset(self, queryset, request):
+        """The slice of `queryset` holding the requested page, plus one row"""
+        self.limit = self.get_limit(request)
+        cursor = request.query_params.get(self.cursor_query_param)
+
+        queryset = queryset.order_by('-date', '-id')
+        if cursor:
+            date, pk = self.decode_cursor(cursor)
+            queryset = queryset.filter(Q(date__lt=date) | Q(date=date, id__lt=pk))
+
+        # Fetch one extra row to learn whether another page exists
+        return queryset[:self.limit + 1]
+
+    def paginate_queryset(self, queryset, request, view=None):
+        return self._page(list(self.page_queryset(queryset, request)))
+
+    async def apaginate_queryset(self, queryset, request, view=None):
+        """paginate_queryset() for async views, fetching the page with the async ORM"""
+        return self._page([row async for row in self.page_queryset(queryset, request)])
+
+    def _page(self, rows):
+        self.has_next = len(rows) > self.limit
+        rows = rows[:self.limit]
+        self.next_cursor = self.encode_cursor(*self.row_key(rows[-1])) if self.has_next else None
+        return rows
+
+    def get_paginated_response(self, data):
+        return Response({
+            'results': data,
+            'next': self.next_cursor,
+        })
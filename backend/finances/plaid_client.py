@@ -1,52 +1,206 @@
 import plaid
 from plaid.api import plaid_api
+import asyncio
+import concurrent.futures
+import contextvars
+import functools
 import os
+import threading
+import time
+import urllib3
 from django.conf import settings
 
-def get_plaid_client():
-    """
-    Create and return a Plaid API client instance.
-    Uses environment variables for configuration.
-    """
-    client_id = settings.PLAID_CLIENT_ID
-    secret = settings.PLAID_SECRET
+from . import metrics
+
+# One PlaidApi per process, shared by every request thread. urllib3's pool
+# manager is thread-safe, so TLS connections to Plaid are reused across
+# requests instead of being re-established each time.
+_client = None
+_client_lock = threading.Lock()
+
+# Threads that run Plaid calls for async views. Sized like the connection
+# pool, so concurrent calls queue here instead of opening connections the
+# pool would discard.
+_executor = None
+
+# Per-endpoint latency counters, keyed by Plaid path (e.g. '/transactions/sync')
+_latency = {}
+_latency_lock = threading.Lock()
+
+
+class InstrumentedApiClient(plaid.ApiClient):
+    """ApiClient that applies default timeouts and records per-endpoint latency"""
+
+    def __init__(self, configuration, request_timeout=None):
+        super().__init__(configuration)
+        self.request_timeout = request_timeout
+
+    def call_api(self, resource_path, method, *args, **kwargs):
+        if kwargs.get('_request_timeout') is None:
+            kwargs['_request_timeout'] = self.request_timeout
+
+        started = time.perf_counter()
+        failed = False
+        try:
+            return super().call_api(resource_path, method, *args, **kwargs)
+        except Exception:
+            failed = True
+            raise
+        finally:
+            seconds = time.perf_counter() - started
+            record_latency(resource_path, seconds, failed)
+            metrics.record_plaid_call(seconds)
+
+
+def record_latency(endpoint, seconds, failed=False):
+    with _latency_lock:
+        stats = _latency.setdefault(endpoint, {'count': 0, 'errors': 0, 'total_seconds': 0.0, 'max_seconds': 0.0})
+        stats['count'] += 1
+        stats['errors'] += int(failed)
+        stats['total_seconds'] += seconds
+        stats['max_seconds'] = max(stats['max_seconds'], seconds)
+
+
+def get_latency_stats():
+    """Snapshot of the per-endpoint call counts and latencies for this process"""
+    with _latency_lock:
+        return {endpoint: dict(stats) for endpoint, stats in _latency.items()}
+
+
+def reset_latency_stats():
+    with _latency_lock:
+        _latency.clear()
+
+
+def get_plaid_host():
+    """Resolve the Plaid API host from PLAID_API_HOST or PLAID_ENV"""
+    if settings.PLAID_API_HOST:
+        return settings.PLAID_API_HOST
+
     environment = settings.PLAID_ENV
-    
-    # print(f"PLAID_CLIENT_ID: {client_id}")
-    # print(f"PLAID_SECRET: {secret}")
-    # print(f"PLAID_ENV: {environment}")
-    
+
     # Determine the Plaid environment
     if environment == 'sandbox':
-        host = plaid.Environment.Sandbox
+        return plaid.Environment.Sandbox
     elif environment == 'development':
-        host = plaid.Environment.Development
+        return plaid.Environment.Development
     elif environment == 'production':
-        host = plaid.Environment.Production
+        return plaid.Environment.Production
+    elif environment == 'local':
+        # Fake Plaid server from `manage.py run_fake_plaid`
+        return settings.PLAID_LOCAL_URL
     else:
         # Default to Sandbox if not specified
-        host = plaid.Environment.Sandbox
-    
+        return plaid.Environment.Sandbox
+
+
+def build_plaid_client():
+    """
+    Create a new Plaid API client instance from the PLAID_* settings.
+    Most callers want the shared instance from get_plaid_client() instead.
+    """
+    # The local fake server accepts any credentials, so none need to be configured
+    placeholder = 'local' if settings.PLAID_ENV == 'local' else None
+
     # Configure the Plaid client
     configuration = plaid.Configuration(
-        host=host,
+        host=get_plaid_host(),
         api_key={
-            'clientId': client_id,
-            'secret': secret,
+            'clientId': settings.PLAID_CLIENT_ID or placeholder,
+            'secret': settings.PLAID_SECRET or placeholder,
         }
     )
-    
-    # Create API client with proper configurations
-    api_client = plaid.ApiClient(configuration)
-    
-    # WARNING: This disables SSL certificate verification and should NOT be used in production
+    configuration.connection_pool_maxsize = settings.PLAID_POOL_MAXSIZE
+    # Plaid's API is POST-only and calls such as /item/public_token/exchange,
+    # /item/remove and /link/token/create are not idempotent, so only retry
+    # what Plaid cannot have acted on: connections that never opened, and 429s
+    # (after their Retry-After). Read errors and 5xx surface to the caller;
+    # job handlers schedule their own retries.
+    configuration.retries = urllib3.Retry(
+        total=None,
+        connect=settings.PLAID_MAX_RETRIES,
+        read=0,
+        other=0,
+        status=settings.PLAID_RATE_LIMIT_RETRIES,
+        status_forcelist=[429],
+        allowed_methods=None,
+        backoff_factor=settings.PLAID_RETRY_BACKOFF,
+        raise_on_status=False,
+        respect_retry_after_header=True,
+    )
+
+    # WARNING: Disabling SSL certificate verification should NOT be done in production
     # This is a major security risk in production environments
-    api_client.rest_client.pool_manager.connection_pool_kw['cert_reqs'] = 'CERT_NONE'
-    
+    configuration.verify_ssl = settings.PLAID_VERIFY_SSL
+
+    # Create API client with proper configurations
+    api_client = InstrumentedApiClient(
+        configuration,
+        request_timeout=(settings.PLAID_CONNECT_TIMEOUT, settings.PLAID_READ_TIMEOUT),
+    )
+
     # Fix header handling - ensure all default headers have string values
     default_headers = api_client.default_headers
     for key in list(default_headers.keys()):
         if default_headers[key] is None:
             default_headers.pop(key)
-    
-    return plaid_api.PlaidApi(api_client) 
\ No newline at end of file
+
+    return plaid_api.PlaidApi(api_client)
+
+
+def get_plaid_client():
+    """
+    Return the process-wide Plaid API client, creating it on first use.
+    Uses environment variables for configuration.
+    """
+    global _client
+    if _client is None:
+        with _client_lock:
+            if _client is None:
+                _client = build_plaid_client()
+    return _client
+
+
+def get_plaid_executor():
+    """Return the process-wide thread pool that async views run Plaid calls on"""
+    global _executor
+    if _executor is None:
+        with _client_lock:
+            if _executor is None:
+                _executor = concurrent.futures.ThreadPoolExecutor(
+                    max_workers=settings.PLAID_POOL_MAXSIZE, thread_name_prefix='plaid'
+                )
+    return _executor
+
+
+async def call_async(method, *args, **kwargs):
+    """
+    Await a blocking Plaid client call (e.g. client.link_token_create) run on
+    the Plaid thread pool, so a slow Plaid response never blocks the event
+    loop. The call sees the caller's context, so its time still counts
+    towards the current request's metrics.
+    """
+    context = contextvars.copy_context()
+    return await asyncio.get_running_loop().run_in_executor(
+        get_plaid_executor(), functools.partial(context.run, method, *args, **kwargs)
+    )
+
+
+def reset_plaid_client():
+    """Drop the shared client so the next call rebuilds it (after settings change or fork)"""
+    global _client
+    with _client_lock:
+        _client = None
+
+
+def _reset_after_fork():
+    # A forked worker must not share the parent's pooled sockets or locks
+    global _client, _client_lock, _latency_lock, _executor
+    _client = None
+    _executor = None
+    _client_lock = threading.Lock()
+    _latency_lock = threading.Lock()
+
+
+if hasattr(os, 'register_at_fork'):
+    os.register_at_fork(after_in_child=_reset_after_fork)
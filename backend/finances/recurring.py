@@ -0,0 +1,278 @@
+import calendar
+import datetime
+import re
+import statistics
+from decimal import Decimal
+
+from django.conf import settings
+from django.db import transaction as db_transaction
+from django.db.models import Count, F, Min, Window
+from django.db.models.functions import RowNumber
+
+from .cache import bump_data_version
+from .models import Account, MerchantActivity, RecurringCharge, Transaction
+
+# Recurring charges are found per user and normalized merchant, from the
+# merchant's latest RECENT_CHARGES outflows: the gaps between consecutive
+# charge dates must match a weekly, monthly or annual cadence and the amounts
+# must hold steady. Each merchant's count, first date and latest charges are
+# kept in a MerchantActivity row. A sync that only adds transactions merges
+# them into those rows without reading any history; merchants a modification
+# or removal touched are re-read, all of them in two queries per batch off
+# the (account, merchant, date) index.
+
+RECENT_CHARGES = 12
+
+# frequency -> (period in days, allowed deviation of a gap in days, charges needed)
+FREQUENCIES = {
+    RecurringCharge.WEEKLY: (7, 1, 4),
+    RecurringCharge.MONTHLY: (30.44, 4, 3),
+    RecurringCharge.ANNUAL: (365.25, 10, 2),
+}
+
+# Share of gaps that must match the cadence, and of amounts close to the typical one
+MIN_REGULARITY = 0.75
+# An amount is close when within this fraction of the typical amount (or AMOUNT_SLACK dollars)
+AMOUNT_TOLERANCE = Decimal('0.2')
+AMOUNT_SLACK = Decimal(2)
+CENTS = Decimal('0.01')
+
+# Card processor prefixes ("SQ *BLUE BOTTLE", "PAYPAL *SPOTIFY") and the
+# legal or web suffixes that vary between charges of the same merchant
+_PREFIXES = re.compile(r'^(?:sq|tst|sp|pp|paypal|py|in|dd|ach)\s*\*\s*')
+_SEPARATORS = re.compile(r"[^a-z0-9&']+")
+_SUFFIXES = {'com', 'net', 'inc', 'llc', 'ltd', 'co', 'corp', 'us', 'usa', 'www'}
+
+
+def normalize_merchant(name):
+    """
+    A grouping key for a merchant name, ignoring case, processor prefixes,
+    punctuation, legal suffixes, and words with digits (store numbers, dates,
+    phone numbers and reference codes)
+    """
+    if not name:
+        return ''
+    key = _PREFIXES.sub('', name.lower().strip())
+    words = [
+        word for word in _SEPARATORS.split(key)
+        if len(word) > 1 and word not in _SUFFIXES and not any(char.isdigit() for char in word)
+    ]
+    return ' '.join(words)[:255] or name.lower().strip()[:255]
+
+
+def touched_merchants(transactions):
+    """The merchants currently charged by a transaction queryset"""
+    return set(transactions.order_by().values_list('merchant', flat=True).distinct())
+
+
+def _within(value, target, tolerance):
+    return abs(value - target) <= tolerance
+
+
+def _next_date(last_date, frequency):
+    """The expected date of the charge after last_date"""
+    if frequency == RecurringCharge.WEEKLY:
+        return last_date + datetime.timedelta(days=7)
+    if frequency == RecurringCharge.MONTHLY:
+        year, month = last_date.year + last_date.month // 12, last_date.month % 12 + 1
+    else:
+        year, month = last_date.year + 1, last_date.month
+    return last_date.replace(year=year, month=month, day=min(last_date.day, calendar.monthrange(year, month)[1]))
+
+
+def detect(charges):
+    """
+    Classify one merchant's charges, (date, Decimal amount) pairs oldest
+    first, as weekly, monthly or annual. Returns (frequency, typical amount,
+    confidence) or None when the charges are not regular enough.
+    """
+    if len(charges) < 2:
+        return None
+    ordinals = [date.toordinal() for date, _ in charges]
+    gaps = [later - earlier for earlier, later in zip(ordinals, ordinals[1:])]
+    typical_gap = statistics.median(gaps)
+
+    for frequency, (period, tolerance, needed) in FREQUENCIES.items():
+        if len(charges) < needed or not _within(typical_gap, period, tolerance):
+            continue
+        regularity = sum(_within(gap, period, tolerance) for gap in gaps) / len(gaps)
+        amounts = [amount for _, amount in charges]
+        typical_amount = statistics.median(amounts)
+        allowed = max(abs(typical_amount) * AMOUNT_TOLERANCE, AMOUNT_SLACK)
+        consistency = sum(_within(amount, typical_amount, allowed) for amount in amounts) / len(amounts)
+        if regularity >= MIN_REGULARITY and consistency >= MIN_REGULARITY:
+            return frequency, typical_amount, round(regularity * consistency, 2)
+    return None
+
+
+def _scan(user_id, merchants=None):
+    """
+    Read the activity of the user's merchants, or of the given ones, from
+    their transactions: a dict of merchant -> (occurrences, first date,
+    latest charges as (date, id, amount, name, account_id), newest first).
+    Merchants without transactions are left out.
+    """
+    # Accounts being unlinked are hidden from every read, detection included
+    account_ids = list(
+        Account.objects.filter(plaid_item__user_id=user_id, unlinking=False).values_list('id', flat=True)
+    )
+    transactions = Transaction.objects.filter(account__in=account_ids).exclude(merchant='')
+    if merchants is not None:
+        transactions = transactions.filter(merchant__in=merchants)
+
+    stats = (
+        transactions
+        .order_by()
+        .values('merchant')
+        .annotate(occurrences=Count('id'), first_date=Min('date'))
+        .values_list('merchant', 'occurrences', 'first_date')
+    )
+    activity = {merchant: (occurrences, first_date, []) for merchant, occurrences, first_date in stats}
+
+    # The latest charges per (account, merchant) in one ranked query. Ranking in
+    # the index's own order lets the database stream it without sorting; the
+    # accounts' charges are then merged per merchant here.
+    latest = (
+        transactions
+        .filter(amount__gt=0, pending=False)
+        .annotate(rank=Window(
+            RowNumber(),
+            partition_by=[F('account'), F('merchant')],
+            order_by=[F('date').desc(), F('id').desc()],
+        ))
+        .filter(rank__lte=RECENT_CHARGES)
+        .values_list('merchant', 'date', 'id', 'amount', 'name', 'account_id')
+    )
+    for merchant, *charge in latest:
+        activity[merchant][2].append(tuple(charge))
+    for occurrences, first_date, recent in activity.values():
+        recent.sort(key=lambda charge: charge[:2], reverse=True)
+        del recent[RECENT_CHARGES:]
+    return activity
+
+
+def _merge(activity, transactions):
+    """Add newly inserted transactions (saved Transaction instances) to a merchant's activity"""
+    occurrences, first_date, recent = activity
+    # The instances hold the values ingestion passed in (e.g. float amounts), not the stored ones
+    to_date = Transaction._meta.get_field('date').to_python
+    to_amount = Transaction._meta.get_field('amount').to_python
+    rows = [
+        (to_date(transaction.date), transaction.id, to_amount(transaction.amount).quantize(CENTS), transaction.name,
+         transaction.account_id, transaction.pending)
+        for transaction in transactions
+    ]
+    charges = [row[:5] for row in rows if row[2] > 0 and not row[5]]
+    recent = sorted(recent + charges, key=lambda charge: charge[:2], reverse=True)[:RECENT_CHARGES]
+    return occurrences + len(rows), min([first_date] + [row[0] for row in rows]), recent
+
+
+def _encode(recent):
+    return [[date.isoformat(), id, str(amount), name, account_id] for date, id, amount, name, account_id in recent]
+
+
+def _decode(recent):
+    return [
+        (datetime.date.fromisoformat(date), id, Decimal(amount), name, account_id)
+        for date, id, amount, name, account_id in recent
+    ]
+
+
+def _recurring_charge(user_id, merchant, activity):
+    """An unsaved RecurringCharge when the merchant's activity is on a schedule, else None"""
+    occurrences, first_date, recent = activity
+    charges = recent[::-1]
+    result = detect([(date, amount) for date, _, amount, _, _ in charges])
+    if result is None:
+        return None
+    frequency, amount, confidence = result
+    last_date, _, last_amount, name, account_id = charges[-1]
+    return RecurringCharge(
+        user_id=user_id,
+        account_id=account_id,
+        merchant=merchant,
+        name=name,
+        frequency=frequency,
+        amount=amount,
+        last_amount=last_amount,
+        occurrences=occurrences,
+        first_date=first_date,
+        last_date=last_date,
+        next_date=_next_date(last_date, frequency),
+        confidence=confidence,
+    )
+
+
+def _save(user_id, merchants, activity, batch_size):
+    """
+    Replace the MerchantActivity and RecurringCharge rows of the given
+    merchants (all of the user's when None) with ones for `activity`;
+    returns the number of recurring charges
+    """
+    stale_activity = MerchantActivity.objects.filter(user_id=user_id)
+    stale_charges = RecurringCharge.objects.filter(user_id=user_id)
+    if merchants is None:
+        stale_activity.delete()
+        stale_charges.delete()
+    else:
+        merchants = sorted(merchants)
+        for start in range(0, len(merchants), batch_size):
+            stale_activity.filter(merchant__in=merchants[start:start + batch_size]).delete()
+            stale_charges.filter(merchant__in=merchants[start:start + batch_size]).delete()
+
+    MerchantActivity.objects.bulk_create(
+        (
+            MerchantActivity(
+                user_id=user_id,
+                merchant=merchant,
+                occurrences=occurrences,
+                first_date=first_date,
+                recent_charges=_encode(recent),
+            )
+            for merchant, (occurrences, first_date, recent) in activity.items()
+        ),
+        batch_size=batch_size,
+    )
+    charges = [_recurring_charge(user_id, merchant, entry) for merchant, entry in activity.items()]
+    charges = [charge for charge in charges if charge is not None]
+    RecurringCharge.objects.bulk_create(charges, batch_size=batch_size)
+    return len(charges)
+
+
+def refresh_merchants(user_id, merchants=None, batch_size=None, added=()):
+    """
+    Bring the user's recurring charges up to date. `merchants` are re-read
+    from their transactions (every merchant when None); `added` are newly
+    inserted Transaction instances, merged into their merchants' activity
+    without reading the history behind them. Call inside the transaction
+    that changed the transactions, after the change. Returns the number of
+    recurring charges found.
+    """
+    batch_size = batch_size or settings.INGEST_BATCH_SIZE
+    with db_transaction.atomic():
+        if merchants is None:
+            found = _save(user_id, None, _scan(user_id), batch_size)
+            # Nothing else invalidates the cached list after a full re-detection
+            bump_data_version(user_id)
+            return found
+
+        rescan = {merchant for merchant in merchants if merchant}
+        added_by_merchant = {}
+        for transaction in added:
+            if transaction.merchant and transaction.merchant not in rescan:
+                added_by_merchant.setdefault(transaction.merchant, []).append(transaction)
+
+        activity = {}
+        names = sorted(added_by_merchant)
+        for start in range(0, len(names), batch_size):
+            known = MerchantActivity.objects.filter(user_id=user_id, merchant__in=names[start:start + batch_size])
+            for row in known:
+                current = (row.occurrences, row.first_date, _decode(row.recent_charges))
+                activity[row.merchant] = _merge(current, added_by_merchant[row.merchant])
+        # A new merchant (or one never scanned) is read in full, which also picks up the added rows
+        rescan.update(merchant for merchant in added_by_merchant if merchant not in activity)
+
+        rescan = sorted(rescan)
+        for start in range(0, len(rescan), batch_size):
+            activity.update(_scan(user_id, rescan[start:start + batch_size]))
+        return _save(user_id, activity.keys() | set(rescan), activity, batch_size)
@@ -0,0 +1,79 @@
+import msgpack
+from rest_framework.renderers import BaseRenderer, JSONRenderer
+
+from . import metrics
+
+# Row fields whose few distinct values are sent once, in a dictionary, with
+# each row holding an index into it
+DICTIONARY_FIELDS = ('account_name', 'institution_name', 'category')
+
+
+class TimedJSONRenderer(JSONRenderer):
+    """JSONRenderer that counts its encoding time as request serialization time"""
+
+    def render(self, data, accepted_media_type=None, renderer_context=None):
+        with metrics.timing_serialization():
+            return super().render(data, accepted_media_type, renderer_context)
+
+
+def to_columnar(rows):
+    """
+    Turn a list of same-shaped dicts into one array per field. Fields in
+    DICTIONARY_FIELDS hold indexes into a per-field table of distinct values
+    (None stays None), so repeated account and institution names are sent once.
+    """
+    names = list(rows[0]) if rows else []
+    fields = {name: [row[name] for row in rows] for name in names}
+    dictionaries = {}
+    for name in DICTIONARY_FIELDS:
+        if name not in fields:
+            continue
+        indexes = {}
+        fields[name] = [
+            None if value is None else indexes.setdefault(value, len(indexes))
+            for value in fields[name]
+        ]
+        dictionaries[name] = list(indexes)
+    return {'count': len(rows), 'fields': fields, 'dictionaries': dictionaries}
+
+
+def from_columnar(columnar):
+    """Rebuild the rows to_columnar() encoded"""
+    fields = dict(columnar['fields'])
+    for name, values in columnar['dictionaries'].items():
+        fields[name] = [None if index is None else values[index] for index in fields[name]]
+    names = list(fields)
+    return [dict(zip(names, values)) for values in zip(*(fields[name] for name in names))]
+
+
+class ColumnarJSONRenderer(TimedJSONRenderer):
+    """
+    JSON with one array per field instead of one object per row. A list
+    response becomes {count, fields, dictionaries}; a paginated response keeps
+    its shape with `results` encoded that way. Other data is plain JSON.
+    """
+    media_type = 'application/vnd.finance.columnar+json'
+    format = 'columnar'
+
+    def render(self, data, accepted_media_type=None, renderer_context=None):
+        response = renderer_context.get('response') if renderer_context else None
+        if response is None or response.status_code < 400:
+            if isinstance(data, list):
+                data = to_columnar(data)
+            elif isinstance(data, dict) and isinstance(data.get('results'), list):
+                data = {**data, 'results': to_columnar(data['results'])}
+        return super().render(data, accepted_media_type, renderer_context)
+
+
+class MessagePackRenderer(BaseRenderer):
+    """The same data as the JSON renderer, encoded as MessagePack"""
+    media_type = 'application/msgpack'
+    format = 'msgpack'
+    charset = None
+    render_style = 'binary'
+
+    def render(self, data, accepted_media_type=None, renderer_context=None):
+        if data is None:
+            return b''
+        with metrics.timing_serialization():
+            return msgpack.packb(data, use_bin_type=True)
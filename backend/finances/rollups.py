@@ -0,0 +1,97 @@
+from collections import defaultdict
+
+from django.conf import settings
+from django.db import transaction as db_transaction
+from django.db.models import Count, DecimalField, Max, Q, Sum, Value
+from django.db.models.functions import Abs, Coalesce
+
+from .cache import bump_data_version
+from .models import DailyRollup, PlaidItem, Transaction
+
+# Rollups are kept in step with transactions by recomputing every (account,
+# day) an ingestion batch touched, rather than applying +/- deltas: a modified
+# transaction may move day or category, and recomputing a day from its own
+# indexed rows is always exact.
+
+ZERO = Value(0, output_field=DecimalField(max_digits=14, decimal_places=2))
+
+
+def _daily_totals(transactions):
+    """Aggregate transactions into DailyRollup-shaped rows"""
+    return (
+        transactions
+        .order_by()
+        .values('account_id', 'date', 'category')
+        .annotate(
+            income=Coalesce(Sum(Abs('amount'), filter=Q(amount__lte=0)), ZERO),
+            expenses=Coalesce(Sum('amount', filter=Q(amount__gt=0)), ZERO),
+            count=Count('id'),
+            largest_amount=Max(Abs('amount')),
+        )
+    )
+
+
+def _insert(rows, batch_size):
+    """Insert aggregated rows batch_size at a time without materialising them all; returns the count"""
+    inserted = 0
+    batch = []
+    for row in rows:
+        batch.append(DailyRollup(**row))
+        if len(batch) >= batch_size:
+            DailyRollup.objects.bulk_create(batch)
+            inserted += len(batch)
+            batch = []
+    if batch:
+        DailyRollup.objects.bulk_create(batch)
+        inserted += len(batch)
+    return inserted
+
+
+def refresh_days(days, batch_size=None):
+    """
+    Recompute the rollups of the given (account_id, date) pairs from their
+    transactions. Call inside the transaction that changed them, after the
+    change, so readers never see rollups and transactions disagree.
+    """
+    batch_size = batch_size or settings.INGEST_BATCH_SIZE
+    dates_by_account = defaultdict(set)
+    for account_id, date in days:
+        dates_by_account[account_id].add(date)
+
+    with db_transaction.atomic():
+        for account_id, dates in dates_by_account.items():
+            dates = sorted(dates)
+            for start in range(0, len(dates), batch_size):
+                chunk = dates[start:start + batch_size]
+                DailyRollup.objects.filter(account_id=account_id, date__in=chunk).delete()
+                _insert(
+                    _daily_totals(Transaction.objects.filter(account_id=account_id, date__in=chunk)),
+                    batch_size,
+                )
+
+
+def touched_days(transactions):
+    """The (account_id, date) pairs currently occupied by a transaction queryset"""
+    return set(transactions.order_by().values_list('account_id', 'date').distinct())
+
+
+def rebuild(accounts=None, batch_size=None):
+    """
+    Recompute rollups from scratch, for the given accounts or for everyone,
+    and invalidate the cached analytics of every user who owns them
+    """
+    batch_size = batch_size or settings.INGEST_BATCH_SIZE
+    rollups = DailyRollup.objects.all()
+    transactions = Transaction.objects.all()
+    items = PlaidItem.objects.all()
+    if accounts is not None:
+        rollups = rollups.filter(account__in=accounts)
+        transactions = transactions.filter(account__in=accounts)
+        items = items.filter(accounts__in=accounts)
+
+    with db_transaction.atomic():
+        rollups.delete()
+        inserted = _insert(_daily_totals(transactions).iterator(chunk_size=batch_size), batch_size)
+        for user_id in items.order_by().values_list('user_id', flat=True).distinct():
+            bump_data_version(user_id)
+        return inserted
@@ -0,0 +1,159 @@
+import re
+
+from django.db import connections
+from django.db.models import BooleanField, F, FloatField, Lookup, Q, Value
+from django.db.models.expressions import RawSQL
+
+from .models import TransactionSearchEntry
+
+# Full-text search over transaction names and categories. SQLite keeps an
+# external-content FTS5 table in step with finances_transaction through
+# triggers; PostgreSQL keeps a generated tsvector column under a GIN index.
+# Either way the index is written by the same statement that writes the row,
+# so ingestion, unlinks and admin edits can never leave it stale.
+#
+# Django rebuilds a SQLite table (dropping its triggers) when a migration
+# alters it, so such migrations must recreate the triggers afterwards, from
+# their own copy of the SQL (see 0011); SearchIndexMigrationTests replays
+# every migration to catch one that does not, and the rebuild_search_index
+# command repairs the index by hand. Queries join the FTS table through the
+# unmanaged TransactionSearchEntry model.
+
+TABLE = 'finances_transaction'
+FTS_TABLE = 'finances_transaction_fts'
+
+# Only word characters reach the database, so user input can never be parsed
+# as FTS5 or tsquery syntax
+TERM = re.compile(r'\w+')
+MAX_TERMS = 8
+
+SQLITE_INSTALL = [
+    f"""
+    CREATE VIRTUAL TABLE IF NOT EXISTS {FTS_TABLE} USING fts5(
+        name, category,
+        content='{TABLE}', content_rowid='id',
+        tokenize='unicode61 remove_diacritics 2', prefix='2 3'
+    )
+    """,
+    f"""
+    CREATE TRIGGER IF NOT EXISTS {FTS_TABLE}_insert AFTER INSERT ON {TABLE} BEGIN
+        INSERT INTO {FTS_TABLE}(rowid, name, category) VALUES (new.id, new.name, new.category);
+    END
+    """,
+    f"""
+    CREATE TRIGGER IF NOT EXISTS {FTS_TABLE}_delete AFTER DELETE ON {TABLE} BEGIN
+        INSERT INTO {FTS_TABLE}({FTS_TABLE}, rowid, name, category)
+        VALUES ('delete', old.id, old.name, old.category);
+    END
+    """,
+    f"""
+    CREATE TRIGGER IF NOT EXISTS {FTS_TABLE}_update AFTER UPDATE OF name, category ON {TABLE} BEGIN
+        INSERT INTO {FTS_TABLE}({FTS_TABLE}, rowid, name, category)
+        VALUES ('delete', old.id, old.name, old.category);
+        INSERT INTO {FTS_TABLE}(rowid, name, category) VALUES (new.id, new.name, new.category);
+    END
+    """,
+    # Index whatever the table already holds
+    f"INSERT INTO {FTS_TABLE}({FTS_TABLE}) VALUES ('rebuild')",
+]
+
+SQLITE_UNINSTALL = [
+    f"DROP TRIGGER IF EXISTS {FTS_TABLE}_insert",
+    f"DROP TRIGGER IF EXISTS {FTS_TABLE}_delete",
+    f"DROP TRIGGER IF EXISTS {FTS_TABLE}_update",
+    f"DROP TABLE IF EXISTS {FTS_TABLE}",
+]
+
+# The 'simple' configuration does not stem, which suits merchant names
+POSTGRES_INSTALL = [
+    f"""
+    ALTER TABLE {TABLE} ADD COLUMN IF NOT EXISTS search_vector tsvector
+    GENERATED ALWAYS AS (to_tsvector('simple', coalesce(name, '') || ' ' || coalesce(category, ''))) STORED
+    """,
+    f"CREATE INDEX IF NOT EXISTS txn_search_vector_idx ON {TABLE} USING GIN (search_vector)",
+]
+
+POSTGRES_UNINSTALL = [
+    "DROP INDEX IF EXISTS txn_search_vector_idx",
+    f"ALTER TABLE {TABLE} DROP COLUMN IF EXISTS search_vector",
+]
+
+INSTALL = {'sqlite': SQLITE_INSTALL, 'postgresql': POSTGRES_INSTALL}
+UNINSTALL = {'sqlite': SQLITE_UNINSTALL, 'postgresql': POSTGRES_UNINSTALL}
+
+
+class Match(Lookup):
+    """`document__match=query`: an FTS5 MATCH against the whole index row"""
+    lookup_name = 'match'
+
+    def as_sql(self, compiler, connection):
+        lhs, lhs_params = self.process_lhs(compiler, connection)
+        rhs, rhs_params = self.process_rhs(compiler, connection)
+        return f"{lhs} MATCH {rhs}", [*lhs_params, *rhs_params]
+
+
+TransactionSearchEntry._meta.get_field('document').register_lookup(Match)
+
+
+def install(connection):
+    """Create (or repair) the search index on the given connection and index existing rows"""
+    with connection.cursor() as cursor:
+        for sql in INSTALL.get(connection.vendor, []):
+            cursor.execute(sql)
+
+
+def uninstall(connection):
+    """Drop the search index from the given connection"""
+    with connection.cursor() as cursor:
+        for sql in UNINSTALL.get(connection.vendor, []):
+            cursor.execute(sql)
+
+
+def search_terms(query):
+    """The lower-cased words of a search query, at most MAX_TERMS of them"""
+    return TERM.findall(query.lower())[:MAX_TERMS]
+
+
+def search(queryset, query):
+    """
+    Narrow a Transaction queryset to rows whose name or category contains
+    every word of `query` (words match as prefixes, so "star" finds
+    "Starbucks"), annotated with a `search_rank` that is higher
+    for better matches. A query without any words matches nothing.
+    """
+    terms = search_terms(query)
+    if not terms:
+        return queryset.annotate(search_rank=Value(0.0, output_field=FloatField())).none()
+
+    vendor = connections[queryset.db].vendor
+    if vendor == 'sqlite':
+        # Join the FTS table so the MATCH runs once and its bm25() rank
+        # (lower is better) comes from the same scan; a correlated rank
+        # subquery would rerun the MATCH for every matching row
+        match = ' '.join(f'"{term}"*' for term in terms)
+        return (
+            queryset
+            .filter(search_entry__document__match=match)
+            .annotate(search_rank=-F('search_entry__rank'))
+        )
+
+    if vendor == 'postgresql':
+        tsquery = ' & '.join(f"{term}:*" for term in terms)
+        matches = RawSQL(
+            f'"{TABLE}"."search_vector" @@ to_tsquery(\'simple\', %s)',
+            [tsquery],
+            output_field=BooleanField(),
+        )
+        rank = RawSQL(
+            f'ts_rank("{TABLE}"."search_vector", to_tsquery(\'simple\', %s))',
+            [tsquery],
+            output_field=FloatField(),
+        )
+    else:
+        # No full-text index on other databases; fall back to substring matching
+        matches = Q()
+        for term in terms:
+            matches &= Q(name__icontains=term) | Q(category__icontains=term)
+        rank = Value(0.0, output_field=FloatField())
+
+    return queryset.filter(matches).annotate(search_rank=rank)
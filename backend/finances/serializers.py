@@ -1,5 +1,7 @@
+from django.db.models import F, Value
+from django.db.models.functions import Coalesce
 from rest_framework import serializers
-from .models import PlaidItem, Account, Transaction
+from .models import PlaidItem, Account, Transaction, Job, RecurringCharge
 
 class PlaidItemSerializer(serializers.ModelSerializer):
     class Meta:
@@ -22,4 +24,60 @@ class TransactionSerializer(serializers.ModelSerializer):
     class Meta:
         model = Transaction
         fields = ['id', 'transaction_id', 'date', 'name', 'amount', 'category', 'pending', 'account_name', 'institution_name']
-        read_only_fields = ['id', 'transaction_id', 'date', 'name', 'amount', 'category', 'pending', 'account_name', 'institution_name'] 
\ No newline at end of file
+        read_only_fields = ['id', 'transaction_id', 'date', 'name', 'amount', 'category', 'pending', 'account_name', 'institution_name']
+
+class RecurringChargeSerializer(serializers.ModelSerializer):
+    account_name = serializers.CharField(source='account.name', read_only=True, default=None)
+    # Active until a charge is a full period overdue; computed against the `today` context date
+    status = serializers.SerializerMethodField()
+    
+    class Meta:
+        model = RecurringCharge
+        fields = [
+            'id', 'merchant', 'name', 'frequency', 'amount', 'last_amount', 'occurrences',
+            'first_date', 'last_date', 'next_date', 'confidence', 'account_name', 'status',
+        ]
+        read_only_fields = fields
+    
+    def get_status(self, charge):
+        overdue = (self.context['today'] - charge.next_date).days
+        return 'lapsed' if overdue > (charge.next_date - charge.last_date).days else 'active'
+
+class JobSerializer(serializers.ModelSerializer):
+    institution_name = serializers.CharField(source='plaid_item.institution_name', read_only=True, default=None)
+    error = serializers.CharField(source='last_error', read_only=True)
+    
+    class Meta:
+        model = Job
+        fields = ['id', 'kind', 'status', 'attempts', 'run_after', 'result', 'error', 'institution_name', 'created_at', 'updated_at']
+        read_only_fields = fields
+
+# Read-only fast path: build TransactionSerializer-shaped dicts straight from
+# .values() rows, skipping model instantiation and per-field DRF machinery
+TRANSACTION_VALUE_FIELDS = ['id', 'transaction_id', 'date', 'name', 'amount', 'category', 'pending']
+
+def transaction_values(queryset):
+    """Select only the serialized columns, joining the account and item names in one query"""
+    return queryset.values(
+        *TRANSACTION_VALUE_FIELDS,
+        account_name=F('account__name'),
+        institution_name=Coalesce(F('account__plaid_item__institution__name'), Value('')),
+    )
+
+def serialize_transaction_row(row):
+    """Render a transaction_values() row exactly as TransactionSerializer would"""
+    return {
+        'id': row['id'],
+        'transaction_id': row['transaction_id'],
+        'date': row['date'].isoformat(),
+        'name': row['name'],
+        'amount': format(row['amount'], '.2f'),
+        'category': row['category'],
+        'pending': row['pending'],
+        'account_name': row['account_name'],
+        'institution_name': row['institution_name'],
+    }
+
+def serialize_transactions(rows):
+    """Serialize transaction_values() rows (or a slice of them) into a list of dicts"""
+    return [serialize_transaction_row(row) for row in rows]
@@ -0,0 +1,131 @@
+import logging
+
+import plaid
+from django.db import transaction as db_transaction
+from django.utils import timezone
+
+from .ingestion import ingest_item
+from .models import PlaidItem
+from .plaid_client import get_plaid_client
+
+logger = logging.getLogger(__name__)
+
+# Plaid caps /transactions/sync pages at 500 transactions
+SYNC_PAGE_SIZE = 500
+
+# Returned when the item changes while we are paging; the loop must restart
+MUTATION_DURING_PAGINATION = 'TRANSACTIONS_SYNC_MUTATION_DURING_PAGINATION'
+MAX_PAGINATION_RESTARTS = 3
+
+
+class SyncResult:
+    """Counts of the deltas applied by a sync run"""
+
+    def __init__(self):
+        self.added = 0
+        self.modified = 0
+        self.removed = 0
+        self.pages = 0
+
+    def merge(self, other):
+        self.added += other.added
+        self.modified += other.modified
+        self.removed += other.removed
+        self.pages += other.pages
+
+    def as_dict(self):
+        return {
+            'added': self.added,
+            'modified': self.modified,
+            'removed': self.removed,
+            'pages': self.pages,
+        }
+
+    def __str__(self):
+        return f"{self.added} added, {self.modified} modified, {self.removed} removed"
+
+
+def _fetch_pages(client, plaid_item):
+    """
+    Page through /transactions/sync from the item's stored cursor, returning
+    the collected deltas, the cursor to store once they are applied and the
+    item's accounts as of the last page
+    """
+    for attempt in range(MAX_PAGINATION_RESTARTS + 1):
+        cursor = plaid_item.sync_cursor
+        added, modified, removed = [], [], []
+        accounts = []
+        pages = 0
+        try:
+            has_more = True
+            while has_more:
+                sync_request = {
+                    'access_token': plaid_item.access_token,
+                    'count': SYNC_PAGE_SIZE,
+                }
+                if cursor:
+                    sync_request['cursor'] = cursor
+                response = client.transactions_sync(sync_request)
+
+                added.extend(response['added'])
+                modified.extend(response['modified'])
+                removed.extend(response['removed'])
+                # Every page carries the item's accounts with their current balances
+                accounts = response.get('accounts') or accounts
+                has_more = response['has_more']
+                cursor = response['next_cursor']
+                pages += 1
+            return added, modified, removed, cursor, pages, accounts
+        except plaid.ApiException as e:
+            if MUTATION_DURING_PAGINATION not in str(e.body) or attempt == MAX_PAGINATION_RESTARTS:
+                raise
+            logger.info(f"Item {plaid_item.item_id} changed during sync pagination, restarting")
+
+
+def sync_item(plaid_item, client=None, batch_size=None):
+    """
+    Pull added, modified and removed transactions for one PlaidItem since its
+    stored cursor and apply them with the item's latest account balances,
+    advancing the cursor only once every delta has been written
+    """
+    client = client or get_plaid_client()
+    added, modified, removed, next_cursor, pages, accounts = _fetch_pages(client, plaid_item)
+
+    with db_transaction.atomic():
+        ingest_item(
+            plaid_item,
+            # Refreshes the balances (and their snapshots) without an /accounts/get call
+            accounts_data=accounts or None,
+            upserted=added + modified,
+            removed_ids=[transaction['transaction_id'] for transaction in removed],
+            batch_size=batch_size,
+        )
+
+        plaid_item.sync_cursor = next_cursor
+        plaid_item.last_synced_at = timezone.now()
+        plaid_item.save(update_fields=['sync_cursor', 'last_synced_at'])
+
+    result = SyncResult()
+    result.added = len(added)
+    result.modified = len(modified)
+    result.removed = len(removed)
+    result.pages = pages
+    logger.info(f"Synced item {plaid_item.item_id}: {result}")
+    return result
+
+
+def sync_user(user, client=None, batch_size=None):
+    """Sync every PlaidItem belonging to a user"""
+    return sync_items(PlaidItem.objects.filter(user=user), client, batch_size)
+
+
+def sync_items(plaid_items, client=None, batch_size=None):
+    """Sync each item in turn; an upstream failure on one item does not stop the rest"""
+    client = client or get_plaid_client()
+    total = SyncResult()
+    for plaid_item in plaid_items:
+        try:
+            total.merge(sync_item(plaid_item, client, batch_size))
+        except plaid.ApiException as e:
+            logger.error(f"Error syncing item {plaid_item.item_id}: {str(e)}")
+    return total
@@ -0,0 +1,75 @@
+import datetime
+import random
+
+# Discretionary spending: category -> (relative frequency, merchants, typical amount range)
+SPENDING = {
+    'Food & Drink': (30, ['Starbucks', 'Chipotle', 'Sweetgreen', 'Dunkin', 'Local Diner', 'DoorDash'], (4, 60)),
+    'Groceries': (18, ['Whole Foods', 'Trader Joe\'s', 'Safeway', 'Costco'], (15, 220)),
+    'Shopping': (16, ['Amazon', 'Target', 'Best Buy', 'Uniqlo', 'IKEA'], (8, 400)),
+    'Transportation': (14, ['Uber', 'Lyft', 'Shell', 'Chevron', 'MTA'], (3, 80)),
+    'Entertainment': (8, ['AMC Theatres', 'Steam', 'Ticketmaster', 'Spotify'], (5, 150)),
+    'Healthcare': (4, ['CVS Pharmacy', 'Walgreens', 'City Dental'], (10, 300)),
+    'Travel': (3, ['Delta Air Lines', 'Marriott', 'Airbnb', 'Hertz'], (80, 1200)),
+}
+
+# Recurring charges: (day of month, name, category, amount); negative amounts are income
+RECURRING = [
+    (1, 'Rent Payment', 'Housing', 1850.00),
+    (1, 'Payroll Deposit', 'Income', -2650.00),
+    (15, 'Payroll Deposit', 'Income', -2650.00),
+    (5, 'Netflix', 'Entertainment', 15.49),
+    (12, 'Comcast Internet', 'Housing', 79.99),
+    (20, 'Planet Fitness', 'Healthcare', 24.99),
+]
+
+# Discretionary spend scales up towards the weekend (Monday first)
+WEEKDAY_FACTORS = [0.8, 0.85, 0.9, 1.0, 1.3, 1.6, 1.4]
+
+
+def _amount(rng, low, high):
+    # Skewed towards the low end, like real card spend
+    return round(low + (high - low) * rng.random() ** 2.5, 2)
+
+
+def synthetic_transactions(count, days=365, end_date=None, seed=0, id_prefix='synthetic'):
+    """
+    Yield `count` realistic Plaid-style transaction dicts spread over the
+    `days` days ending at `end_date`, newest first. Amounts follow Plaid's
+    convention (positive = money out). The output is deterministic for a
+    given seed, and rows are generated lazily so millions of rows never
+    need to be held in memory.
+    """
+    rng = random.Random(seed)
+    end_date = end_date or datetime.date.today()
+    spending = list(SPENDING.items())
+    weights = [frequency for _, (frequency, _, _) in spending]
+
+    previous_day = None
+    index = 0
+    while index < count:
+        day = end_date - datetime.timedelta(days=index * days // count)
+
+        if day != previous_day:
+            previous_day = day
+            for day_of_month, name, category, amount in RECURRING:
+                if day.day == day_of_month and index < count:
+                    yield _transaction(id_prefix, index, day, name, category, amount)
+                    index += 1
+            if index >= count:
+                break
+
+        category, (_, merchants, (low, high)) = rng.choices(spending, weights)[0]
+        amount = round(_amount(rng, low, high) * WEEKDAY_FACTORS[day.weekday()], 2)
+        yield _transaction(id_prefix, index, day, rng.choice(merchants), category, amount)
+        index += 1
+
+
+def _transaction(id_prefix, index, day, name, category, amount):
+    return {
+        'transaction_id': f"{id_prefix}-{index}",
+        'date': day,
+        'name': name,
+        'amount': amount,
+        'category': [category],
+        'pending': False,
+    }
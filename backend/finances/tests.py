@@ -1,3 +1,2179 @@
-from django.test import TestCase
+import base64
+import csv
+import datetime
+import gzip
+import io
+import json
+import os
+import re
+import runpy
+import tempfile
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from decimal import Decimal
+from unittest import mock, skipUnless
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
 
-# Create your tests here.
+import brotli
+import msgpack
+import plaid
+
+from asgiref.sync import sync_to_async
+from django.conf import settings
+from django.contrib.auth.models import User
+from django.core.management import call_command
+from django.core.exceptions import ImproperlyConfigured
+from django.core.management.base import CommandError
+from django.db import connection
+from django.db.models import Sum
+from django.db.models.functions import Abs
+from django.test import SimpleTestCase, TestCase, TransactionTestCase, override_settings
+from django.test.utils import CaptureQueriesContext
+from django.urls import include, path
+from django.utils import timezone
+from rest_framework.test import APIClient
+from rest_framework_simplejwt.tokens import AccessToken
+
+from accounts.authentication import get_cache as auth_cache
+from . import (
+    analytics, async_views, balances, db_router, ingestion, institutions, jobs, metrics, plaid_client, recurring, search,
+    unlink, views,
+)
+from .cache import bump_data_version, get_cache
+from .fake_plaid import FakePlaidConfig, FakePlaidData, item_public_token_exchange, start_fake_plaid
+from .ingestion import ingest_item
+from .jobs import claim_next_job, enqueue, requeue_stale_jobs, run_job, run_pending
+from .middleware import accepted_encodings
+from .mock_data import get_mock_dataset, reset_mock_dataset
+from .plaid_client import get_latency_stats, get_plaid_client, reset_latency_stats, reset_plaid_client
+from .models import Institution, Job, PlaidItem, Account, BalanceSnapshot, DailyRollup, MerchantActivity, RecurringCharge, Transaction
+from .renderers import from_columnar
+from .rollups import rebuild
+from .sync import MUTATION_DURING_PAGINATION, sync_item
+from .serializers import TransactionSerializer, serialize_transactions, transaction_values
+from .urls import api_urlpatterns
+
+FINANCE_TABLES = (
+    'finances_institution', 'finances_plaiditem', 'finances_account', 'finances_transaction', 'finances_dailyrollup',
+    'finances_balancesnapshot', 'finances_recurringcharge', 'finances_merchantactivity',
+)
+
+# URLconf for the async view tests: the API as served under WSGI and, at
+# /async/api/, as served under ASGI
+urlpatterns = [
+    path('api/', include(api_urlpatterns(views))),
+    path('async/api/', include(api_urlpatterns(async_views))),
+]
+
+
+def seed_users(user_count, accounts_per_user=2, transactions_per_account=60):
+    """Bulk-create users that each own one item with several accounts of transactions"""
+    users = User.objects.bulk_create([User(username=f"user{index}") for index in range(user_count)])
+    institutions = Institution.objects.bulk_create([
+        Institution(institution_id=f"ins_{index}", name=f"Bank {index}") for index in range(50)
+    ])
+    items = PlaidItem.objects.bulk_create([
+        PlaidItem(user=user, item_id=f"item-{user.id}", access_token='token', institution=institutions[index % 50])
+        for index, user in enumerate(users)
+    ])
+    accounts = Account.objects.bulk_create([
+        Account(plaid_item=item, account_id=f"acct-{item.id}-{index}", name='Checking', type='depository')
+        for item in items
+        for index in range(accounts_per_user)
+    ])
+    start = datetime.date(2023, 1, 1)
+    categories = ['Food and Drink', 'Travel', 'Shops', 'Transfer']
+    Transaction.objects.bulk_create(
+        [
+            Transaction(
+                account=account,
+                transaction_id=f"txn-{account.id}-{index}",
+                date=start + datetime.timedelta(days=index * 7),
+                name='Merchant',
+                merchant='merchant',
+                amount=index - 20,
+                category=categories[index % len(categories)],
+            )
+            for account in accounts
+            for index in range(transactions_per_account)
+        ],
+        batch_size=5000,
+    )
+    rebuild(accounts)
+    return users
+
+
+class QueryPlanTests(TestCase):
+    """
+    Run each hot endpoint, capture the SQL it issues and EXPLAIN it, failing
+    if any finances table is read with a full table scan.
+    """
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.users = seed_users(200)
+        cls.user = cls.users[0]
+        with connection.cursor() as cursor:
+            cursor.execute('ANALYZE')
+
+    def setUp(self):
+        get_cache().clear()
+        self.client = APIClient()
+        self.client.force_authenticate(self.user)
+
+    def explain(self, sql):
+        with connection.cursor() as cursor:
+            if connection.vendor == 'sqlite':
+                cursor.execute(f"EXPLAIN QUERY PLAN {sql}")
+                return '\n'.join(row[-1] for row in cursor.fetchall())
+            cursor.execute(f"EXPLAIN {sql}")
+            return '\n'.join(row[0] for row in cursor.fetchall())
+
+    def full_scans(self, plan):
+        if connection.vendor == 'sqlite':
+            # "SCAN t" reads every row; "SEARCH t USING INDEX" seeks into an index
+            pattern = r'\bSCAN ({})\b'
+        else:
+            pattern = r'Seq Scan on ({})\b'
+        return re.findall(pattern.format('|'.join(FINANCE_TABLES)), plan)
+
+    def resolves_date_in_index(self, plan):
+        if connection.vendor == 'sqlite':
+            searches = re.findall(r'SEARCH finances_transaction USING (?:COVERING )?INDEX \S+ \(([^)]*)\)', plan)
+        else:
+            searches = re.findall(r'Index Cond: (.*)', plan)
+        return any('date' in condition for condition in searches)
+
+    def assertIndexedQueries(self, captured, date_range=False):
+        """
+        EXPLAIN every captured query on a finances table. With date_range, the
+        transaction query must also resolve its date bounds inside the index
+        rather than filtering rows after an account-only lookup.
+        """
+        checked = 0
+        for query in captured:
+            sql = query['sql']
+            if not any(table in sql for table in FINANCE_TABLES):
+                continue
+            if not sql.lstrip().upper().startswith(('SELECT', 'DELETE', 'UPDATE')):
+                continue
+            plan = self.explain(sql)
+            self.assertEqual(self.full_scans(plan), [], f"Full table scan in:\n{sql}\n\nPlan:\n{plan}")
+            if date_range and 'FROM "finances_transaction"' in sql and '"date" >=' in sql:
+                self.assertTrue(self.resolves_date_in_index(plan), f"Date range not indexed in:\n{sql}\n\nPlan:\n{plan}")
+            checked += 1
+        self.assertGreater(checked, 0)
+
+    def test_accounts_list_uses_indexes(self):
+        with CaptureQueriesContext(connection) as captured:
+            response = self.client.get('/api/accounts/')
+        self.assertEqual(response.status_code, 200)
+        self.assertIndexedQueries(captured)
+
+    def test_transactions_list_date_range_uses_indexes(self):
+        with CaptureQueriesContext(connection) as captured:
+            response = self.client.get('/api/transactions/', {
+                'start_date': '2023-03-01',
+                'end_date': '2023-09-01',
+            })
+        self.assertEqual(response.status_code, 200)
+        self.assertIndexedQueries(captured, date_range=True)
+
+    def test_transactions_list_category_uses_indexes(self):
+        account = Account.objects.filter(plaid_item__user=self.user).first()
+        with CaptureQueriesContext(connection) as captured:
+            response = self.client.get('/api/transactions/', {
+                'account_id': account.id,
+                'category': 'Travel',
+                'start_date': '2023-03-01',
+            })
+        self.assertEqual(response.status_code, 200)
+        self.assertIndexedQueries(captured, date_range=True)
+
+    def test_transactions_keyset_page_uses_indexes(self):
+        first = self.client.get('/api/transactions/', {'limit': 25}).json()
+        with CaptureQueriesContext(connection) as captured:
+            response = self.client.get('/api/transactions/', {'limit': 25, 'cursor': first['next']})
+        self.assertEqual(response.status_code, 200)
+        self.assertIndexedQueries(captured)
+
+    def test_transactions_search_uses_indexes(self):
+        with CaptureQueriesContext(connection) as captured:
+            response = self.client.get('/api/transactions/', {'q': 'merch'})
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(len(response.json()), 120)
+        self.assertIndexedQueries(captured)
+
+    def test_analytics_summary_uses_indexes(self):
+        with CaptureQueriesContext(connection) as captured:
+            response = self.client.get('/api/analytics/summary/', {
+                'start_date': '2023-03-01',
+                'end_date': '2023-09-01',
+            })
+        self.assertEqual(response.status_code, 200)
+        self.assertIndexedQueries(captured)
+
+    def test_analytics_summary_reads_one_day_for_the_largest_transaction(self):
+        with CaptureQueriesContext(connection) as captured:
+            response = self.client.get('/api/analytics/summary/')
+        self.assertEqual(response.status_code, 200)
+
+        largest = Transaction.objects.filter(account__plaid_item__user=self.user).order_by(Abs('amount').desc()).first()
+        self.assertEqual(
+            abs(Decimal(response.json()['summary']['largest_transaction']['amount'])),
+            abs(largest.amount),
+        )
+        reads = [query['sql'] for query in captured if 'FROM "finances_transaction"' in query['sql']]
+        self.assertEqual(len(reads), 1)
+        self.assertIn('"finances_transaction"."date" = ', reads[0])
+        if connection.vendor == 'sqlite':
+            plan = self.explain(reads[0])
+            self.assertNotIn('TEMP B-TREE', plan, f"Transactions sorted in:\n{reads[0]}\n\nPlan:\n{plan}")
+
+    def test_balance_history_uses_indexes(self):
+        start = datetime.datetime(2023, 1, 1, tzinfo=datetime.timezone.utc)
+        BalanceSnapshot.objects.bulk_create([
+            BalanceSnapshot(account=account, taken_at=start + datetime.timedelta(days=day), balance=day)
+            for account in Account.objects.all()
+            for day in range(0, 360, 30)
+        ])
+        with CaptureQueriesContext(connection) as captured:
+            response = self.client.get('/api/accounts/balance-history/', {
+                'start_date': '2023-03-01',
+                'end_date': '2023-09-01',
+            })
+        self.assertEqual(response.status_code, 200)
+        self.assertIndexedQueries(captured)
+
+    def test_recurring_charges_use_indexes(self):
+        with CaptureQueriesContext(connection) as captured:
+            recurring.refresh_merchants(self.user.id, {'merchant'})
+            response = self.client.get('/api/recurring/')
+        self.assertEqual(response.status_code, 200)
+        self.assertIndexedQueries(captured)
+
+    def test_account_ownership_lookup_uses_indexes(self):
+        # The account/item lookup MockTransactions and UnlinkAccount run before acting
+        account = Account.objects.filter(plaid_item__user=self.user).first()
+        with CaptureQueriesContext(connection) as captured:
+            Account.objects.select_related('plaid_item').get(id=account.id).plaid_item.user_id
+        self.assertIndexedQueries(captured)
+
+    def test_unlink_account_uses_indexes(self):
+        account = Account.objects.filter(plaid_item__user=self.user).first()
+        with CaptureQueriesContext(connection) as captured:
+            response = self.client.delete(f"/api/accounts/{account.id}/unlink/")
+        self.assertEqual(response.status_code, 200)
+        self.assertIndexedQueries(captured)
+
+    def test_unlink_all_accounts_uses_indexes(self):
+        with CaptureQueriesContext(connection) as captured:
+            response = self.client.delete('/api/accounts/unlink-all/')
+        self.assertEqual(response.status_code, 200)
+        self.assertIndexedQueries(captured)
+
+
+class SerializationQueryCountTests(TestCase):
+    """List endpoints must issue the same number of queries however many rows they return"""
+
+    def setUp(self):
+        self.user = User.objects.create_user('owner')
+        self.institution = Institution.objects.create(institution_id='ins_1', name='Bank')
+        self.client = APIClient()
+        self.client.force_authenticate(self.user)
+
+    def add_item(self, accounts=1, transactions_per_account=1):
+        item = PlaidItem.objects.create(
+            user=self.user, item_id=f"item-{PlaidItem.objects.count()}", access_token='token', institution=self.institution
+        )
+        for index in range(accounts):
+            account = Account.objects.create(
+                plaid_item=item, account_id=f"acct-{index}", name=f"Account {index}", type='depository'
+            )
+            Transaction.objects.bulk_create([
+                Transaction(
+                    account=account,
+                    transaction_id=f"txn-{number}",
+                    date=datetime.date(2024, 1, 1) + datetime.timedelta(days=number),
+                    name='Merchant',
+                    amount='12.50',
+                )
+                for number in range(transactions_per_account)
+            ])
+
+    def count_queries(self, url, params=None):
+        # Rows are seeded directly, bypassing ingestion's cache invalidation
+        bump_data_version(self.user.id)
+        with CaptureQueriesContext(connection) as captured:
+            response = self.client.get(url, params or {})
+        self.assertEqual(response.status_code, 200)
+        return len(captured)
+
+    def test_transactions_list_query_count_is_constant(self):
+        self.add_item()
+        small = self.count_queries('/api/transactions/')
+        self.add_item(accounts=3, transactions_per_account=40)
+        self.assertEqual(self.count_queries('/api/transactions/'), small)
+
+    def test_paginated_transactions_query_count_is_constant(self):
+        self.add_item()
+        small = self.count_queries('/api/transactions/', {'limit': 100})
+        self.add_item(accounts=3, transactions_per_account=40)
+        self.assertEqual(self.count_queries('/api/transactions/', {'limit': 100}), small)
+
+    def test_accounts_list_query_count_is_constant(self):
+        self.add_item()
+        small = self.count_queries('/api/accounts/')
+        self.add_item(accounts=5)
+        self.add_item(accounts=5)
+        self.assertEqual(self.count_queries('/api/accounts/'), small)
+
+    def test_fast_path_matches_transaction_serializer(self):
+        self.add_item(accounts=2, transactions_per_account=3)
+        queryset = Transaction.objects.filter(account__plaid_item__user=self.user).order_by('id')
+        self.assertEqual(
+            serialize_transactions(transaction_values(queryset)),
+            [dict(row) for row in TransactionSerializer(queryset, many=True).data],
+        )
+
+
+class KeysetPaginationTests(TestCase):
+    """Pages over (date, id) neither skip nor repeat rows, and bad cursors are client errors"""
+
+    def setUp(self):
+        get_cache().clear()
+        self.user = User.objects.create_user('owner')
+        item = PlaidItem.objects.create(user=self.user, item_id='item', access_token='token')
+        account = Account.objects.create(plaid_item=item, account_id='acct', name='Checking', type='depository')
+        # Twelve rows on one day straddle the first page boundaries
+        days = [datetime.date(2024, 3, 1)] * 12 + [datetime.date(2024, 2, 1)] * 3 + [datetime.date(2024, 4, 1)] * 2
+        Transaction.objects.bulk_create([
+            Transaction(account=account, transaction_id=f"txn-{index}", date=day, name='Merchant', amount=index)
+            for index, day in enumerate(days)
+        ])
+        self.client = APIClient()
+        self.client.force_authenticate(self.user)
+
+    def pages(self, limit):
+        pages, params = [], {'limit': limit}
+        while True:
+            response = self.client.get('/api/transactions/', params)
+            self.assertEqual(response.status_code, 200)
+            pages.append(response.json())
+            if pages[-1]['next'] is None:
+                return pages
+            params = {'limit': limit, 'cursor': pages[-1]['next']}
+
+    def test_rows_sharing_a_date_span_pages_without_gaps_or_duplicates(self):
+        expected = list(Transaction.objects.order_by('-date', '-id').values_list('id', flat=True))
+        for limit in (1, 5, 7, 16):
+            ids = [row['id'] for page in self.pages(limit) for row in page['results']]
+            self.assertEqual(ids, expected, f"limit={limit}")
+
+    def test_last_page_has_no_next_cursor(self):
+        pages = self.pages(17)
+        self.assertEqual(len(pages), 1)
+        self.assertEqual(len(pages[0]['results']), 17)
+        self.assertIsNone(pages[0]['next'])
+
+        pages = self.pages(5)
+        self.assertEqual([len(page['results']) for page in pages], [5, 5, 5, 2])
+        self.assertIsNone(pages[-1]['next'])
+
+    def test_invalid_cursor_is_rejected(self):
+        def encode(raw):
+            return base64.urlsafe_b64encode(raw).decode().rstrip('=')
+
+        cursors = [
+            'not base64!',
+            'a',
+            encode(b'\xff\xfe'),
+            encode(b'2024-03-01'),
+            encode(b'2024-03-01|1|2'),
+            encode(b'2024-13-01|1'),
+            encode(b'2024-03-01|abc'),
+            encode(b'2024-03-01|-1'),
+            encode(b'2024-03-01|' + b'9' * 30),
+        ]
+        for cursor in cursors:
+            response = self.client.get('/api/transactions/', {'limit': 5, 'cursor': cursor})
+            self.assertEqual(response.status_code, 400, cursor)
+            self.assertIn('cursor', response.json())
+
+
+class TransactionExportTests(TestCase):
+    """The export endpoint streams the same rows TransactionsList returns"""
+
+    def setUp(self):
+        self.user = seed_users(1, accounts_per_user=2, transactions_per_account=30)[0]
+        self.client = APIClient()
+        self.client.force_authenticate(self.user)
+
+    def expected(self, **filters):
+        queryset = Transaction.objects.filter(account__plaid_item__user=self.user, **filters).order_by('-date', '-id')
+        return serialize_transactions(transaction_values(queryset))
+
+    def export(self, **params):
+        response = self.client.get('/api/transactions/export/', params)
+        self.assertEqual(response.status_code, 200)
+        self.assertTrue(response.streaming)
+        return response, b''.join(response.streaming_content)
+
+    def test_csv_export(self):
+        response, body = self.export(start_date='2023-03-01')
+        self.assertEqual(response['Content-Type'], 'text/csv; charset=utf-8')
+        rows = list(csv.DictReader(io.StringIO(body.decode())))
+        expected = self.expected(date__gte='2023-03-01')
+        self.assertEqual([row['transaction_id'] for row in rows], [row['transaction_id'] for row in expected])
+        self.assertEqual(rows[0]['amount'], expected[0]['amount'])
+
+    def test_ndjson_export(self):
+        _, body = self.export(export_format='ndjson', category='Travel')
+        rows = [json.loads(line) for line in body.decode().splitlines()]
+        self.assertEqual(rows, self.expected(category='Travel'))
+
+    def test_gzip_export(self):
+        response, body = self.export(export_format='ndjson', gzip='true')
+        self.assertEqual(response['Content-Type'], 'application/gzip')
+        self.assertIn('transactions.ndjson.gz', response['Content-Disposition'])
+        rows = [json.loads(line) for line in gzip.decompress(body).decode().splitlines()]
+        self.assertEqual(rows, self.expected())
+
+    def test_unknown_format_is_rejected(self):
+        response = self.client.get('/api/transactions/export/', {'export_format': 'xml'})
+        self.assertEqual(response.status_code, 400)
+
+
+class MockTransactionsTests(TestCase):
+    """The mock dataset is parsed once per file version and never mutated by requests"""
+
+    def setUp(self):
+        self.user = seed_users(1, transactions_per_account=1)[0]
+        self.account = Account.objects.filter(plaid_item__user=self.user).first()
+        self.client = APIClient()
+        self.client.force_authenticate(self.user)
+
+        handle, self.path = tempfile.mkstemp(suffix='.json')
+        os.close(handle)
+        self.write([{'id': 1, 'name': 'Coffee'}, {'id': 2, 'name': 'Rent'}])
+        self.override = override_settings(MOCK_TRANSACTIONS_FILE=self.path)
+        self.override.enable()
+        reset_mock_dataset()
+
+    def tearDown(self):
+        self.override.disable()
+        reset_mock_dataset()
+        os.remove(self.path)
+
+    def write(self, rows, mtime_ns=None):
+        with open(self.path, 'w') as f:
+            json.dump(rows, f)
+        if mtime_ns is not None:
+            os.utime(self.path, ns=(mtime_ns, mtime_ns))
+
+    def test_dataset_is_cached_until_the_file_changes(self):
+        dataset = get_mock_dataset()
+        self.assertIs(get_mock_dataset(), dataset)
+
+        self.write([{'id': 3, 'name': 'Groceries'}], mtime_ns=os.stat(self.path).st_mtime_ns + 10**9)
+        self.assertEqual(len(get_mock_dataset()), 1)
+
+    def test_account_stamp_does_not_leak_between_requests(self):
+        stamped = self.client.get('/api/mock-transactions/', {'account_id': self.account.id})
+        self.assertEqual([row['account_id'] for row in stamped.json()], [str(self.account.id)] * 2)
+
+        plain = self.client.get('/api/mock-transactions/')
+        self.assertEqual(plain.json(), [{'id': 1, 'name': 'Coffee'}, {'id': 2, 'name': 'Rent'}])
+
+    def test_other_users_account_is_forbidden(self):
+        other = User.objects.create(username='other')
+        self.client.force_authenticate(other)
+        response = self.client.get('/api/mock-transactions/', {'account_id': self.account.id})
+        self.assertEqual(response.status_code, 403)
+
+
+class ResponseCacheTests(TestCase):
+    """Repeated reads are served from the cache until ingestion or an unlink bumps the data version"""
+
+    def setUp(self):
+        get_cache().clear()
+        self.user = User.objects.create_user('owner')
+        self.item = PlaidItem.objects.create(user=self.user, item_id='item', access_token='token')
+        self.client = APIClient()
+        self.client.force_authenticate(self.user)
+        self.ingest([self.plaid_transaction('txn-1')])
+
+    def plaid_transaction(self, transaction_id):
+        return {
+            'transaction_id': transaction_id,
+            'account_id': 'acct',
+            'amount': 10,
+            'date': datetime.date(2024, 1, 1),
+            'name': 'Merchant',
+            'category': ['Shops'],
+            'pending': False,
+        }
+
+    def ingest(self, transactions):
+        accounts = [{'account_id': 'acct', 'name': 'Checking', 'type': 'depository', 'balances': {'current': 5}}]
+        # captureOnCommitCallbacks runs the deferred version bump as a real commit would
+        with self.captureOnCommitCallbacks(execute=True):
+            ingest_item(self.item, accounts, transactions)
+
+    def test_repeated_dashboard_load_skips_the_orm(self):
+        for url in ('/api/accounts/', '/api/transactions/', '/api/analytics/summary/'):
+            first = self.client.get(url).json()
+            with CaptureQueriesContext(connection) as captured:
+                second = self.client.get(url).json()
+            # Only the data version lookup
+            self.assertEqual(len(captured), 1, url)
+            self.assertIn('finances_dataversion', captured[0]['sql'])
+            self.assertEqual(first, second)
+
+    def test_ingestion_invalidates_cached_results(self):
+        self.assertEqual(len(self.client.get('/api/transactions/').json()), 1)
+        self.ingest([self.plaid_transaction('txn-2')])
+        self.assertEqual(len(self.client.get('/api/transactions/').json()), 2)
+
+    def test_unlink_invalidates_cached_results(self):
+        self.assertEqual(len(self.client.get('/api/accounts/').json()), 1)
+        with self.captureOnCommitCallbacks(execute=True):
+            self.client.delete('/api/accounts/unlink-all/')
+        self.assertEqual(self.client.get('/api/accounts/').json(), [])
+
+    def test_results_are_cached_per_user(self):
+        self.client.get('/api/transactions/')
+        other = User.objects.create_user('other')
+        self.client.force_authenticate(other)
+        self.assertEqual(self.client.get('/api/transactions/').json(), [])
+
+
+class ConditionalGetTests(TestCase):
+    """Read endpoints answer a still-valid If-None-Match with an empty 304 without touching the database"""
+
+    def setUp(self):
+        get_cache().clear()
+        # Test databases reuse user ids, so no cached user may outlive its test
+        auth_cache().clear()
+        self.user = User.objects.create_user('owner')
+        self.item = PlaidItem.objects.create(user=self.user, item_id='item', access_token='token')
+        self.client = APIClient()
+        # Real JWT authentication, so the user lookup is part of the measured cost
+        self.client.credentials(HTTP_AUTHORIZATION=f"Bearer {AccessToken.for_user(self.user)}")
+        self.ingest('txn-1')
+
+    def ingest(self, transaction_id):
+        accounts = [{'account_id': 'acct', 'name': 'Checking', 'type': 'depository', 'balances': {'current': 5}}]
+        transaction = {
+            'transaction_id': transaction_id,
+            'account_id': 'acct',
+            'amount': 10,
+            'date': datetime.date(2024, 1, 1),
+            'name': 'Merchant',
+            'category': ['Shops'],
+            'pending': False,
+        }
+        with self.captureOnCommitCallbacks(execute=True):
+            ingest_item(self.item, accounts, [transaction])
+
+    def test_unchanged_data_is_not_modified(self):
+        for url in ('/api/accounts/', '/api/transactions/', '/api/analytics/summary/'):
+            first = self.client.get(url)
+            self.assertEqual(first.status_code, 200)
+            self.assertEqual(first['Cache-Control'], 'private, no-cache')
+            with CaptureQueriesContext(connection) as captured:
+                second = self.client.get(url, HTTP_IF_NONE_MATCH=first['ETag'])
+            self.assertEqual(second.status_code, 304, url)
+            self.assertEqual(second.content, b'')
+            self.assertEqual(second['ETag'], first['ETag'])
+            # The user comes from the auth cache the first request filled; only the data version is read
+            self.assertEqual(len(captured), 1, url)
+            self.assertIn('finances_dataversion', captured[0]['sql'])
+            self.assertEqual(self.client.get(url, HTTP_IF_NONE_MATCH=f"W/{first['ETag']}").status_code, 304)
+
+    def test_etag_changes_with_data_and_params(self):
+        etag = self.client.get('/api/transactions/')['ETag']
+        self.assertNotEqual(self.client.get('/api/transactions/', {'category': 'Shops'})['ETag'], etag)
+        other = APIClient()
+        other.force_authenticate(User.objects.create_user('other'))
+        self.assertNotEqual(other.get('/api/transactions/')['ETag'], etag)
+
+        self.ingest('txn-2')
+        response = self.client.get('/api/transactions/', HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(len(response.json()), 2)
+        self.assertNotEqual(response['ETag'], etag)
+
+    def test_import_in_a_worker_process_changes_the_etag(self):
+        first = self.client.get('/api/transactions/')
+        # A job worker process has a cache of its own; only the database is shared
+        with override_settings(FINANCES_CACHE_ALIAS='default'):
+            self.ingest('txn-2')
+        response = self.client.get('/api/transactions/', HTTP_IF_NONE_MATCH=first['ETag'])
+        self.assertEqual(response.status_code, 200)
+        self.assertNotEqual(response['ETag'], first['ETag'])
+        self.assertEqual(len(response.json()), 2)
+
+
+def reference_summary(transactions, start_date, end_date):
+    """
+    The analytics the dashboard used to compute in the browser from every
+    transaction in the range (Analytics.js before the summary endpoint),
+    ported to Python. Months are keyed by year too, as the endpoint does.
+    """
+    monthly, weekday, categories = {}, {}, {}
+    inflow = outflow = previous = current = Decimal(0)
+    midpoint = start_date + (end_date - start_date) / 2
+    for transaction in transactions:
+        amount = transaction.amount
+        month = monthly.setdefault(transaction.date.strftime('%Y-%m'), {'income': Decimal(0), 'expenses': Decimal(0)})
+        day = weekday.setdefault(analytics.WEEKDAY_NAMES[transaction.date.weekday()], {'income': Decimal(0), 'expenses': Decimal(0)})
+        if amount > 0:
+            month['expenses'] += amount
+            day['expenses'] += amount
+            outflow += amount
+        else:
+            month['income'] -= amount
+            day['income'] -= amount
+            inflow -= amount
+        category = transaction.category or 'Uncategorized'
+        categories[category] = categories.get(category, Decimal(0)) + abs(amount)
+        if transaction.date < midpoint:
+            previous += abs(amount)
+        else:
+            current += abs(amount)
+    count = len(transactions)
+    return {
+        'monthly': monthly,
+        'weekday': weekday,
+        'categories': categories,
+        'summary': {
+            'total_transactions': count,
+            'total_inflow': inflow,
+            'total_outflow': outflow,
+            'net_cash_flow': inflow - outflow,
+            'average_transaction': ((inflow + outflow) / count).quantize(Decimal('0.01')) if count else 0,
+            'largest_amount': max((abs(transaction.amount) for transaction in transactions), default=None),
+            'previous_period_spending': previous,
+            'current_period_spending': current,
+        },
+    }
+
+
+class AnalyticsSummaryTests(TestCase):
+    """The summary endpoint agrees with the per-transaction computation it replaced"""
+
+    def setUp(self):
+        get_cache().clear()
+        self.user = User.objects.create_user('owner')
+        item = PlaidItem.objects.create(user=self.user, item_id='item', access_token='token')
+        self.accounts = [
+            Account.objects.create(plaid_item=item, account_id=f"acct-{index}", name='Checking', type='depository')
+            for index in range(2)
+        ]
+        # Another user's rows must not leak into the totals
+        other = User.objects.create_user('other')
+        other_item = PlaidItem.objects.create(user=other, item_id='other', access_token='token')
+        other_account = Account.objects.create(plaid_item=other_item, account_id='acct', name='Checking', type='depository')
+
+        categories = ['Food and Drink', 'Travel', None, 'Shops']
+        start = datetime.date(2024, 1, 20)
+        rows = [
+            Transaction(
+                account=self.accounts[index % 2],
+                transaction_id=f"txn-{index}",
+                date=start + datetime.timedelta(days=index * 3),
+                name='Merchant',
+                amount=Decimal(index * 37 % 200 - 60) + Decimal('0.25') * (index % 4),
+                category=categories[index % len(categories)],
+            )
+            for index in range(40)
+        ]
+        rows.append(Transaction(
+            account=other_account, transaction_id='other', date=datetime.date(2024, 2, 10), name='Other', amount=5000,
+        ))
+        Transaction.objects.bulk_create(rows)
+        rebuild()
+
+        self.client = APIClient()
+        self.client.force_authenticate(self.user)
+
+    def assertMatchesReference(self, start_date, end_date, **params):
+        response = self.client.get('/api/analytics/summary/', {
+            'start_date': start_date.isoformat(), 'end_date': end_date.isoformat(), **params,
+        })
+        self.assertEqual(response.status_code, 200)
+        data = response.json()
+        transactions = list(Transaction.objects.filter(
+            account__plaid_item__user=self.user,
+            date__gte=start_date,
+            date__lte=end_date,
+            **({'account__id': params['account_id']} if 'account_id' in params else {}),
+        ))
+        self.assertTrue(transactions)
+        expected = reference_summary(transactions, start_date, end_date)
+
+        self.assertEqual(
+            {row['month']: {'income': Decimal(row['income']), 'expenses': Decimal(row['expenses'])} for row in data['monthly']},
+            expected['monthly'],
+        )
+        self.assertEqual(
+            {row['day']: {'income': Decimal(row['income']), 'expenses': Decimal(row['expenses'])} for row in data['weekday']},
+            expected['weekday'],
+        )
+        self.assertEqual({row['category']: Decimal(row['total']) for row in data['categories']}, expected['categories'])
+        totals = [Decimal(row['total']) for row in data['categories']]
+        self.assertEqual(totals, sorted(totals, reverse=True))
+
+        summary = data['summary']
+        reference = expected['summary']
+        self.assertEqual(summary['total_transactions'], reference['total_transactions'])
+        for field in ('total_inflow', 'total_outflow', 'net_cash_flow', 'previous_period_spending', 'current_period_spending'):
+            self.assertEqual(Decimal(summary[field]), reference[field], field)
+        self.assertEqual(
+            Decimal(str(summary['average_transaction'])).quantize(Decimal('0.01')), reference['average_transaction']
+        )
+        self.assertEqual(abs(Decimal(summary['largest_transaction']['amount'])), reference['largest_amount'])
+
+    def test_summary_matches_reference_over_the_whole_history(self):
+        self.assertMatchesReference(datetime.date(2024, 1, 1), datetime.date(2024, 12, 31))
+
+    def test_summary_matches_reference_within_a_date_window(self):
+        # Cuts through February and April, with rows on both boundary days and on the midpoint
+        self.assertMatchesReference(datetime.date(2024, 2, 1), datetime.date(2024, 4, 7))
+
+    def test_summary_matches_reference_for_one_account(self):
+        self.assertMatchesReference(
+            datetime.date(2024, 2, 1), datetime.date(2024, 4, 7), account_id=self.accounts[1].id,
+        )
+
+
+class DailyRollupTests(TestCase):
+    """Ingestion keeps the daily rollups identical to a rebuild from transactions"""
+
+    def setUp(self):
+        self.user = User.objects.create_user('owner')
+        self.item = PlaidItem.objects.create(user=self.user, item_id='item', access_token='token')
+
+    def plaid_transaction(self, transaction_id, date, amount, category='Shops'):
+        return {
+            'transaction_id': transaction_id,
+            'account_id': 'acct',
+            'amount': amount,
+            'date': date,
+            'name': 'Merchant',
+            'category': [category],
+            'pending': False,
+        }
+
+    def rollups(self):
+        return sorted(DailyRollup.objects.values_list('account_id', 'date', 'category', 'income', 'expenses', 'count'))
+
+    def assertMatchesRebuild(self):
+        maintained = self.rollups()
+        rebuild()
+        self.assertEqual(maintained, self.rollups())
+
+    def test_ingestion_keeps_rollups_in_sync(self):
+        accounts = [{'account_id': 'acct', 'name': 'Checking', 'type': 'depository', 'balances': {'current': 5}}]
+        day = datetime.date(2024, 1, 1)
+        ingest_item(self.item, accounts, [
+            self.plaid_transaction('txn-1', day, 10),
+            self.plaid_transaction('txn-2', day, -25),
+            self.plaid_transaction('txn-3', day, 4, 'Travel'),
+        ])
+        self.assertEqual(DailyRollup.objects.count(), 2)
+        self.assertMatchesRebuild()
+
+        # Moving a transaction to another day and category updates both days
+        ingest_item(self.item, accounts, [self.plaid_transaction('txn-1', day + datetime.timedelta(days=3), 10, 'Travel')])
+        self.assertMatchesRebuild()
+
+        ingest_item(self.item, accounts, removed_ids=['txn-2', 'txn-3'])
+        self.assertMatchesRebuild()
+        self.assertEqual(self.rollups()[0][1:], (day + datetime.timedelta(days=3), 'Travel', 0, 10, 1))
+
+    def test_rebuild_command_invalidates_cached_analytics(self):
+        get_cache().clear()
+        accounts = [{'account_id': 'acct', 'name': 'Checking', 'type': 'depository', 'balances': {'current': 5}}]
+        ingest_item(self.item, accounts, [self.plaid_transaction('txn-1', datetime.date(2024, 1, 1), 10)])
+        client = APIClient()
+        client.force_authenticate(self.user)
+        first = client.get('/api/analytics/summary/')
+        self.assertEqual(Decimal(str(first.json()['summary']['total_outflow'])), 10)
+
+        # Rows changed behind ingestion's back are only picked up by a rebuild
+        Transaction.objects.update(amount=30)
+        call_command('rebuild_rollups', stdout=io.StringIO())
+        response = client.get('/api/analytics/summary/', HTTP_IF_NONE_MATCH=first['ETag'])
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(Decimal(str(response.json()['summary']['total_outflow'])), 30)
+
+
+class IngestionTests(TestCase):
+    """Ingestion upserts accounts and transactions in batches, so repeating a payload changes nothing"""
+
+    accounts = [{'account_id': 'acct', 'name': 'Checking', 'type': 'depository', 'balances': {'current': 5}}]
+
+    def setUp(self):
+        self.user = User.objects.create_user('owner')
+
+    def item(self):
+        return PlaidItem.objects.create(user=self.user, item_id=f"item-{PlaidItem.objects.count()}", access_token='token')
+
+    def payload(self, rows, amount_offset=0):
+        start = datetime.date(2024, 1, 1)
+        return [
+            {
+                'transaction_id': f"txn-{index}",
+                'account_id': 'acct',
+                'amount': index - 20 + amount_offset,
+                'date': start + datetime.timedelta(days=index),
+                'name': f"Shop {'ABCD'[index % 4] * 2}",
+                'category': ['Shops'],
+                'pending': False,
+            }
+            for index in range(rows)
+        ]
+
+    def snapshot(self):
+        return (
+            list(Account.objects.order_by('id').values_list('id', 'name', 'current_balance')),
+            list(Transaction.objects.order_by('id').values_list('id', 'transaction_id', 'amount', 'name')),
+            list(DailyRollup.objects.order_by('id').values_list('account_id', 'date', 'income', 'expenses', 'count')),
+            BalanceSnapshot.objects.count(),
+        )
+
+    def test_reingesting_a_payload_is_idempotent(self):
+        item = self.item()
+        self.assertEqual(ingest_item(item, self.accounts, self.payload(30), batch_size=7), (30, 0))
+        before = self.snapshot()
+
+        self.assertEqual(ingest_item(item, self.accounts, self.payload(30), batch_size=7), (30, 0))
+        self.assertEqual(self.snapshot(), before)
+
+        # Changed fields are updated in place rather than duplicated
+        accounts = [dict(self.accounts[0], name='Everyday', balances={'current': 9})]
+        ingest_item(item, accounts, self.payload(30, amount_offset=100), batch_size=7)
+        account = Account.objects.get()
+        self.assertEqual((account.name, account.current_balance), ('Everyday', 9))
+        self.assertEqual(Transaction.objects.count(), 30)
+        self.assertEqual(
+            sorted(Transaction.objects.values_list('amount', flat=True)),
+            [Decimal(index + 80) for index in range(30)],
+        )
+        self.assertEqual(DailyRollup.objects.aggregate(count=Sum('count'))['count'], 30)
+
+    def count_queries(self, rows, batch_size):
+        item = self.item()
+        with CaptureQueriesContext(connection) as captured:
+            ingest_item(item, self.accounts, self.payload(rows), batch_size=batch_size)
+        return len(captured)
+
+    def test_query_count_grows_with_batches_not_rows(self):
+        # Larger batches mean fewer round trips for the same payload
+        self.assertGreater(self.count_queries(800, 25), self.count_queries(800, 100))
+        self.assertGreater(self.count_queries(800, 100), self.count_queries(800, 800))
+        # In one batch, 16 times the rows costs only the few extra INSERTs the
+        # database's bound-parameter limit splits them into
+        self.assertLessEqual(self.count_queries(800, 800) - self.count_queries(50, 800), 15)
+        self.assertLess(self.count_queries(800, 800), 800 // 10)
+
+
+class BalanceHistoryTests(TestCase):
+    """Ingestion snapshots changed balances, and the history endpoint samples them per bucket"""
+
+    def setUp(self):
+        get_cache().clear()
+        self.user = User.objects.create_user('owner')
+        self.item = PlaidItem.objects.create(user=self.user, item_id='item', access_token='token')
+        self.client = APIClient()
+        self.client.force_authenticate(self.user)
+
+    def ingest_balances(self, **balances):
+        accounts = [
+            {'account_id': account_id, 'name': account_id, 'type': 'depository', 'balances': {'current': balance}}
+            for account_id, balance in balances.items()
+        ]
+        ingest_item(self.item, accounts)
+
+    def snapshot(self, account, when, balance):
+        BalanceSnapshot.objects.create(
+            account=account, taken_at=datetime.datetime.fromisoformat(when).replace(tzinfo=datetime.timezone.utc), balance=balance
+        )
+
+    def test_ingestion_snapshots_changed_balances(self):
+        self.ingest_balances(checking=5, savings=None)
+        self.ingest_balances(checking=5, savings=None)
+        self.assertEqual(list(BalanceSnapshot.objects.values_list('balance', flat=True)), [5])
+
+        self.ingest_balances(checking=7, savings=100)
+        self.ingest_balances(checking=7, savings=100)
+        self.assertEqual(
+            list(BalanceSnapshot.objects.order_by('id').values_list('account__account_id', 'balance')),
+            [('checking', 5), ('checking', 7), ('savings', 100)],
+        )
+
+    def test_daily_history_carries_balances_forward(self):
+        self.ingest_balances(checking=0, savings=0)
+        BalanceSnapshot.objects.all().delete()
+        checking = Account.objects.get(account_id='checking')
+        savings = Account.objects.get(account_id='savings')
+        self.snapshot(checking, '2024-01-01T10:00', 100)
+        self.snapshot(checking, '2024-01-03T12:00', 150)
+        self.snapshot(checking, '2024-01-03T18:00', 120)
+        self.snapshot(savings, '2024-01-04T09:00', 50)
+        # Another user's accounts never show up
+        other = PlaidItem.objects.create(user=User.objects.create_user('other'), item_id='other', access_token='token')
+        self.snapshot(Account.objects.create(plaid_item=other, account_id='other', name='Other', type='depository'), '2024-01-02T00:00', 999)
+
+        response = self.client.get('/api/accounts/balance-history/', {'start_date': '2024-01-02', 'end_date': '2024-01-05'})
+        self.assertEqual(response.status_code, 200)
+        data = response.json()
+        self.assertEqual(data['interval'], 'daily')
+        self.assertEqual(data['dates'], ['2024-01-02', '2024-01-03', '2024-01-04', '2024-01-05'])
+        self.assertEqual(
+            [(account['name'], account['balances']) for account in data['accounts']],
+            [('checking', [100, 120, 120, 120]), ('savings', [None, None, 50, 50])],
+        )
+        self.assertEqual(data['total'], [100, 120, 170, 170])
+
+        response = self.client.get('/api/accounts/balance-history/', {
+            'start_date': '2024-01-02', 'end_date': '2024-01-05', 'account_id': savings.id,
+        })
+        self.assertEqual(response.json()['total'], [None, None, 50, 50])
+
+    def test_buckets_end_on_sundays_and_month_ends(self):
+        self.assertEqual(
+            balances.bucket_ends(datetime.date(2024, 1, 3), datetime.date(2024, 1, 20), 'weekly'),
+            [datetime.date(2024, 1, 7), datetime.date(2024, 1, 14), datetime.date(2024, 1, 20)],
+        )
+        self.assertEqual(
+            balances.bucket_ends(datetime.date(2024, 1, 15), datetime.date(2024, 3, 10), 'monthly'),
+            [datetime.date(2024, 1, 31), datetime.date(2024, 2, 29), datetime.date(2024, 3, 10)],
+        )
+        self.assertEqual(
+            balances.bucket_ends(datetime.date(2024, 1, 15), datetime.date(2024, 2, 29), 'monthly'),
+            [datetime.date(2024, 1, 31), datetime.date(2024, 2, 29)],
+        )
+        self.assertEqual(balances.bucket_ends(datetime.date(2024, 1, 1), datetime.date(2024, 1, 1), 'weekly'), [datetime.date(2024, 1, 1)])
+
+    def test_max_points_coarsens_the_series(self):
+        self.ingest_balances(checking=10)
+        year = {'start_date': '2023-01-01', 'end_date': '2023-12-31'}
+        cases = [
+            ({}, 'daily', 365),
+            ({'max_points': 60}, 'weekly', 53),
+            ({'max_points': 12}, 'monthly', 12),
+            ({'interval': 'monthly', 'max_points': 5}, 'monthly', 4),
+        ]
+        for params, interval, points in cases:
+            data = self.client.get('/api/accounts/balance-history/', {**year, **params}).json()
+            self.assertEqual(data['interval'], interval, params)
+            self.assertEqual(len(data['dates']), points, params)
+            self.assertEqual(len(data['total']), points, params)
+            self.assertEqual(data['dates'][-1], '2023-12-31')
+
+    def test_invalid_parameters(self):
+        for params in (
+            {'start_date': '2024-13-01'},
+            {'start_date': '2024-02-01', 'end_date': '2024-01-01'},
+            {'interval': 'hourly'},
+            {'max_points': 0},
+            {'max_points': 'many'},
+            {'max_points': balances.MAX_POINTS_LIMIT + 1},
+        ):
+            response = self.client.get('/api/accounts/balance-history/', params)
+            self.assertEqual(response.status_code, 400, params)
+            self.assertIn('error', response.json())
+
+
+class RecurringChargeTests(TestCase):
+    """Ingestion re-detects recurring charges at the merchants it touched, served by /api/recurring/"""
+
+    def setUp(self):
+        get_cache().clear()
+        self.user = User.objects.create_user('owner')
+        self.item = PlaidItem.objects.create(user=self.user, item_id='item', access_token='token')
+        self.accounts = [
+            {'account_id': 'checking', 'name': 'Checking', 'type': 'depository', 'balances': {'current': 5}},
+            {'account_id': 'card', 'name': 'Card', 'type': 'credit', 'balances': {'current': 5}},
+        ]
+        self.client = APIClient()
+        self.client.force_authenticate(self.user)
+
+    def charge(self, transaction_id, date, name, amount, account_id='checking'):
+        return {
+            'transaction_id': transaction_id,
+            'account_id': account_id,
+            'amount': amount,
+            'date': date,
+            'name': name,
+            'category': ['Service'],
+            'pending': False,
+        }
+
+    def monthly(self, name, amount, start, months, prefix, account_id='checking'):
+        # Charged on the start day, a day or two late some months
+        return [
+            self.charge(
+                f"{prefix}-{month}",
+                datetime.date(start.year + (start.month + month - 1) // 12, (start.month + month - 1) % 12 + 1, start.day)
+                + datetime.timedelta(days=month % 3 == 2),
+                f"{name} {month:04d}",
+                amount,
+                account_id,
+            )
+            for month in range(months)
+        ]
+
+    def test_normalize_merchant(self):
+        cases = {
+            'NETFLIX.COM 866-579-7172': 'netflix',
+            'SQ *BLUE BOTTLE COFFEE #123': 'blue bottle coffee',
+            'PAYPAL *SPOTIFY': 'spotify',
+            'Spotify USA': 'spotify',
+            "Trader Joe's #552": "trader joe's",
+            'AMZN Mktp US*2K4': 'amzn mktp',
+            '1234': '1234',
+        }
+        for name, merchant in cases.items():
+            self.assertEqual(recurring.normalize_merchant(name), merchant, name)
+
+    def test_detect(self):
+        def dates(start, step, count):
+            return [start + datetime.timedelta(days=step * index) for index in range(count)]
+
+        start = datetime.date(2024, 1, 5)
+        steady = lambda days: [(day, Decimal('9.99')) for day in days]
+        self.assertEqual(recurring.detect(steady(dates(start, 7, 6)))[:2], ('weekly', Decimal('9.99')))
+        self.assertEqual(recurring.detect(steady(dates(start, 31, 4)))[0], 'monthly')
+        self.assertEqual(recurring.detect(steady(dates(start, 365, 2)))[0], 'annual')
+        # Too few charges, irregular gaps, or amounts all over the place
+        self.assertIsNone(recurring.detect(steady(dates(start, 7, 3))))
+        self.assertIsNone(recurring.detect(steady([start + datetime.timedelta(days=gap) for gap in (0, 3, 30, 41, 95, 99)])))
+        amounts = [Decimal(amount) for amount in ('12', '48', '7', '90', '23', '61')]
+        self.assertIsNone(recurring.detect(list(zip(dates(start, 30, 6), amounts))))
+        # A utility bill that varies a little is still monthly
+        amounts = [Decimal(amount) for amount in ('80.10', '84.55', '79.99', '88.20', '82.00')]
+        frequency, amount, confidence = recurring.detect(list(zip(dates(start, 30, 5), amounts)))
+        self.assertEqual((frequency, amount, confidence), ('monthly', Decimal('82.00'), 1.0))
+
+    def test_ingestion_detects_and_refreshes_touched_merchants(self):
+        start = datetime.date(2024, 1, 3)
+        netflix = self.monthly('NETFLIX.COM', 15.49, start, 6, 'netflix')
+        spotify = self.monthly('Spotify USA', 9.99, start, 4, 'spotify', account_id='card')
+        coffee = [self.charge(f"coffee-{day}", start + datetime.timedelta(days=day * 3 + day % 4), 'Starbucks', 4 + day) for day in range(30)]
+        ingest_item(self.item, self.accounts, netflix + spotify + coffee)
+
+        charges = {charge.merchant: charge for charge in RecurringCharge.objects.filter(user=self.user)}
+        self.assertEqual(set(charges), {'netflix', 'spotify'})
+        self.assertEqual(charges['netflix'].frequency, 'monthly')
+        self.assertEqual(charges['netflix'].amount, Decimal('15.49'))
+        self.assertEqual(charges['netflix'].occurrences, 6)
+        self.assertEqual(charges['netflix'].first_date, start)
+        self.assertEqual(charges['netflix'].last_date, datetime.date(2024, 6, 4))
+        self.assertEqual(charges['netflix'].next_date, datetime.date(2024, 7, 4))
+        self.assertEqual(charges['spotify'].account.account_id, 'card')
+
+        # A new charge only refreshes its own merchant
+        ingest_item(self.item, self.accounts, [self.charge('netflix-6', datetime.date(2024, 7, 4), 'NETFLIX.COM', 17.99)])
+        refreshed = {charge.merchant: charge for charge in RecurringCharge.objects.filter(user=self.user)}
+        self.assertEqual(refreshed['spotify'].id, charges['spotify'].id)
+        self.assertNotEqual(refreshed['netflix'].id, charges['netflix'].id)
+        self.assertEqual((refreshed['netflix'].last_amount, refreshed['netflix'].occurrences), (Decimal('17.99'), 7))
+
+        # Removing charges until the pattern breaks drops the merchant
+        ingest_item(self.item, removed_ids=['spotify-1', 'spotify-2'])
+        self.assertFalse(RecurringCharge.objects.filter(merchant='spotify').exists())
+
+        # Unlinking the account the charges were made from drops them too
+        unlink.unlink_accounts(self.item, [Account.objects.get(account_id='checking').id])
+        self.assertFalse(RecurringCharge.objects.exists())
+
+    def activity(self):
+        return sorted(MerchantActivity.objects.values_list('merchant', 'occurrences', 'first_date', 'recent_charges'))
+
+    def charges(self):
+        return sorted(RecurringCharge.objects.values_list('merchant', 'frequency', 'amount', 'occurrences', 'last_date'))
+
+    def test_incremental_refresh_matches_a_full_scan(self):
+        start = datetime.date(2024, 1, 3)
+        ingest_item(self.item, self.accounts, self.monthly('Netflix', 15.49, start, 14, 'netflix'))
+        # New charges on both accounts, a merchant change, an amount change and a removal
+        ingest_item(self.item, upserted=(
+            self.monthly('Netflix', 15.49, datetime.date(2025, 3, 3), 2, 'netflix-card', account_id='card')
+            + [self.charge('netflix-3', datetime.date(2024, 4, 3), 'Hulu', 7.99)]
+            + [self.charge('netflix-4', datetime.date(2024, 5, 3), 'Netflix', 99)]
+        ), removed_ids=['netflix-13'])
+        ingest_item(self.item, upserted=self.monthly('Hulu', 7.99, datetime.date(2024, 6, 3), 3, 'hulu'))
+
+        activity, charges = self.activity(), self.charges()
+        self.assertEqual(recurring.refresh_merchants(self.user.id), 1)
+        self.assertEqual(self.activity(), activity)
+        self.assertEqual(self.charges(), charges)
+        netflix = MerchantActivity.objects.get(merchant='netflix')
+        self.assertEqual(netflix.occurrences, 14)
+        self.assertEqual(len(netflix.recent_charges), recurring.RECENT_CHARGES)
+
+    def test_added_charges_skip_the_history(self):
+        start = datetime.date(2024, 1, 3)
+        merchants = [f"Shop {chr(ord('A') + index) * 2}" for index in range(20)]
+        ingest_item(self.item, self.accounts, [
+            charge for name in merchants for charge in self.monthly(name, 10, start, 6, name, account_id='card')
+        ])
+
+        def refresh(names):
+            added = [self.charge(f"{name}-new", datetime.date(2024, 7, 3), name, 10) for name in names]
+            with CaptureQueriesContext(connection) as captured:
+                ingest_item(self.item, upserted=added)
+            return [query['sql'] for query in captured]
+
+        few = refresh(merchants[:2])
+        self.assertEqual(len(refresh(merchants[2:])), len(few))
+        # Merchants with known activity only merge the new charges
+        self.assertFalse([sql for sql in few if 'ROW_NUMBER' in sql])
+        self.assertEqual(MerchantActivity.objects.get(merchant='shop aa').occurrences, 7)
+        self.assertEqual(RecurringCharge.objects.filter(last_date=datetime.date(2024, 7, 3)).count(), 20)
+
+    def test_recurring_endpoint(self):
+        today = datetime.date.today()
+        ingest_item(self.item, self.accounts, (
+            self.monthly('Netflix', 15.49, today - datetime.timedelta(days=150), 5, 'netflix')
+            + self.monthly('Gym', 30, today - datetime.timedelta(days=500), 5, 'gym', account_id='card')
+        ))
+        data = self.client.get('/api/recurring/').json()
+        self.assertEqual([(charge['merchant'], charge['status']) for charge in data], [('gym', 'lapsed'), ('netflix', 'active')])
+        self.assertEqual(data[1]['account_name'], 'Checking')
+
+        card = Account.objects.get(account_id='card')
+        self.assertEqual([charge['merchant'] for charge in self.client.get('/api/recurring/', {'status': 'active'}).json()], ['netflix'])
+        self.assertEqual([charge['merchant'] for charge in self.client.get('/api/recurring/', {'account_id': card.id}).json()], ['gym'])
+        self.assertEqual(self.client.get('/api/recurring/', {'frequency': 'weekly'}).json(), [])
+        self.assertEqual(self.client.get('/api/recurring/', {'status': 'cancelled'}).status_code, 400)
+
+        other = APIClient()
+        other.force_authenticate(User.objects.create_user('other'))
+        self.assertEqual(other.get('/api/recurring/').json(), [])
+
+    def test_detect_recurring_command_invalidates_cached_list(self):
+        today = datetime.date.today()
+        ingest_item(self.item, self.accounts, [])
+        first = self.client.get('/api/recurring/')
+        self.assertEqual(first.json(), [])
+
+        # Rows written behind ingestion's back are only picked up by a full re-detection
+        account = Account.objects.get(account_id='checking')
+        Transaction.objects.bulk_create([
+            Transaction(account=account, **ingestion.transaction_fields(charge))
+            for charge in self.monthly('Netflix', 15.49, today - datetime.timedelta(days=150), 5, 'netflix')
+        ])
+        call_command('detect_recurring', stdout=io.StringIO())
+        response = self.client.get('/api/recurring/', HTTP_IF_NONE_MATCH=first['ETag'])
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual([charge['merchant'] for charge in response.json()], ['netflix'])
+
+
+class ResponseFormatTests(TestCase):
+    """TransactionsList negotiates columnar JSON and MessagePack, and large bodies are compressed"""
+
+    def setUp(self):
+        get_cache().clear()
+        auth_cache().clear()
+        self.user = seed_users(1, transactions_per_account=30)[0]
+        self.client = APIClient()
+        self.client.force_authenticate(self.user)
+        self.rows = self.client.get('/api/transactions/').json()
+
+    def test_columnar_json(self):
+        response = self.client.get('/api/transactions/', HTTP_ACCEPT='application/vnd.finance.columnar+json')
+        self.assertEqual(response['Content-Type'], 'application/vnd.finance.columnar+json')
+        body = json.loads(response.content)
+        self.assertEqual(body['count'], 60)
+        self.assertEqual(len(body['dictionaries']['account_name']), 1)
+        self.assertEqual(from_columnar(body), self.rows)
+
+        page = json.loads(self.client.get('/api/transactions/', {'limit': 10, 'format': 'columnar'}).content)
+        expected = self.client.get('/api/transactions/', {'limit': 10}).json()
+        self.assertEqual(from_columnar(page['results']), expected['results'])
+        self.assertEqual(page['next'], expected['next'])
+
+    def test_msgpack(self):
+        response = self.client.get('/api/transactions/', HTTP_ACCEPT='application/msgpack')
+        self.assertEqual(response['Content-Type'], 'application/msgpack')
+        self.assertEqual(msgpack.unpackb(response.content), self.rows)
+
+    def test_each_format_has_its_own_etag(self):
+        etags = {
+            self.client.get('/api/transactions/', HTTP_ACCEPT=accept)['ETag']
+            for accept in ('application/json', 'application/vnd.finance.columnar+json', 'application/msgpack')
+        }
+        self.assertEqual(len(etags), 3)
+
+    def test_compression(self):
+        response = self.client.get('/api/transactions/', HTTP_ACCEPT_ENCODING='gzip, br')
+        self.assertEqual(response['Content-Encoding'], 'br')
+        self.assertEqual(json.loads(brotli.decompress(response.content)), self.rows)
+        self.assertTrue(response['ETag'].startswith('W/"'))
+        self.assertIn('Accept-Encoding', response['Vary'])
+
+        response = self.client.get('/api/transactions/', HTTP_ACCEPT_ENCODING='gzip, br;q=0')
+        self.assertEqual(response['Content-Encoding'], 'gzip')
+        self.assertEqual(json.loads(gzip.decompress(response.content)), self.rows)
+
+        # The weakened ETag still revalidates
+        revalidated = self.client.get(
+            '/api/transactions/', HTTP_ACCEPT_ENCODING='gzip', HTTP_IF_NONE_MATCH=response['ETag']
+        )
+        self.assertEqual(revalidated.status_code, 304)
+
+    def test_small_and_unaccepted_bodies_are_not_compressed(self):
+        self.assertFalse(self.client.get('/api/accounts/', HTTP_ACCEPT_ENCODING='br').has_header('Content-Encoding'))
+        self.assertFalse(self.client.get('/api/transactions/').has_header('Content-Encoding'))
+        self.assertEqual(accepted_encodings('gzip;q=0.5, br;q=0, identity'), {'gzip', 'identity'})
+
+    def test_format_benchmark(self):
+        output = io.StringIO()
+        call_command('benchmark_formats', rows=[200], iterations=1, stdout=output, stderr=io.StringIO())
+        results = json.loads(output.getvalue())['results']['200']
+        self.assertEqual(set(results), {'json', 'columnar', 'msgpack'})
+        self.assertLess(results['columnar']['bytes'], results['json']['bytes'])
+
+
+class TransactionSearchTests(TestCase):
+    """The q parameter full-text searches names and categories through an index kept current by every write"""
+
+    def setUp(self):
+        get_cache().clear()
+        self.user = User.objects.create_user('owner')
+        self.item = PlaidItem.objects.create(user=self.user, item_id='item', access_token='token')
+        self.client = APIClient()
+        self.client.force_authenticate(self.user)
+        self.ingest([
+            self.plaid_transaction('txn-1', 'Starbucks Coffee', 'Food and Drink'),
+            self.plaid_transaction('txn-2', 'Blue Bottle Coffee', 'Food and Drink'),
+            self.plaid_transaction('txn-3', 'United Airlines', 'Travel'),
+            self.plaid_transaction('txn-4', 'Coffee Coffee Coffee', 'Shops'),
+        ])
+
+    def plaid_transaction(self, transaction_id, name, category):
+        return {
+            'transaction_id': transaction_id,
+            'account_id': 'acct',
+            'amount': 10,
+            'date': datetime.date(2024, 1, 1),
+            'name': name,
+            'category': [category],
+            'pending': False,
+        }
+
+    def ingest(self, transactions=(), removed_ids=()):
+        accounts = [{'account_id': 'acct', 'name': 'Checking', 'type': 'depository', 'balances': {'current': 5}}]
+        with self.captureOnCommitCallbacks(execute=True):
+            ingest_item(self.item, accounts, transactions, removed_ids)
+
+    def search(self, query, **params):
+        return self.client.get('/api/transactions/', {'q': query, **params}).json()
+
+    def names(self, query):
+        return [row['name'] for row in self.search(query)]
+
+    def test_search_is_ranked_and_matches_prefixes(self):
+        self.assertEqual(self.names('coffee')[0], 'Coffee Coffee Coffee')
+        self.assertEqual(set(self.names('coffee')), {'Coffee Coffee Coffee', 'Starbucks Coffee', 'Blue Bottle Coffee'})
+        self.assertEqual(self.names('star'), ['Starbucks Coffee'])
+        self.assertEqual(self.names('travel'), ['United Airlines'])
+        self.assertEqual(self.names('blue coffee'), ['Blue Bottle Coffee'])
+        self.assertEqual(self.names('"coffee"* -'), self.names('coffee'))
+        self.assertEqual(self.names('!!'), [])
+
+    def test_index_follows_ingestion(self):
+        self.ingest([self.plaid_transaction('txn-1', 'Peets', 'Food and Drink')], removed_ids=['txn-3'])
+        self.assertEqual(self.names('star'), [])
+        self.assertEqual(self.names('peets'), ['Peets'])
+        self.assertEqual(self.names('united'), [])
+
+    def test_search_is_scoped_to_the_user_and_filters(self):
+        other = User.objects.create_user('other')
+        self.client.force_authenticate(other)
+        self.assertEqual(self.names('coffee'), [])
+        self.client.force_authenticate(self.user)
+        self.assertEqual(len(self.search('coffee', category='Shops')), 1)
+        page = self.search('coffee', limit=2)
+        self.assertEqual(len(page['results']), 2)
+        self.assertEqual(len(self.search('coffee', limit=2, cursor=page['next'])['results']), 1)
+
+
+@skipUnless(connection.vendor == 'sqlite', "SQLite keeps the search index up to date with triggers")
+class SearchIndexMigrationTests(TransactionTestCase):
+    """
+    Migrations that rebuild the SQLite transactions table drop its triggers,
+    so replay every finances migration and check search still follows writes
+    """
+
+    def setUp(self):
+        call_command('migrate', 'finances', 'zero', verbosity=0)
+        call_command('migrate', 'finances', verbosity=0)
+
+    def test_search_triggers_survive_the_migration_chain(self):
+        with connection.cursor() as cursor:
+            cursor.execute(
+                "SELECT name FROM sqlite_master WHERE type = 'trigger' AND tbl_name = %s", [search.TABLE]
+            )
+            triggers = {row[0] for row in cursor.fetchall()}
+        self.assertEqual(triggers, {f"{search.FTS_TABLE}_{event}" for event in ('insert', 'delete', 'update')})
+
+        user = User.objects.create_user('owner')
+        item = PlaidItem.objects.create(user=user, item_id='item', access_token='token')
+        account = Account.objects.create(plaid_item=item, account_id='acct', name='Checking', type='depository')
+        transaction = Transaction.objects.create(
+            account=account, transaction_id='txn', date=datetime.date(2024, 1, 1), name='Starbucks', amount=5,
+        )
+        transactions = Transaction.objects.all()
+        self.assertEqual(list(search.search(transactions, 'starb')), [transaction])
+
+        Transaction.objects.filter(id=transaction.id).update(name='Peets')
+        self.assertEqual(list(search.search(transactions, 'starb')), [])
+        self.assertEqual(list(search.search(transactions, 'peets')), [transaction])
+
+        transaction.delete()
+        self.assertEqual(list(search.search(transactions, 'peets')), [])
+
+
+class ReplicaRoutingTests(TestCase):
+    """Read-only views read from the replica until the user writes, then stick to the primary"""
+
+    def setUp(self):
+        get_cache().clear()
+        self.user = seed_users(1, transactions_per_account=1)[0]
+        self.router = db_router.PrimaryReplicaRouter()
+        patcher = mock.patch.object(db_router, 'replica_alias', return_value='replica')
+        patcher.start()
+        self.addCleanup(patcher.stop)
+
+    def test_reads_use_replica_only_when_opted_in(self):
+        self.assertEqual(self.router.db_for_read(Transaction), 'default')
+        with db_router.reading_from_replica(self.user.id):
+            self.assertEqual(self.router.db_for_read(Transaction), 'replica')
+            self.assertEqual(self.router.db_for_write(Transaction), 'default')
+        self.assertEqual(self.router.db_for_read(Transaction), 'default')
+
+    def test_write_request_pins_user_to_primary(self):
+        client = APIClient()
+        client.force_authenticate(self.user)
+        client.delete('/api/accounts/unlink-all/')
+
+        with db_router.reading_from_replica(self.user.id):
+            self.assertEqual(self.router.db_for_read(Transaction), 'default')
+        other = User.objects.create(username='other')
+        self.assertEqual(db_router.read_alias(other.id), 'replica')
+
+
+class DatabasePoolSettingsTests(SimpleTestCase):
+    """DB_POOL=true needs psycopg 3, checked when the settings load"""
+
+    def load_settings(self, installed):
+        environ = {'DB_ENGINE': 'postgresql', 'DB_POOL': 'true'}
+        find_spec = lambda name: object() if name in installed else None
+        with mock.patch.dict(os.environ, environ), mock.patch('importlib.util.find_spec', side_effect=find_spec):
+            return runpy.run_path(str(settings.BASE_DIR / 'finance_tracker' / 'settings.py'))
+
+    def test_pool_without_psycopg3_fails_fast(self):
+        with self.assertRaisesMessage(ImproperlyConfigured, 'psycopg[pool]'):
+            self.load_settings(installed={'psycopg2'})
+
+    def test_pool_with_psycopg3(self):
+        database = self.load_settings(installed={'psycopg', 'psycopg_pool'})['DATABASES']['default']
+        self.assertEqual(database['OPTIONS']['pool'], {'min_size': 2, 'max_size': 10})
+        self.assertEqual(database['CONN_MAX_AGE'], 0)
+
+
+@override_settings(SERVER_TIMING_ENABLED=True)
+class RequestMetricsTests(TestCase):
+    """Every request reports its phase timings in Server-Timing and feeds the /metrics histograms"""
+
+    def setUp(self):
+        get_cache().clear()
+        metrics.reset_metrics()
+        seed_users(1, transactions_per_account=5)
+        self.client = APIClient()
+        self.client.force_authenticate(User.objects.get())
+
+    def timings(self, response):
+        return {
+            part.split(';')[0].strip(): part
+            for part in response['Server-Timing'].split(',')
+        }
+
+    def test_server_timing_header(self):
+        with CaptureQueriesContext(connection) as captured:
+            response = self.client.get('/api/transactions/')
+        timings = self.timings(response)
+        self.assertEqual(set(timings), {'db', 'serialize', 'total'})
+        self.assertIn(f'desc="{len(captured)} queries"', timings['db'])
+
+    @override_settings(SERVER_TIMING_ENABLED=False)
+    def test_server_timing_header_is_opt_in(self):
+        self.assertNotIn('Server-Timing', self.client.get('/api/transactions/'))
+
+    @override_settings(DEBUG=True)
+    def test_metrics_endpoint(self):
+        self.client.get('/api/transactions/')
+        self.client.get('/api/transactions/')
+        body = APIClient().get('/metrics').content.decode()
+        self.assertIn(
+            'finance_http_requests_total{route="transactions_list",method="GET",status="200"} 2', body
+        )
+        self.assertIn(
+            'finance_http_request_duration_seconds_bucket{route="transactions_list",method="GET",le="+Inf"} 2', body
+        )
+        self.assertIn('finance_http_request_db_queries_count{route="transactions_list"} 2', body)
+
+    @override_settings(METRICS_TOKEN='scrape-secret')
+    def test_metrics_token(self):
+        self.assertEqual(APIClient().get('/metrics').status_code, 403)
+        response = APIClient().get('/metrics', HTTP_AUTHORIZATION='Bearer scrape-secret')
+        self.assertEqual(response.status_code, 200)
+        self.assertTrue(response['Content-Type'].startswith('text/plain; version=0.0.4'))
+
+    def test_metrics_without_token_are_hidden_outside_debug(self):
+        self.assertEqual(APIClient().get('/metrics').status_code, 404)
+
+
+@override_settings(ROOT_URLCONF='finances.tests', SERVER_TIMING_ENABLED=True)
+class AsyncReadViewTests(TestCase):
+    """The async read views answer exactly as the REST framework views, through the async middleware stack"""
+
+    def setUp(self):
+        get_cache().clear()
+        auth_cache().clear()
+        self.user = seed_users(1, transactions_per_account=30)[0]
+        self.account = Account.objects.filter(plaid_item__user=self.user).first()
+        self.token = str(AccessToken.for_user(self.user))
+        self.client = APIClient()
+        self.client.credentials(HTTP_AUTHORIZATION=f"Bearer {self.token}")
+
+        handle, self.path = tempfile.mkstemp(suffix='.json')
+        os.close(handle)
+        with open(self.path, 'w') as f:
+            json.dump([{'id': 1, 'name': 'Coffee'}, {'id': 2, 'name': 'Rent'}], f)
+        self.override = override_settings(MOCK_TRANSACTIONS_FILE=self.path)
+        self.override.enable()
+        reset_mock_dataset()
+
+    def tearDown(self):
+        self.override.disable()
+        reset_mock_dataset()
+        os.remove(self.path)
+
+    async def async_get(self, url, **headers):
+        return await self.async_client.get(url, headers={'authorization': f"Bearer {self.token}", **headers})
+
+    async def test_responses_match_sync_views(self):
+        cases = [
+            ('/api/accounts/', {}),
+            ('/api/transactions/', {}),
+            ('/api/transactions/?limit=7', {}),
+            ('/api/transactions/?q=food', {}),
+            ('/api/transactions/?limit=5', {'accept': 'application/vnd.finance.columnar+json'}),
+            ('/api/transactions/', {'accept': 'application/msgpack'}),
+            ('/api/analytics/summary/?start_date=2023-01-01', {}),
+            ('/api/mock-transactions/', {}),
+            (f'/api/mock-transactions/?account_id={self.account.id}', {}),
+        ]
+        for url, headers in cases:
+            expected = await sync_to_async(self.client.get)(
+                url, **{f"HTTP_{name.upper()}": value for name, value in headers.items()}
+            )
+            response = await self.async_get('/async' + url, **headers)
+            self.assertEqual(response.status_code, 200, url)
+            self.assertEqual(response.content, expected.content, url)
+            self.assertEqual(response['Content-Type'], expected['Content-Type'], url)
+            # Both deployments share the response cache and its validators
+            self.assertEqual(response.get('ETag'), expected.get('ETag'), url)
+
+    async def test_conditional_get(self):
+        first = await self.async_get('/async/api/transactions/')
+        second = await self.async_get('/async/api/transactions/', if_none_match=first['ETag'])
+        self.assertEqual(second.status_code, 304)
+        self.assertEqual(second.content, b'')
+
+    async def test_errors_match_api_views(self):
+        response = await self.async_client.get('/async/api/accounts/')
+        self.assertEqual(response.status_code, 401)
+        self.assertIn('Bearer', response['WWW-Authenticate'])
+
+        response = await self.async_client.get('/async/api/accounts/', headers={'authorization': 'Bearer nonsense'})
+        self.assertEqual(response.status_code, 401)
+
+        expected = await sync_to_async(self.client.get)('/api/transactions/?limit=0')
+        response = await self.async_get('/async/api/transactions/?limit=0')
+        self.assertEqual(response.status_code, 400)
+        self.assertEqual(response.content, expected.content)
+
+        response = await self.async_client.post('/async/api/accounts/', headers={'authorization': f"Bearer {self.token}"})
+        self.assertEqual(response.status_code, 405)
+
+        expected = await sync_to_async(self.client.get)('/api/mock-transactions/?account_id=999999')
+        response = await self.async_get('/async/api/mock-transactions/?account_id=999999')
+        self.assertEqual(expected.status_code, 404)
+        self.assertEqual(response.status_code, 404)
+
+    async def test_async_requests_are_measured_and_compressed(self):
+        response = await self.async_get('/async/api/transactions/', accept_encoding='br')
+        self.assertEqual(response['Content-Encoding'], 'br')
+        self.assertEqual(len(json.loads(brotli.decompress(response.content))), 60)
+        # Queries run in worker threads but still count towards the request
+        self.assertRegex(response['Server-Timing'], r'db;dur=[\d.]+;desc="[1-9]\d* queries"')
+
+
+class StubPlaidHandler(BaseHTTPRequestHandler):
+    """Minimal keep-alive Plaid stand-in; one handler instance serves one TCP connection"""
+    protocol_version = 'HTTP/1.1'
+
+    def setup(self):
+        super().setup()
+        with self.server.lock:
+            self.server.connections += 1
+
+    def do_POST(self):
+        self.rfile.read(int(self.headers.get('Content-Length', 0)))
+        body = json.dumps({'categories': [], 'request_id': 'stub'}).encode()
+        self.send_response(200)
+        self.send_header('Content-Type', 'application/json')
+        self.send_header('Content-Length', str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def log_message(self, format, *args):
+        pass
+
+
+class PlaidClientPoolingTests(SimpleTestCase):
+    """The shared Plaid client reuses pooled connections across calls and threads"""
+
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        cls.server = ThreadingHTTPServer(('127.0.0.1', 0), StubPlaidHandler)
+        cls.server.lock = threading.Lock()
+        cls.server.daemon_threads = True
+        threading.Thread(target=cls.server.serve_forever, daemon=True).start()
+        host = f"http://127.0.0.1:{cls.server.server_address[1]}"
+        cls.settings_override = override_settings(PLAID_API_HOST=host, PLAID_POOL_MAXSIZE=8)
+        cls.settings_override.enable()
+
+    @classmethod
+    def tearDownClass(cls):
+        cls.server.shutdown()
+        cls.server.server_close()
+        cls.settings_override.disable()
+        reset_plaid_client()
+        super().tearDownClass()
+
+    def setUp(self):
+        reset_plaid_client()
+        reset_latency_stats()
+        self.server.connections = 0
+
+    def test_client_is_shared(self):
+        self.assertIs(get_plaid_client(), get_plaid_client())
+
+    def test_sequential_calls_reuse_one_connection(self):
+        for _ in range(20):
+            get_plaid_client().categories_get({})
+        self.assertEqual(self.server.connections, 1)
+
+    def test_concurrent_calls_stay_within_pool_size(self):
+        with ThreadPoolExecutor(max_workers=8) as executor:
+            list(executor.map(lambda _: get_plaid_client().categories_get({}), range(80)))
+        self.assertLessEqual(self.server.connections, 8)
+        self.assertLess(self.server.connections, 80)
+
+    def test_latency_is_recorded_per_endpoint(self):
+        for _ in range(3):
+            get_plaid_client().categories_get({})
+        stats = get_latency_stats()['/categories/get']
+        self.assertEqual(stats['count'], 3)
+        self.assertEqual(stats['errors'], 0)
+        self.assertGreater(stats['total_seconds'], 0)
+
+
+class ScriptedPlaidHandler(BaseHTTPRequestHandler):
+    """Answers each Plaid path with the next status scripted for it (200 once the script runs out)"""
+    protocol_version = 'HTTP/1.1'
+
+    def do_POST(self):
+        self.rfile.read(int(self.headers.get('Content-Length', 0)))
+        with self.server.lock:
+            self.server.requests.append(self.path)
+            statuses = self.server.statuses.get(self.path, [])
+            status = statuses.pop(0) if statuses else 200
+        if status == 200:
+            body = {'access_token': 'access-token', 'item_id': 'item', 'request_id': 'stub'}
+        else:
+            body = {'error_type': 'API_ERROR', 'error_code': 'INTERNAL_SERVER_ERROR', 'request_id': 'stub'}
+        body = json.dumps(body).encode()
+        self.send_response(status)
+        if status == 429:
+            self.send_header('Retry-After', '0')
+        self.send_header('Content-Type', 'application/json')
+        self.send_header('Content-Length', str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def log_message(self, format, *args):
+        pass
+
+
+class PlaidClientRetryTests(SimpleTestCase):
+    """The Plaid client only retries calls Plaid cannot have acted on"""
+
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        cls.server = ThreadingHTTPServer(('127.0.0.1', 0), ScriptedPlaidHandler)
+        cls.server.lock = threading.Lock()
+        cls.server.daemon_threads = True
+        threading.Thread(target=cls.server.serve_forever, daemon=True).start()
+        cls.settings_override = override_settings(
+            PLAID_API_HOST=f"http://127.0.0.1:{cls.server.server_address[1]}",
+            PLAID_CLIENT_ID='client',
+            PLAID_SECRET='secret',
+            PLAID_MAX_RETRIES=3,
+            PLAID_RATE_LIMIT_RETRIES=1,
+            PLAID_RETRY_BACKOFF=0,
+        )
+        cls.settings_override.enable()
+
+    @classmethod
+    def tearDownClass(cls):
+        cls.server.shutdown()
+        cls.server.server_close()
+        cls.settings_override.disable()
+        reset_plaid_client()
+        super().tearDownClass()
+
+    def setUp(self):
+        reset_plaid_client()
+        self.server.requests = []
+
+    def exchange(self):
+        return get_plaid_client().item_public_token_exchange({'public_token': 'public-token'})
+
+    def test_server_error_on_token_exchange_is_not_resent(self):
+        self.server.statuses = {'/item/public_token/exchange': [500]}
+        with self.assertRaises(plaid.ApiException) as raised:
+            self.exchange()
+        self.assertEqual(raised.exception.status, 500)
+        self.assertEqual(self.server.requests, ['/item/public_token/exchange'])
+
+    def test_rate_limit_is_retried_after_retry_after(self):
+        self.server.statuses = {'/item/public_token/exchange': [429]}
+        self.assertEqual(self.exchange()['access_token'], 'access-token')
+        self.assertEqual(len(self.server.requests), 2)
+
+        # Once the rate limit retries are spent the 429 reaches the caller (and the job queue's backoff)
+        self.server.requests = []
+        self.server.statuses = {'/item/public_token/exchange': [429, 429, 429]}
+        with self.assertRaises(plaid.ApiException) as raised:
+            self.exchange()
+        self.assertEqual(raised.exception.status, 429)
+        self.assertEqual(len(self.server.requests), 2)
+
+
+class RecordingExecutor:
+    """Stands in for the Plaid thread pool, holding submitted calls until run() is called"""
+
+    def __init__(self):
+        self.calls = []
+
+    def submit(self, function, *args):
+        self.calls.append((function, args))
+
+    def run(self):
+        calls, self.calls = self.calls, []
+        for function, args in calls:
+            function(*args)
+
+
+class InstitutionCacheClient:
+    """A Plaid client stub that counts institution lookups, optionally failing them"""
+
+    def __init__(self, error=None):
+        self.error = error
+        self.calls = 0
+
+    def institutions_get_by_id(self, request):
+        self.calls += 1
+        if self.error:
+            raise self.error
+        return {'institution': {'name': f"Bank {self.calls}", 'url': 'https://bank.example'}}
+
+
+@override_settings(INSTITUTION_TTL_SECONDS=60, INSTITUTION_MAX_STALE_SECONDS=3600, PLAID_POOL_MAXSIZE=2)
+class InstitutionCacheTests(TestCase):
+    """Institutions are served while fresh, refreshed in the background while stale and refetched once expired"""
+
+    def setUp(self):
+        self.plaid = InstitutionCacheClient()
+        self.executor = RecordingExecutor()
+        patches = [
+            mock.patch.object(institutions, 'get_plaid_client', return_value=self.plaid),
+            mock.patch.object(institutions, 'get_plaid_executor', return_value=self.executor),
+        ]
+        for patch in patches:
+            patch.start()
+            self.addCleanup(patch.stop)
+        self.addCleanup(institutions._refreshing.clear)
+
+    def institution(self, institution_id='ins_1', age=0):
+        return Institution.objects.create(
+            institution_id=institution_id,
+            name='Cached Bank',
+            fetched_at=timezone.now() - datetime.timedelta(seconds=age),
+        )
+
+    def test_fresh_hit_skips_plaid(self):
+        cached = self.institution(age=30)
+        self.assertEqual(institutions.get_institution('ins_1', self.plaid), cached)
+        self.assertEqual(self.plaid.calls, 0)
+        self.assertEqual(self.executor.calls, [])
+
+    def test_stale_hit_triggers_exactly_one_refresh(self):
+        self.institution(age=600)
+        for _ in range(5):
+            self.assertEqual(institutions.get_institution('ins_1', self.plaid).name, 'Cached Bank')
+        self.assertEqual(len(self.executor.calls), 1)
+        self.assertEqual(self.plaid.calls, 0)
+
+        self.executor.run()
+        self.assertEqual(self.plaid.calls, 1)
+        self.assertEqual(institutions.get_institution('ins_1', self.plaid).name, 'Bank 1')
+        self.assertEqual(institutions._refreshing, set())
+        self.assertEqual(self.executor.calls, [])
+
+    def test_failed_refresh_releases_its_claim(self):
+        self.institution(age=600)
+        self.plaid.error = RuntimeError('connection reset')
+        institutions.get_institution('ins_1', self.plaid)
+        with self.assertLogs('finances.institutions', 'ERROR'):
+            self.executor.run()
+        self.assertEqual(institutions._refreshing, set())
+
+        # The next stale read tries again
+        institutions.get_institution('ins_1', self.plaid)
+        self.assertEqual(len(self.executor.calls), 1)
+
+    def test_refreshes_in_flight_are_bounded_by_the_pool_size(self):
+        for index in range(4):
+            self.institution(f"ins_{index}", age=600)
+            institutions.get_institution(f"ins_{index}", self.plaid)
+        self.assertEqual(len(self.executor.calls), 2)
+
+    def test_failed_submit_releases_its_claim(self):
+        self.institution(age=600)
+        self.executor.submit = mock.Mock(side_effect=RuntimeError('cannot schedule new futures after shutdown'))
+        with self.assertRaises(RuntimeError):
+            institutions.get_institution('ins_1', self.plaid)
+        self.assertEqual(institutions._refreshing, set())
+
+    def test_expired_row_is_fetched_synchronously(self):
+        self.institution(age=7200)
+        self.assertEqual(institutions.get_institution('ins_1', self.plaid).name, 'Bank 1')
+        self.assertEqual(self.plaid.calls, 1)
+        self.assertEqual(self.executor.calls, [])
+
+    def test_expired_row_is_served_when_plaid_fails(self):
+        self.institution(age=7200)
+        self.plaid.error = plaid.ApiException(status=500)
+        with self.assertLogs('finances.institutions', 'WARNING'):
+            self.assertEqual(institutions.get_institution('ins_1', self.plaid).name, 'Cached Bank')
+
+
+class FakePlaidTestCase(TestCase):
+    """Runs the app against the local fake Plaid server"""
+
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        cls.config = FakePlaidConfig(accounts_per_item=2, transactions_per_account=50)
+        cls.server = start_fake_plaid(cls.config)
+        cls.settings_override = override_settings(
+            PLAID_ENV='local', PLAID_LOCAL_URL=cls.server.url, PLAID_API_HOST=None, PLAID_MAX_RETRIES=0,
+            PLAID_RATE_LIMIT_RETRIES=0,
+        )
+        cls.settings_override.enable()
+
+    @classmethod
+    def tearDownClass(cls):
+        cls.server.shutdown()
+        cls.server.server_close()
+        cls.settings_override.disable()
+        reset_plaid_client()
+        super().tearDownClass()
+
+    def setUp(self):
+        reset_plaid_client()
+        self.config.rate_limit_rate = 0
+        self.config.changes_per_sync = 0
+        self.server.request_counts.clear()
+        self.user = User.objects.create(username='linker')
+        self.client = APIClient()
+        self.client.force_authenticate(self.user)
+
+    def link(self, rate_limit_rate=0):
+        response = self.client.post('/api/exchange-token/', {'public_token': 'public-local-test'}, format='json')
+        self.assertEqual(response.status_code, 202)
+        self.config.rate_limit_rate = rate_limit_rate
+        run_pending('test-worker')
+        return Job.objects.get(id=response.data['job_id'])
+
+
+class FakePlaidImportTests(FakePlaidTestCase):
+    """Linking an item against the local fake Plaid server imports its full history"""
+
+    @override_settings(SERVER_TIMING_ENABLED=True)
+    def test_plaid_time_is_reported(self):
+        response = self.client.post('/api/exchange-token/', {'public_token': 'public-local-test'}, format='json')
+        self.assertIn('plaid;dur=', response['Server-Timing'])
+        self.assertIn('desc="1 calls"', response['Server-Timing'])
+
+    def test_import_item(self):
+        job = self.link()
+        self.assertEqual(job.status, Job.SUCCEEDED)
+        self.assertEqual(job.result['accounts'], 2)
+        self.assertEqual(Transaction.objects.filter(account__plaid_item__user=self.user).count(), 100)
+        self.assertIsNotNone(job.plaid_item.institution.name)
+
+    def test_sync_snapshots_balances_once(self):
+        job = self.link()
+        self.assertEqual(BalanceSnapshot.objects.filter(account__plaid_item=job.plaid_item).count(), 2)
+        # The balances came back unchanged, so a second sync writes no snapshots
+        job.plaid_item.sync_cursor = None
+        sync_item(job.plaid_item)
+        self.assertEqual(BalanceSnapshot.objects.filter(account__plaid_item=job.plaid_item).count(), 2)
+
+    def test_exchanged_items_survive_a_restart(self):
+        exchanged = item_public_token_exchange(FakePlaidData(self.config), {'public_token': 'public-local-a'})
+        # A restarted server has none of the first one's memory, yet links a
+        # new token to a new item and the old token to the same one
+        restarted = FakePlaidData(self.config)
+        other = item_public_token_exchange(restarted, {'public_token': 'public-local-b'})
+        self.assertNotEqual(other['item_id'], exchanged['item_id'])
+        self.assertEqual(item_public_token_exchange(restarted, {'public_token': 'public-local-a'}), exchanged)
+
+    def test_rate_limited_import_is_retried(self):
+        job = self.link(rate_limit_rate=1)
+        self.assertEqual(job.status, Job.QUEUED)
+        self.assertIn('RATE_LIMIT_EXCEEDED', job.last_error)
+        self.assertEqual(Transaction.objects.count(), 0)
+
+
+class JobLeaseTests(TestCase):
+    """Running jobs hold a lease, and only expired leases are returned to the queue"""
+
+    def setUp(self):
+        self.user = User.objects.create(username='worker')
+        enqueue('remove_item', self.user, params={'access_token': 'access-1', 'item_id': 'item-1'})
+
+    def test_claim_takes_a_lease(self):
+        job = claim_next_job('worker-1')
+        self.assertGreater(job.lease_expires_at, timezone.now())
+
+    def test_job_of_a_live_worker_is_not_requeued(self):
+        job = claim_next_job('worker-1')
+        # Long past the old startup cutoff, but the heartbeat kept the lease fresh
+        Job.objects.filter(id=job.id).update(updated_at=timezone.now() - datetime.timedelta(hours=1))
+        self.assertEqual(requeue_stale_jobs(), 0)
+        self.assertEqual(Job.objects.get(id=job.id).status, Job.RUNNING)
+
+    def test_expired_lease_is_requeued(self):
+        job = claim_next_job('worker-1')
+        Job.objects.filter(id=job.id).update(lease_expires_at=timezone.now() - datetime.timedelta(seconds=1))
+        self.assertEqual(requeue_stale_jobs(), 1)
+        job.refresh_from_db()
+        self.assertEqual((job.status, job.locked_by, job.lease_expires_at), (Job.QUEUED, '', None))
+
+    def test_renewed_lease_is_not_requeued(self):
+        job = claim_next_job('worker-1')
+        Job.objects.filter(id=job.id).update(lease_expires_at=timezone.now() - datetime.timedelta(seconds=1))
+        self.assertTrue(jobs.renew_lease(job))
+        self.assertEqual(requeue_stale_jobs(), 0)
+
+    def test_lease_of_a_requeued_job_is_not_renewed(self):
+        job = claim_next_job('worker-1')
+        Job.objects.filter(id=job.id).update(status=Job.QUEUED, locked_by='')
+        self.assertFalse(jobs.renew_lease(job))
+
+    @override_settings(JOB_HEARTBEAT_SECONDS=0.01)
+    def test_heartbeat_renews_the_lease_while_the_job_runs(self):
+        job = claim_next_job('worker-1')
+        renewed = threading.Event()
+
+        def slow_handler(job):
+            self.assertTrue(renewed.wait(5))
+            return {}
+
+        # The heartbeat thread's own connection can't see this test's transaction
+        with mock.patch.dict(jobs.HANDLERS, {'remove_item': slow_handler}), \
+                mock.patch.object(jobs, 'renew_lease', side_effect=lambda job: renewed.set() or True) as renew:
+            run_job(job)
+        renew.assert_called_with(job)
+        self.assertEqual(Job.objects.get(id=job.id).status, Job.SUCCEEDED)
+
+
+class FakePlaidSyncTests(FakePlaidTestCase):
+    """Later syncs apply Plaid's modified and removed deltas and advance the stored cursor"""
+
+    def amounts(self, plaid_item):
+        return dict(Transaction.objects.filter(account__plaid_item=plaid_item).values_list('transaction_id', 'amount'))
+
+    def test_modified_and_removed_transactions(self):
+        plaid_item = self.link().plaid_item
+        history = self.server.data.transactions(int(plaid_item.item_id.removeprefix('local-item-')))
+        before = self.amounts(plaid_item)
+        self.assertEqual(plaid_item.sync_cursor, 'local-100')
+
+        self.config.changes_per_sync = 3
+        result = sync_item(plaid_item)
+        self.assertEqual((result.added, result.modified, result.removed), (0, 3, 3))
+        after = self.amounts(plaid_item)
+        self.assertEqual(len(after), 97)
+        for transaction in history[:3]:
+            self.assertEqual(after[transaction['transaction_id']], before[transaction['transaction_id']] + 1)
+        for transaction in history[3:6]:
+            self.assertNotIn(transaction['transaction_id'], after)
+        # Rollups follow the deltas
+        self.assertEqual(
+            DailyRollup.objects.filter(account__plaid_item=plaid_item).aggregate(count=Sum('count'))['count'], 97
+        )
+
+        plaid_item.refresh_from_db()
+        self.assertEqual(plaid_item.sync_cursor, 'local-100-1')
+        # The next sync starts from the stored cursor and brings the next changes only
+        self.assertEqual(sync_item(plaid_item).as_dict(), {'added': 0, 'modified': 3, 'removed': 3, 'pages': 1})
+        self.assertEqual(len(self.amounts(plaid_item)), 94)
+        plaid_item.refresh_from_db()
+        self.assertEqual(plaid_item.sync_cursor, 'local-100-2')
+
+    def test_cursor_is_kept_when_writing_fails(self):
+        plaid_item = self.link().plaid_item
+        self.config.changes_per_sync = 3
+        with mock.patch('finances.sync.ingest_item', side_effect=RuntimeError('disk full')):
+            with self.assertRaises(RuntimeError):
+                sync_item(plaid_item)
+        plaid_item.refresh_from_db()
+        self.assertEqual(plaid_item.sync_cursor, 'local-100')
+        self.assertEqual(len(self.amounts(plaid_item)), 100)
+
+        # The retry asks for the same changes again
+        self.assertEqual(sync_item(plaid_item).removed, 3)
+        plaid_item.refresh_from_db()
+        self.assertEqual(plaid_item.sync_cursor, 'local-100-1')
+
+
+class ScriptedSyncClient:
+    """A Plaid client whose /transactions/sync answers come from a script of pages and errors"""
+
+    def __init__(self, script):
+        self.script = list(script)
+        self.requests = []
+
+    def transactions_sync(self, request):
+        self.requests.append(request.get('cursor'))
+        step = self.script.pop(0)
+        if isinstance(step, Exception):
+            raise step
+        return step
+
+
+class SyncPaginationTests(TestCase):
+    """sync_item pages from the stored cursor, restarts on mutation and stores the cursor only after writing"""
+
+    def setUp(self):
+        self.user = User.objects.create_user('owner')
+        self.item = PlaidItem.objects.create(user=self.user, item_id='item', access_token='token', sync_cursor='start')
+        ingest_item(self.item, [{'account_id': 'acct', 'name': 'Checking', 'type': 'depository', 'balances': {'current': 5}}])
+
+    def page(self, added=(), next_cursor='next', has_more=False, modified=(), removed=()):
+        return {
+            'added': [self.transaction(transaction_id) for transaction_id in added],
+            'modified': list(modified),
+            'removed': [{'transaction_id': transaction_id, 'account_id': 'acct'} for transaction_id in removed],
+            'next_cursor': next_cursor,
+            'has_more': has_more,
+            'accounts': [],
+        }
+
+    def transaction(self, transaction_id, amount=10):
+        return {
+            'transaction_id': transaction_id,
+            'account_id': 'acct',
+            'amount': amount,
+            'date': datetime.date(2024, 1, 1),
+            'name': 'Merchant',
+            'category': ['Shops'],
+            'pending': False,
+        }
+
+    def error(self, code):
+        error = plaid.ApiException(status=400, reason='Bad Request')
+        error.body = json.dumps({'error_code': code, 'error_type': 'TRANSACTIONS_ERROR'})
+        return error
+
+    def transaction_ids(self):
+        return sorted(Transaction.objects.values_list('transaction_id', flat=True))
+
+    def test_restarts_from_the_stored_cursor_on_mutation(self):
+        client = ScriptedSyncClient([
+            self.page(['a', 'b'], next_cursor='page-2', has_more=True),
+            self.error(MUTATION_DURING_PAGINATION),
+            self.page(['a', 'b'], next_cursor='page-2', has_more=True),
+            self.page(['c'], next_cursor='end'),
+        ])
+        result = sync_item(self.item, client)
+        self.assertEqual(client.requests, ['start', 'page-2', 'start', 'page-2'])
+        # The abandoned pages are not applied twice
+        self.assertEqual((result.added, result.pages), (3, 2))
+        self.assertEqual(self.transaction_ids(), ['a', 'b', 'c'])
+        self.item.refresh_from_db()
+        self.assertEqual(self.item.sync_cursor, 'end')
+
+    def test_failed_pagination_writes_nothing(self):
+        client = ScriptedSyncClient([
+            self.page(['a'], next_cursor='page-2', has_more=True),
+            self.error('INTERNAL_SERVER_ERROR'),
+        ])
+        with self.assertRaises(plaid.ApiException):
+            sync_item(self.item, client)
+        self.assertEqual(self.transaction_ids(), [])
+        self.item.refresh_from_db()
+        self.assertEqual(self.item.sync_cursor, 'start')
+
+    def test_modified_and_removed_deltas(self):
+        sync_item(self.item, ScriptedSyncClient([self.page(['a', 'b', 'c'])]))
+        result = sync_item(self.item, ScriptedSyncClient([
+            self.page(modified=[self.transaction('a', amount=25)], removed=['b'], next_cursor='after'),
+        ]))
+        self.assertEqual((result.added, result.modified, result.removed), (0, 1, 1))
+        self.assertEqual(self.transaction_ids(), ['a', 'c'])
+        self.assertEqual(Transaction.objects.get(transaction_id='a').amount, 25)
+        self.item.refresh_from_db()
+        self.assertEqual(self.item.sync_cursor, 'after')
+
+
+@override_settings(ROOT_URLCONF='finances.tests', SERVER_TIMING_ENABLED=True)
+class AsyncLinkTokenTests(FakePlaidTestCase):
+    """Under ASGI, link tokens are created on the Plaid thread pool, not the event loop"""
+
+    async def test_link_token(self):
+        token = AccessToken.for_user(self.user)
+        with mock.patch.object(
+            plaid_client, 'get_plaid_executor', wraps=plaid_client.get_plaid_executor
+        ) as get_executor:
+            response = await self.async_client.get('/async/api/link-token/', headers={'authorization': f"Bearer {token}"})
+        self.assertEqual(response.status_code, 200)
+        self.assertTrue(json.loads(response.content)['link_token'])
+        get_executor.assert_called_once()
+        # The call still counts as Plaid time of the request
+        self.assertIn('desc="1 calls"', response['Server-Timing'])
+
+
+class UnlinkTests(FakePlaidTestCase):
+    """Unlinking deletes in chunks, in the background for large accounts, and removes the item at Plaid"""
+
+    def setUp(self):
+        super().setUp()
+        self.link()
+        self.accounts = list(Account.objects.filter(plaid_item__user=self.user).order_by('id'))
+
+    def test_small_unlink_runs_inline(self):
+        with self.captureOnCommitCallbacks(execute=True):
+            response = self.client.delete(f"/api/accounts/{self.accounts[0].id}/unlink/")
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(Transaction.objects.filter(account__plaid_item__user=self.user).count(), 50)
+
+        response = self.client.delete(f"/api/accounts/{self.accounts[1].id}/unlink/")
+        self.assertEqual(response.data['message'], "Account and associated item have been unlinked")
+        self.assertFalse(PlaidItem.objects.filter(user=self.user).exists())
+
+        run_pending('test-worker')
+        self.assertEqual(Job.objects.get(kind='remove_item').status, Job.SUCCEEDED)
+        self.assertEqual(self.server.request_counts['/item/remove'], 1)
+
+    @override_settings(UNLINK_ASYNC_THRESHOLD=10, UNLINK_CHUNK_SIZE=7)
+    def test_large_unlink_runs_in_background(self):
+        with self.captureOnCommitCallbacks(execute=True):
+            response = self.client.delete('/api/accounts/unlink-all/')
+        self.assertEqual(response.status_code, 202)
+        self.assertEqual(response.data['status'], 'pending')
+
+        # Hidden from reads before the worker has deleted anything
+        self.assertEqual(self.client.get('/api/accounts/').json(), [])
+        self.assertEqual(self.client.get('/api/transactions/').json(), [])
+        self.assertEqual(Transaction.objects.count(), 100)
+
+        run_pending('test-worker')
+        job = self.client.get(f"/api/jobs/{response.data['job_ids'][0]}/").json()
+        self.assertEqual(job['status'], Job.SUCCEEDED)
+        self.assertEqual(job['result']['transactions'], 100)
+        self.assertEqual(Transaction.objects.count(), 0)
+        self.assertFalse(PlaidItem.objects.exists())
+        self.assertEqual(self.server.request_counts['/item/remove'], 1)
+
+    def test_recurring_charges_of_an_account_being_unlinked_are_hidden(self):
+        start = datetime.date.today() - datetime.timedelta(days=120)
+        Transaction.objects.bulk_create([
+            Transaction(
+                account=self.accounts[0], transaction_id=f"gym-{month}", date=start + datetime.timedelta(days=30 * month),
+                name='Gym', merchant='gym', amount=30,
+            )
+            for month in range(5)
+        ])
+        recurring.refresh_merchants(self.user.id)
+        self.assertEqual([charge['merchant'] for charge in self.client.get('/api/recurring/').json()], ['gym'])
+
+        with self.captureOnCommitCallbacks(execute=True):
+            unlink.mark_unlinking([self.accounts[0].id])
+            bump_data_version(self.user.id)
+        self.assertEqual(self.client.get('/api/recurring/').json(), [])
+        # A full re-detection while the unlink runs does not bring the charge back
+        recurring.refresh_merchants(self.user.id)
+        self.assertFalse(RecurringCharge.objects.filter(merchant='gym').exists())
+
+    def test_account_being_unlinked_cannot_be_unlinked_again(self):
+        Account.objects.filter(id=self.accounts[0].id).update(unlinking=True)
+        response = self.client.delete(f"/api/accounts/{self.accounts[0].id}/unlink/")
+        self.assertEqual(response.status_code, 404)
+
+
+class BenchmarkApiCommandTests(TestCase):
+    """The API benchmark drives every endpoint and leaves no seeded rows behind"""
+
+    def test_report(self):
+        output = io.StringIO()
+        call_command('benchmark_api', rows=[50], iterations=2, stdout=output, stderr=io.StringIO())
+        results = json.loads(output.getvalue())['results']['50']
+
+        self.assertEqual({result['status'] for result in results.values()}, {200})
+        # Cached responses only read the data version once the user is in the auth cache
+        self.assertEqual(results['transactions_cached']['queries'], 1)
+        self.assertLessEqual(results['transactions']['p50_ms'], results['transactions']['p99_ms'])
+        overhead = json.loads(output.getvalue())['metrics_overhead']['50']
+        self.assertEqual(
+            set(overhead), {'p50_with_metrics_us', 'p50_without_metrics_us', 'overhead_us', 'overhead_percent'}
+        )
+        self.assertFalse(User.objects.filter(username__startswith='api-benchmark').exists())
+
+
+class ManagementCommandUserTests(TestCase):
+    """Commands taking --user accept a username or an id and reject unknown users"""
+
+    def test_user_lookup(self):
+        user = User.objects.create_user('owner')
+        for command in ('sync_transactions', 'rebuild_rollups', 'detect_recurring'):
+            for lookup in ('owner', str(user.id)):
+                call_command(command, user=lookup, stdout=io.StringIO())
+            with self.assertRaisesMessage(CommandError, "User 'nobody' does not exist"):
+                call_command(command, user='nobody', stdout=io.StringIO())
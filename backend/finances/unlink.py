@@ -0,0 +1,72 @@
+import logging
+
+from django.conf import settings
+from django.db import transaction as db_transaction
+
+from . import jobs, recurring
+from .cache import bump_data_version
+from .models import Account, Transaction
+
+logger = logging.getLogger(__name__)
+
+
+def is_large(account_ids):
+    """True when the accounts hold more transactions than an unlink should delete inline"""
+    threshold = settings.UNLINK_ASYNC_THRESHOLD
+    # Stops counting at the threshold instead of counting every row
+    return Transaction.objects.filter(account_id__in=account_ids).order_by()[threshold:threshold + 1].exists()
+
+
+def delete_transactions(account_ids, chunk_size=None):
+    """
+    Delete the accounts' transactions in bounded chunks, each in its own
+    short transaction, so a large account never holds a long write lock.
+    Transaction has no cascades or signal receivers, so each chunk is a
+    single set-based DELETE without loading rows into Python.
+    """
+    chunk_size = chunk_size or settings.UNLINK_CHUNK_SIZE
+    queryset = Transaction.objects.filter(account_id__in=account_ids).order_by()
+    deleted = 0
+    while True:
+        ids = list(queryset.values_list('id', flat=True)[:chunk_size])
+        if not ids:
+            return deleted
+        with db_transaction.atomic():
+            count, _ = Transaction.objects.filter(id__in=ids).delete()
+        deleted += count
+
+
+def mark_unlinking(account_ids):
+    """Hide accounts from every read while a background job deletes them"""
+    return Account.objects.filter(id__in=account_ids).update(unlinking=True)
+
+
+def unlink_accounts(plaid_item, account_ids, chunk_size=None):
+    """
+    Delete the given accounts of an item and their transactions. When no
+    accounts remain the item is deleted too, and a job is queued to remove
+    it at Plaid so it stops accruing upstream.
+    """
+    # Recurring charges at these merchants are re-detected from the accounts left
+    merchants = recurring.touched_merchants(Transaction.objects.filter(account_id__in=account_ids))
+    transactions = delete_transactions(account_ids, chunk_size)
+
+    with db_transaction.atomic():
+        Account.objects.filter(plaid_item=plaid_item, id__in=account_ids).delete()
+        item_removed = not Account.objects.filter(plaid_item=plaid_item).exists()
+        if item_removed:
+            jobs.enqueue(
+                jobs.REMOVE_ITEM,
+                plaid_item.user,
+                params={'item_id': plaid_item.item_id, 'access_token': plaid_item.access_token},
+            )
+            plaid_item.delete()
+        recurring.refresh_merchants(plaid_item.user_id, merchants)
+        bump_data_version(plaid_item.user_id)
+
+    logger.info(f"Unlinked {len(account_ids)} accounts ({transactions} transactions) from item {plaid_item.item_id}")
+    return {
+        'accounts': len(account_ids),
+        'transactions': transactions,
+        'item_removed': item_removed,
+    }
@@ -1,25 +1,41 @@
+from django.conf import settings
 from django.urls import path
 from .views import (
-    CreateLinkToken,
+    BalanceHistory,
     ExchangePublicToken,
-    AccountsList,
-    TransactionsList,
+    JobStatus,
+    RecurringChargesList,
+    TransactionsExport,
     UnlinkAccount,
     UnlinkAllAccounts,
-    MockTransactions
 )
+from . import async_views, views
 
-urlpatterns = [
-    # Plaid integration endpoints
-    path('link-token/', CreateLinkToken.as_view(), name='create_link_token'),
-    path('exchange-token/', ExchangePublicToken.as_view(), name='exchange_token'),
-    
-    # Data retrieval endpoints
-    path('accounts/', AccountsList.as_view(), name='accounts_list'),
-    path('transactions/', TransactionsList.as_view(), name='transactions_list'),
-    path('mock-transactions/', MockTransactions.as_view(), name='mock_transactions'),
-    
-    # Account management endpoints
-    path('accounts/<int:account_id>/unlink/', UnlinkAccount.as_view(), name='unlink_account'),
-    path('accounts/unlink-all/', UnlinkAllAccounts.as_view(), name='unlink_all_accounts'),
-] 
\ No newline at end of file
+
+def api_urlpatterns(read_views):
+    """
+    The API routes, with link tokens and the hot read endpoints served by the
+    `read_views` module: views, or async_views when ASYNC_READ_VIEWS is set
+    """
+    return [
+        # Plaid integration endpoints
+        path('link-token/', read_views.CreateLinkToken.as_view(), name='create_link_token'),
+        path('exchange-token/', ExchangePublicToken.as_view(), name='exchange_token'),
+        path('jobs/<int:job_id>/', JobStatus.as_view(), name='job_status'),
+
+        # Data retrieval endpoints
+        path('accounts/', read_views.AccountsList.as_view(), name='accounts_list'),
+        path('accounts/balance-history/', BalanceHistory.as_view(), name='balance_history'),
+        path('transactions/', read_views.TransactionsList.as_view(), name='transactions_list'),
+        path('transactions/export/', TransactionsExport.as_view(), name='transactions_export'),
+        path('mock-transactions/', read_views.MockTransactions.as_view(), name='mock_transactions'),
+        path('analytics/summary/', read_views.AnalyticsSummary.as_view(), name='analytics_summary'),
+        path('recurring/', RecurringChargesList.as_view(), name='recurring_charges'),
+
+        # Account management endpoints
+        path('accounts/<int:account_id>/unlink/', UnlinkAccount.as_view(), name='unlink_account'),
+        path('accounts/unlink-all/', UnlinkAllAccounts.as_view(), name='unlink_all_accounts'),
+    ]
+
+
+urlpatterns = api_urlpatterns(async_views if settings.ASYNC_READ_VIEWS else views)
@@ -2,26 +2,75 @@ from django.shortcuts import render
 from rest_framework.views import APIView
 from rest_framework.response import Response
 from rest_framework.permissions import IsAuthenticated
+from rest_framework.settings import api_settings
 from rest_framework import status
 from django.shortcuts import get_object_or_404
-from .models import PlaidItem, Account, Transaction
-from .serializers import AccountSerializer, TransactionSerializer
+from django.http import HttpResponse, StreamingHttpResponse
+from django.utils import timezone
+from django.utils.cache import parse_etags
+from django.conf import settings
+from django.db import transaction as db_transaction
+from .models import PlaidItem, Account, Transaction, DailyRollup, Job, RecurringCharge
+from .serializers import AccountSerializer, JobSerializer, RecurringChargeSerializer, transaction_values, serialize_transactions
 from .plaid_client import get_plaid_client
+from .pagination import TransactionKeysetPagination
+from .mock_data import get_mock_dataset
+from .renderers import ColumnarJSONRenderer, MessagePackRenderer
+from . import analytics, balances, cache, db_router, export, jobs, metrics, search, unlink
 import datetime
 import plaid
 from django.utils.decorators import method_decorator
 from django.views.decorators.csrf import csrf_exempt
 import logging
 import traceback
-import json
-import os
-import hashlib
 
 # Create logger
 logger = logging.getLogger(__name__)
 
 # Create your views here.
 
+class ReplicaReadMixin:
+    """
+    Serve the view's queries from the read replica, unless the user wrote
+    recently and must read their own changes from the primary
+    """
+    
+    def initial(self, request, *args, **kwargs):
+        # Runs after authentication, so the user is known
+        super().initial(request, *args, **kwargs)
+        self.replica_reads = db_router.reading_from_replica(request.user.id)
+        self.replica_reads.__enter__()
+    
+    def finalize_response(self, request, response, *args, **kwargs):
+        replica_reads = getattr(self, 'replica_reads', None)
+        if replica_reads is not None:
+            replica_reads.__exit__(None, None, None)
+            self.replica_reads = None
+        return super().finalize_response(request, response, *args, **kwargs)
+
+def etag_matches(if_none_match, etag):
+    """Weak comparison of an If-None-Match header against an ETag"""
+    if not if_none_match:
+        return False
+    if if_none_match.strip() == '*':
+        return True
+    return any(candidate.removeprefix('W/') == etag for candidate in parse_etags(if_none_match))
+
+def conditional_response(request, namespace, params, build):
+    """
+    Respond with the user's (cached) build() result, or with an empty 304 Not
+    Modified when the client's If-None-Match still matches. The ETag comes
+    from the user's data version, so a revalidation costs one primary-key
+    lookup and never touches the user's transactions.
+    """
+    version = cache.get_data_version(request.user.id)
+    etag = cache.etag(request.user.id, namespace, params, request.accepted_renderer.format, version)
+    # Browsers must revalidate each time, and shared caches must not store per-user data
+    headers = {'ETag': etag, 'Cache-Control': 'private, no-cache'}
+    if etag_matches(request.headers.get('If-None-Match'), etag):
+        return Response(status=status.HTTP_304_NOT_MODIFIED, headers=headers)
+    return Response(cache.get_or_build(request.user.id, namespace, params, build, version), headers=headers)
+
 class CreateLinkToken(APIView):
     permission_classes = [IsAuthenticated]
     
@@ -61,7 +110,8 @@ class ExchangePublicToken(APIView):
     
     def post(self, request):
         """
-        Exchange a public token for an access token and store it
+        Exchange a public token for an access token, store it and queue the
+        initial import; poll the returned job_id for progress
         """
         client = get_plaid_client()
         public_token = request.data.get('public_token')
@@ -79,162 +129,307 @@ class ExchangePublicToken(APIView):
             access_token = exchange_response['access_token']
             item_id = exchange_response['item_id']
             
-            # Get institution information
-            item_request = {
-                'access_token': access_token
-            }
-            item_response = client.item_get(item_request)
-            institution_id = item_response['item']['institution_id']
-            
-            institution_request = {
-                'institution_id': institution_id,
-                'country_codes': ['US']
-            }
-            institution_response = client.institutions_get_by_id(institution_request)
-            institution_name = institution_response['institution']['name']
-            
             # Save to database
             plaid_item = PlaidItem.objects.create(
                 user=request.user,
                 access_token=access_token,
-                item_id=item_id,
-                institution_name=institution_name
+                item_id=item_id
             )
             
-            # Fetch accounts and transactions
-            self._fetch_accounts(client, plaid_item)
+            # Institution, accounts and transactions are imported by a job worker
+            job = jobs.enqueue(jobs.IMPORT_ITEM, request.user, plaid_item)
             
-            return Response({'success': True, 'institution_name': institution_name})
+            return Response(
+                {'success': True, 'job_id': job.id, 'status': job.status},
+                status=status.HTTP_202_ACCEPTED
+            )
         except plaid.ApiException as e:
             return Response({'error': str(e)}, status=status.HTTP_400_BAD_REQUEST)
+
+class JobStatus(APIView):
+    permission_classes = [IsAuthenticated]
     
-    def _fetch_accounts(self, client, plaid_item):
-        """Fetch accounts for the Plaid Item"""
-        try:
-            accounts_request = {
-                'access_token': plaid_item.access_token
-            }
-            accounts_response = client.accounts_get(accounts_request)
-            
-            for account_data in accounts_response['accounts']:
-                Account.objects.create(
-                    plaid_item=plaid_item,
-                    account_id=account_data['account_id'],
-                    name=account_data['name'],
-                    type=account_data['type'],
-                    subtype=account_data.get('subtype'),
-                    current_balance=account_data['balances']['current']
-                )
-            
-            # Fetch initial transactions
-            self._fetch_transactions(client, plaid_item)
-        except plaid.ApiException as e:
-            # Log the error but don't fail the whole request
-            print(f"Error fetching accounts: {e}")
+    def get(self, request, job_id):
+        """Get the progress of one of the user's background jobs"""
+        job = get_object_or_404(Job.objects.select_related('plaid_item__institution'), id=job_id, user=request.user)
+        return Response(JobSerializer(job).data)
+
+class AccountsList(ReplicaReadMixin, APIView):
+    permission_classes = [IsAuthenticated]
     
-    def _fetch_transactions(self, client, plaid_item):
-        """Fetch transactions for the Plaid Item"""
-        try:
-            # Get transactions for the last 30 days
-            end_date = datetime.datetime.now().date()
-            start_date = end_date - datetime.timedelta(days=30)
-            
-            transactions_request = {
-                'access_token': plaid_item.access_token,
-                'start_date': start_date.strftime('%Y-%m-%d'),
-                'end_date': end_date.strftime('%Y-%m-%d')
-            }
+    def get(self, request):
+        """Get all accounts for the authenticated user (supports If-None-Match)"""
+        def build():
+            plaid_items = PlaidItem.objects.filter(user=request.user)
+            accounts = list(
+                Account.objects.filter(plaid_item__in=plaid_items, unlinking=False)
+                .select_related('plaid_item__institution')
+            )
+            with metrics.timing_serialization():
+                return AccountSerializer(accounts, many=True).data
+        
+        return conditional_response(request, 'accounts', {}, build)
+
+def filter_accounts(request):
+    """The user's accounts, narrowed by the account_id query parameter"""
+    account_id = request.query_params.get('account_id')
+    
+    plaid_items = PlaidItem.objects.filter(user=request.user)
+    accounts = Account.objects.filter(plaid_item__in=plaid_items, unlinking=False)
+    
+    if account_id:
+        accounts = accounts.filter(id=account_id)
+    
+    return accounts
+
+def _filter_dates_and_category(queryset, request):
+    start_date = request.query_params.get('start_date')
+    end_date = request.query_params.get('end_date')
+    category = request.query_params.get('category')
+    
+    if start_date:
+        queryset = queryset.filter(date__gte=start_date)
+    if end_date:
+        queryset = queryset.filter(date__lte=end_date)
+    if category:
+        queryset = queryset.filter(category=category)
+    
+    return queryset
+
+def filter_transactions(request):
+    """
+    Build the user's transaction queryset from the start_date, end_date,
+    account_id and category query parameters
+    """
+    transactions_query = Transaction.objects.filter(account__in=filter_accounts(request))
+    return _filter_dates_and_category(transactions_query, request)
+
+def filter_rollups(request):
+    """The DailyRollup rows matching the same query parameters as filter_transactions"""
+    rollups = DailyRollup.objects.filter(account__in=filter_accounts(request))
+    return _filter_dates_and_category(rollups, request)
+
+def search_transactions(queryset, request):
+    """Narrow a transaction queryset by the `q` full-text search parameter, if given"""
+    query = request.query_params.get('q', '').strip()
+    if not query:
+        return queryset
+    return search.search(queryset, query)
+
+class TransactionsList(ReplicaReadMixin, APIView):
+    permission_classes = [IsAuthenticated]
+    # Bulk reads can also be negotiated as columnar JSON or MessagePack
+    renderer_classes = [*api_settings.DEFAULT_RENDERER_CLASSES, ColumnarJSONRenderer, MessagePackRenderer]
+    
+    def get(self, request):
+        """
+        Get transactions for the authenticated user with optional filtering.
+        Pass `q` to full-text search names and categories; results come back
+        best match first. Pass `limit` (and then the returned `next` value as
+        `cursor`) to page through the results newest first. Answers a matching
+        If-None-Match with 304 Not Modified. Send `Accept:
+        application/vnd.finance.columnar+json` (or `format=columnar`) for one
+        array per field, or `application/msgpack` for MessagePack.
+        """
+        def build():
+            transactions_query = transaction_values(search_transactions(filter_transactions(request), request))
             
-            # Use transactions_get method to fetch transactions
-            transactions_response = client.transactions_get(transactions_request)
-            accounts = {account.account_id: account for account in Account.objects.filter(plaid_item=plaid_item)}
+            # Keyset pagination is opt-in; without limit/cursor the full list is returned
+            paginator = TransactionKeysetPagination()
+            if paginator.is_requested(request):
+                page = paginator.paginate_queryset(transactions_query, request, view=self)
+                with metrics.timing_serialization():
+                    return paginator.get_paginated_response(serialize_transactions(page)).data
             
-            # Save transactions to database
-            for transaction in transactions_response['transactions']:
-                account = accounts.get(transaction['account_id'])
-                if account:
-                    Transaction.objects.create(
-                        account=account,
-                        transaction_id=transaction['transaction_id'],
-                        amount=transaction['amount'],
-                        date=transaction['date'],
-                        name=transaction['name'],
-                        category=transaction['category'][0] if transaction.get('category') else 'Uncategorized',
-                        pending=transaction['pending']
-                    )
-        except plaid.ApiException as e:
-            # Log the error but don't fail the whole request
-            print(f"Error fetching transactions: {e}")
+            if request.query_params.get('q', '').strip():
+                transactions_query = transactions_query.order_by('-search_rank', '-date', '-id')
+            # Fetch before timing so serialization time excludes the query
+            rows = list(transactions_query)
+            with metrics.timing_serialization():
+                return serialize_transactions(rows)
+        
+        return conditional_response(request, 'transactions', request.query_params, build)
 
-class AccountsList(APIView):
+class TransactionsExport(APIView):
     permission_classes = [IsAuthenticated]
     
     def get(self, request):
-        """Get all accounts for the authenticated user"""
-        plaid_items = PlaidItem.objects.filter(user=request.user)
-        accounts = Account.objects.filter(plaid_item__in=plaid_items)
-        serializer = AccountSerializer(accounts, many=True)
-        return Response(serializer.data)
+        """
+        Stream the user's transactions as CSV (default) or NDJSON, newest first,
+        with the same filters and search as TransactionsList. Pass `export_format=ndjson`
+        to change format and `gzip=true` to download a compressed file.
+        """
+        export_format = request.query_params.get('export_format', export.CSV)
+        if export_format not in export.CONTENT_TYPES:
+            return Response(
+                {"error": "export_format must be 'csv' or 'ndjson'"},
+                status=status.HTTP_400_BAD_REQUEST
+            )
+        use_gzip = request.query_params.get('gzip', '').lower() in ('1', 'true')
+        
+        # iterator() streams rows from the cursor in chunks instead of
+        # materialising the whole result set, so memory stays flat
+        chunk_size = settings.EXPORT_CHUNK_SIZE
+        # Rows are read while the response streams, after the view has
+        # returned, so the replica is selected explicitly
+        rows = (
+            transaction_values(search_transactions(filter_transactions(request), request))
+            .using(db_router.read_alias(request.user.id))
+            .order_by('-date', '-id')
+            .iterator(chunk_size=chunk_size)
+        )
+        
+        filename = f"transactions.{export_format}"
+        if use_gzip:
+            filename += '.gz'
+            content_type = 'application/gzip'
+        else:
+            content_type = export.CONTENT_TYPES[export_format]
+        
+        response = StreamingHttpResponse(
+            export.export_stream(rows, export_format, chunk_size, gzip=use_gzip),
+            content_type=content_type
+        )
+        response['Content-Disposition'] = f'attachment; filename="{filename}"'
+        return response
 
-class TransactionsList(APIView):
+class AnalyticsSummary(ReplicaReadMixin, APIView):
     permission_classes = [IsAuthenticated]
     
     def get(self, request):
-        """Get transactions for the authenticated user with optional filtering"""
-        # Get query parameters for filtering
-        start_date = request.query_params.get('start_date')
-        end_date = request.query_params.get('end_date')
-        account_id = request.query_params.get('account_id')
-        category = request.query_params.get('category')
-        
-        # Build query
-        plaid_items = PlaidItem.objects.filter(user=request.user)
-        accounts = Account.objects.filter(plaid_item__in=plaid_items)
+        """
+        Get income/expense rollups by month, ISO week, weekday and category,
+        aggregated from the daily rollups with the same filters as TransactionsList
+        """
+        try:
+            start_date = analytics.parse_date(request.query_params.get('start_date'))
+            end_date = analytics.parse_date(request.query_params.get('end_date'))
+        except ValueError:
+            return Response(
+                {"error": "Dates must be formatted as YYYY-MM-DD"},
+                status=status.HTTP_400_BAD_REQUEST
+            )
         
-        if account_id:
-            accounts = accounts.filter(id=account_id)
-            
-        transactions_query = Transaction.objects.filter(account__in=accounts)
+        def build():
+            # Series and totals read the small daily rollup table; only the
+            # largest transaction reads the transactions, of a single day
+            return analytics.build_summary(
+                filter_rollups(request), filter_transactions(request), start_date, end_date
+            )
         
-        if start_date:
-            transactions_query = transactions_query.filter(date__gte=start_date)
-        if end_date:
-            transactions_query = transactions_query.filter(date__lte=end_date)
-        if category:
-            transactions_query = transactions_query.filter(category=category)
+        return conditional_response(request, 'analytics', request.query_params, build)
+
+class BalanceHistory(ReplicaReadMixin, APIView):
+    permission_classes = [IsAuthenticated]
+    
+    def get(self, request):
+        """
+        Get the balance of each account (and their total) at the end of every
+        daily, weekly or monthly bucket between start_date and end_date (the
+        last year by default), downsampled to at most max_points per series
+        """
+        try:
+            end_date = analytics.parse_date(request.query_params.get('end_date')) or timezone.localdate()
+            start_date = (
+                analytics.parse_date(request.query_params.get('start_date'))
+                or end_date - datetime.timedelta(days=365)
+            )
+        except ValueError:
+            return Response(
+                {"error": "Dates must be formatted as YYYY-MM-DD"},
+                status=status.HTTP_400_BAD_REQUEST
+            )
+        if start_date > end_date:
+            return Response(
+                {"error": "start_date must not be after end_date"},
+                status=status.HTTP_400_BAD_REQUEST
+            )
         
-        serializer = TransactionSerializer(transactions_query, many=True)
+        interval = request.query_params.get('interval', 'daily')
+        if interval not in balances.INTERVALS:
+            return Response(
+                {"error": f"interval must be one of {', '.join(balances.INTERVALS)}"},
+                status=status.HTTP_400_BAD_REQUEST
+            )
         
-        # Create a unique filename based on the query parameters
-        filename_parts = [
-            f"user_{request.user.id}",
-            f"account_{account_id}" if account_id else "all_accounts",
-            f"start_{start_date}" if start_date else "no_start",
-            f"end_{end_date}" if end_date else "no_end",
-            f"cat_{category}" if category else "all_categories"
-        ]
-        filename_base = "_".join(filename_parts)
-        # Create a hash to shorten the filename if needed
-        filename_hash = hashlib.md5(filename_base.encode()).hexdigest()[:10]
+        try:
+            max_points = int(request.query_params.get('max_points', balances.DEFAULT_MAX_POINTS))
+        except ValueError:
+            max_points = 0
+        if not 1 <= max_points <= balances.MAX_POINTS_LIMIT:
+            return Response(
+                {"error": f"max_points must be an integer from 1 to {balances.MAX_POINTS_LIMIT}"},
+                status=status.HTTP_400_BAD_REQUEST
+            )
         
-        # Ensure the directory exists
-        json_dir = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), 'transaction_data')
-        os.makedirs(json_dir, exist_ok=True)
+        def build():
+            accounts = list(filter_accounts(request).select_related('plaid_item__institution').order_by('id'))
+            return balances.history(accounts, start_date, end_date, interval, max_points)
         
-        # Create the full filepath
-        filepath = os.path.join(json_dir, f"{filename_hash}.json")
+        # The resolved dates are part of the key, so the default range moves on each day
+        params = {
+            **request.query_params.dict(),
+            'start_date': start_date.isoformat(),
+            'end_date': end_date.isoformat(),
+        }
+        return conditional_response(request, 'balance_history', params, build)
+
+class RecurringChargesList(ReplicaReadMixin, APIView):
+    permission_classes = [IsAuthenticated]
+    
+    def get(self, request):
+        """
+        Get the user's detected recurring charges, soonest expected first,
+        optionally narrowed by account_id, frequency or status (active/lapsed)
+        """
+        today = timezone.localdate()
+        status_filter = request.query_params.get('status')
+        if status_filter not in (None, '', 'active', 'lapsed'):
+            return Response(
+                {"error": "status must be active or lapsed"},
+                status=status.HTTP_400_BAD_REQUEST
+            )
         
-        # Check if the file exists
-        if not os.path.exists(filepath):
-            try:
-                # Write the data to the file
-                with open(filepath, 'w') as f:
-                    json.dump(serializer.data, f, indent=2)
-                logger.info(f"Saved transaction data to {filepath}")
-            except Exception as e:
-                logger.error(f"Error saving transaction data to file: {str(e)}")
+        def build():
+            # Charges last made from an account being unlinked are hidden with it
+            charges = (
+                RecurringCharge.objects
+                .filter(user=request.user)
+                .exclude(account__unlinking=True)
+                .select_related('account')
+                .order_by('next_date', 'id')
+            )
+            account_id = request.query_params.get('account_id')
+            if account_id:
+                charges = charges.filter(account_id=account_id)
+            frequency = request.query_params.get('frequency')
+            if frequency:
+                charges = charges.filter(frequency=frequency)
+            with metrics.timing_serialization():
+                data = RecurringChargeSerializer(charges, many=True, context={'today': today}).data
+            return [charge for charge in data if not status_filter or charge['status'] == status_filter]
         
-        return Response(serializer.data)
+        # Statuses depend on the date, so it is part of the key
+        params = {**request.query_params.dict(), 'today': today.isoformat()}
+        return conditional_response(request, 'recurring', params, build)
+
+class Metrics(APIView):
+    # Scraped by Prometheus, which does not hold a user JWT
+    authentication_classes = []
+    permission_classes = []
+    
+    def get(self, request):
+        """
+        Request metrics of this worker process in the Prometheus text format.
+        When METRICS_TOKEN is set the scraper must send it as a bearer token;
+        without one the endpoint is only served under DEBUG.
+        """
+        token = settings.METRICS_TOKEN
+        if not token and not settings.DEBUG:
+            return HttpResponse(status=status.HTTP_404_NOT_FOUND)
+        if token and request.headers.get('Authorization') != f"Bearer {token}":
+            return HttpResponse(status=status.HTTP_403_FORBIDDEN)
+        return HttpResponse(metrics.render_latest(), content_type=metrics.CONTENT_TYPE)
 
 class MockTransactions(APIView):
     permission_classes = [IsAuthenticated]
@@ -243,32 +438,23 @@ class MockTransactions(APIView):
         """Get mock transaction data from the sample file"""
         account_id = request.query_params.get('account_id')
         
+        # If account_id is provided, first check that the account exists and
+        # belongs to the user (outside the try block, so a missing one is a 404)
+        if account_id:
+            account = get_object_or_404(Account.objects.select_related('plaid_item'), id=account_id)
+            if account.plaid_item.user_id != request.user.id:
+                return Response(
+                    {"error": "You do not have permission to access this account"},
+                    status=status.HTTP_403_FORBIDDEN
+                )
+        
         try:
-            # Load mock transaction data
-            mock_file_path = os.path.join(
-                os.path.dirname(os.path.dirname(os.path.abspath(__file__))),
-                'transaction_data',
-                'mock-transactions_4-24_4-25.json'
-            )
-            
-            with open(mock_file_path, 'r') as f:
-                mock_data = json.load(f)
+            # Parsed once per process and reloaded only when the file changes
+            mock_data = get_mock_dataset()
             
-            # If account_id is provided, filter transactions
-            if account_id:
-                # First check if the account exists and belongs to the user
-                account = get_object_or_404(Account, id=account_id)
-                if account.plaid_item.user != request.user:
-                    return Response(
-                        {"error": "You do not have permission to access this account"},
-                        status=status.HTTP_403_FORBIDDEN
-                    )
-                
-                # Add the account name to each transaction for consistency with real data
-                for transaction in mock_data:
-                    transaction['account_id'] = account_id
-                    
-            return Response(mock_data)
+            # Stamp the account id on each transaction for consistency with real
+            # data; rendering never modifies the shared dataset
+            return HttpResponse(mock_data.render(account_id or None), content_type='application/json')
         except FileNotFoundError:
             return Response(
                 {"error": "Mock transaction data file not found"},
@@ -287,75 +473,93 @@ class UnlinkAccount(APIView):
     
     def delete(self, request, account_id):
         """
-        Unlink an account from the user's profile
+        Unlink an account from the user's profile. Accounts with more than
+        UNLINK_ASYNC_THRESHOLD transactions disappear at once and are deleted
+        by a background job; poll the returned job_id for progress.
         """
         # Get the account
-        account = get_object_or_404(Account, id=account_id)
+        account = get_object_or_404(Account.objects.select_related('plaid_item'), id=account_id, unlinking=False)
         
         # Check that the account belongs to the current user
-        if account.plaid_item.user != request.user:
+        if account.plaid_item.user_id != request.user.id:
             return Response(
                 {"error": "You do not have permission to unlink this account"}, 
                 status=status.HTTP_403_FORBIDDEN
             )
         
-        # Get all accounts associated with this item
-        associated_accounts = Account.objects.filter(plaid_item=account.plaid_item)
-        
-        # If this is the only account for this item, remove the item too
-        if associated_accounts.count() == 1:
-            # Get the item to remove
-            plaid_item = account.plaid_item
-            
-            # Remove all transactions first (due to foreign key constraints)
-            Transaction.objects.filter(account=account).delete()
-            
-            # Remove the account
-            account.delete()
-            
-            # Remove the item
-            plaid_item.delete()
+        if unlink.is_large([account.id]):
+            with db_transaction.atomic():
+                unlink.mark_unlinking([account.id])
+                job = jobs.enqueue(
+                    jobs.UNLINK_ACCOUNTS, request.user, account.plaid_item, params={'account_ids': [account.id]}
+                )
+                cache.bump_data_version(request.user.id)
             
             return Response(
-                {"status": "success", "message": "Account and associated item have been unlinked"}, 
-                status=status.HTTP_200_OK
+                {"status": "pending", "message": "Account is being unlinked", "job_id": job.id},
+                status=status.HTTP_202_ACCEPTED
             )
+        
+        # Transactions are deleted in chunks; the item goes too if this was its only account
+        result = unlink.unlink_accounts(account.plaid_item, [account.id])
+        
+        if result['item_removed']:
+            message = "Account and associated item have been unlinked"
         else:
-            # Remove all transactions first (due to foreign key constraints)
-            Transaction.objects.filter(account=account).delete()
-            
-            # Remove just this account
-            account.delete()
-            
-            return Response(
-                {"status": "success", "message": "Account has been unlinked"}, 
-                status=status.HTTP_200_OK
-            )
+            message = "Account has been unlinked"
+        return Response({"status": "success", "message": message}, status=status.HTTP_200_OK)
 
 class UnlinkAllAccounts(APIView):
     permission_classes = [IsAuthenticated]
     
     def delete(self, request):
         """
-        Unlink all accounts for the authenticated user
+        Unlink all accounts for the authenticated user, in the background
+        (returning job_ids) when they hold more than UNLINK_ASYNC_THRESHOLD
+        transactions
         """
         try:
             # Get all PlaidItems for the user
-            plaid_items = PlaidItem.objects.filter(user=request.user)
+            plaid_items = list(PlaidItem.objects.filter(user=request.user))
             
-            if not plaid_items.exists():
+            if not plaid_items:
                 return Response(
                     {"status": "success", "message": "No accounts to unlink"}, 
                     status=status.HTTP_200_OK
                 )
             
-            # Delete all accounts (and their transactions due to cascading)
-            accounts_count = Account.objects.filter(plaid_item__in=plaid_items).count()
-            Transaction.objects.filter(account__plaid_item__in=plaid_items).delete()
-            Account.objects.filter(plaid_item__in=plaid_items).delete()
+            # Accounts already being unlinked are left to their running job
+            account_ids = {plaid_item.id: [] for plaid_item in plaid_items}
+            accounts = Account.objects.filter(plaid_item__in=plaid_items, unlinking=False)
+            for account_id, plaid_item_id in accounts.values_list('id', 'plaid_item_id'):
+                account_ids[plaid_item_id].append(account_id)
+            all_account_ids = [account_id for ids in account_ids.values() for account_id in ids]
+            accounts_count = len(all_account_ids)
+            
+            if unlink.is_large(all_account_ids):
+                with db_transaction.atomic():
+                    unlink.mark_unlinking(all_account_ids)
+                    queued = [
+                        jobs.enqueue(
+                            jobs.UNLINK_ACCOUNTS, request.user, plaid_item,
+                            params={'account_ids': account_ids[plaid_item.id]}
+                        )
+                        for plaid_item in plaid_items
+                    ]
+                    cache.bump_data_version(request.user.id)
+                
+                return Response(
+                    {
+                        "status": "pending",
+                        "message": f"Unlinking {accounts_count} accounts",
+                        "job_ids": [job.id for job in queued],
+                    },
+                    status=status.HTTP_202_ACCEPTED
+                )
             
-            # Delete all PlaidItems
-            plaid_items.delete()
+            # Delete each item's accounts (transactions in chunks), then the item
+            for plaid_item in plaid_items:
+                unlink.unlink_accounts(plaid_item, account_ids[plaid_item.id])
             
             return Response(
                 {"status": "success", "message": f"Successfully unlinked {accounts_count} accounts"},
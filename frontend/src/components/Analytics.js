@@ -1,6 +1,6 @@
 import React, { useState, useEffect, useMemo } from 'react';
 import { useNavigate } from 'react-router-dom';
-import { getAccounts, getTransactions, getMockTransactions } from '../utils/api';
+import { getAccounts, getAnalyticsSummary, getMockTransactions } from '../utils/api';
 
 // Material UI Components
 import { 
@@ -151,6 +151,7 @@ const Analytics = () => {
   const [selectedAccount, setSelectedAccount] = useState('all');
   const [accounts, setAccounts] = useState([]);
   const [transactions, setTransactions] = useState([]);
+  const [analyticsSummary, setAnalyticsSummary] = useState(null);
   const [startDate, setStartDate] = useState(() => {
     const date = new Date();
     date.setFullYear(date.getFullYear() - 1);
@@ -207,25 +208,26 @@ const Analytics = () => {
       const formattedStartDate = startDate.toISOString().split('T')[0];
       const formattedEndDate = endDate.toISOString().split('T')[0];
       
-      let transactionData;
-      
       if (useMockData) {
-        // Fetch mock transaction data
-        transactionData = await getMockTransactions(
+        // Fetch mock transaction data and roll it up in the browser
+        const transactionData = await getMockTransactions(
           selectedAccount !== 'all' ? selectedAccount : null
         );
+        setAnalyticsSummary(null);
+        setTransactions(transactionData);
       } else {
-        // Fetch actual transaction data with filters
+        // Fetch pre-aggregated series computed by the server
         const filters = {
           account_id: selectedAccount !== 'all' ? selectedAccount : null,
           start_date: formattedStartDate,
           end_date: formattedEndDate
         };
         
-        transactionData = await getTransactions(filters);
+        const summaryData = await getAnalyticsSummary(filters);
+        setTransactions([]);
+        setAnalyticsSummary(summaryData);
       }
       
-      setTransactions(transactionData);
       setLoading(false);
     } catch (err) {
       console.error('Error fetching transaction data:', err);
@@ -309,8 +311,90 @@ const Analytics = () => {
     }
   };
   
+  // Build chart trends from summary statistics
+  const buildTrends = (totalInflow, totalOutflow, totalTransactions, previousPeriodSpending, currentPeriodSpending) => {
+    // Calculate spending change for trends
+    const spendingChange = previousPeriodSpending > 0 ? 
+      ((currentPeriodSpending - previousPeriodSpending) / previousPeriodSpending) * 100 : 0;
+    
+    // Calculate savings rate
+    const savingsRate = totalInflow > 0 ? 
+      ((totalInflow - totalOutflow) / totalInflow) * 100 : 0;
+    
+    return [
+      { 
+        name: 'Total Spending', 
+        value: totalOutflow, 
+        change: spendingChange, 
+        status: spendingChange <= 0 ? 'up' : 'down' 
+      },
+      { 
+        name: 'Average Transaction', 
+        value: totalTransactions > 0 ? (totalInflow + totalOutflow) / totalTransactions : 0,
+        change: 0, // Would need historical data to calculate
+        status: 'up'
+      },
+      { 
+        name: 'Total Income', 
+        value: totalInflow,
+        change: 0, // Would need historical data to calculate
+        status: 'up'
+      },
+      { 
+        name: 'Savings Rate', 
+        value: savingsRate > 0 ? savingsRate : 0,
+        change: 0, // Would need historical data to calculate
+        status: 'up'
+      },
+    ];
+  };
+  
+  // Map the server-side analytics summary onto the chart data shapes
+  const summaryData = useMemo(() => {
+    if (!analyticsSummary) return null;
+    
+    const monthNames = ['Jan', 'Feb', 'Mar', 'Apr', 'May', 'Jun', 'Jul', 'Aug', 'Sep', 'Oct', 'Nov', 'Dec'];
+    const { summary } = analyticsSummary;
+    
+    return {
+      monthlyData: analyticsSummary.monthly.map(row => ({
+        name: monthNames[parseInt(row.month.split('-')[1], 10) - 1],
+        income: row.income,
+        expenses: row.expenses
+      })),
+      weeklyData: analyticsSummary.weekday.map(row => ({
+        name: row.day,
+        income: row.income,
+        expenses: row.expenses
+      })),
+      categoryData: analyticsSummary.categories.map(row => ({
+        name: row.category,
+        value: row.total,
+        icon: getCategoryIcon(row.category),
+        color: getCategoryColor(row.category)
+      })),
+      trends: buildTrends(
+        summary.total_inflow,
+        summary.total_outflow,
+        summary.total_transactions,
+        summary.previous_period_spending,
+        summary.current_period_spending
+      ),
+      summary: {
+        totalTransactions: summary.total_transactions,
+        totalInflow: summary.total_inflow,
+        totalOutflow: summary.total_outflow,
+        netCashFlow: summary.net_cash_flow,
+        largestTransaction: summary.largest_transaction || { amount: 0 },
+        averageTransaction: summary.average_transaction
+      }
+    };
+  }, [analyticsSummary]);
+  
   // Process transaction data for charts
   const processedData = useMemo(() => {
+    if (summaryData) return summaryData;
+    
     if (!transactions.length) return { 
       monthlyData: [], 
       weeklyData: [],
@@ -428,41 +512,14 @@ const Analytics = () => {
       }))
       .sort((a, b) => b.value - a.value);
     
-    // Calculate spending change for trends
-    const spendingChange = previousPeriodSpending > 0 ? 
-      ((currentPeriodSpending - previousPeriodSpending) / previousPeriodSpending) * 100 : 0;
-    
-    // Calculate savings rate
-    const savingsRate = totalInflow > 0 ? 
-      ((totalInflow - totalOutflow) / totalInflow) * 100 : 0;
-    
     // Trends data
-    const trendsData = [
-      { 
-        name: 'Total Spending', 
-        value: totalOutflow, 
-        change: spendingChange, 
-        status: spendingChange <= 0 ? 'up' : 'down' 
-      },
-      { 
-        name: 'Average Transaction', 
-        value: transactions.length > 0 ? (totalInflow + totalOutflow) / transactions.length : 0,
-        change: 0, // Would need historical data to calculate
-        status: 'up'
-      },
-      { 
-        name: 'Total Income', 
-        value: totalInflow,
-        change: 0, // Would need historical data to calculate
-        status: 'up'
-      },
-      { 
-        name: 'Savings Rate', 
-        value: savingsRate > 0 ? savingsRate : 0,
-        change: 0, // Would need historical data to calculate
-        status: 'up'
-      },
-    ];
+    const trendsData = buildTrends(
+      totalInflow,
+      totalOutflow,
+      transactions.length,
+      previousPeriodSpending,
+      currentPeriodSpending
+    );
     
     return {
       monthlyData: monthlyDataArray,
@@ -479,7 +536,7 @@ const Analytics = () => {
           (totalInflow + totalOutflow) / transactions.length : 0
       }
     };
-  }, [transactions, startDate, endDate]);
+  }, [summaryData, transactions, startDate, endDate]);
   
   // Get chart data based on time range
   const chartData = useMemo(() => {
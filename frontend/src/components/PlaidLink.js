@@ -1,12 +1,29 @@
 import React, { useState, useEffect, useCallback } from 'react';
 import { useNavigate } from 'react-router-dom';
-import { getLinkToken, exchangePublicToken } from '../utils/api';
+import { getLinkToken, exchangePublicToken, getJobStatus } from '../utils/api';
 import { Container, Typography, Box, CircularProgress, Alert } from '@mui/material';
 
+// How often to poll the background import job, in milliseconds
+const JOB_POLL_INTERVAL = 1500;
+
+const sleep = (ms) => new Promise((resolve) => setTimeout(resolve, ms));
+
+// Poll the import job until the worker reports it finished
+const waitForJob = async (jobId) => {
+  while (true) {
+    const job = await getJobStatus(jobId);
+    if (job.status === 'succeeded' || job.status === 'failed') {
+      return job;
+    }
+    await sleep(JOB_POLL_INTERVAL);
+  }
+};
+
 const PlaidLink = () => {
   const [loading, setLoading] = useState(true);
   const [error, setError] = useState(null);
   const [linkToken, setLinkToken] = useState(null);
+  const [importing, setImporting] = useState(false);
   const navigate = useNavigate();
 
   // Memoize the initializePlaidLink function with useCallback to avoid
@@ -24,7 +41,18 @@ const PlaidLink = () => {
       onSuccess: async (public_token, metadata) => {
         try {
           const response = await exchangePublicToken(public_token);
-          console.log('Account linked successfully:', response);
+          console.log('Account linked, importing data:', response);
+          
+          // Accounts and transactions are imported in the background
+          setImporting(true);
+          const job = await waitForJob(response.job_id);
+          if (job.status === 'failed') {
+            console.error('Import job failed:', job.error);
+            setImporting(false);
+            setError('Your account was linked, but importing its data failed. Please try again later.');
+            return;
+          }
+          
           // Force a page reload to ensure proper state management
           window.location.href = '/dashboard';
         } catch (err) {
@@ -124,6 +152,17 @@ const PlaidLink = () => {
     );
   }
 
+  if (importing) {
+    return (
+      <Container maxWidth="sm">
+        <Box sx={{ display: 'flex', justifyContent: 'center', alignItems: 'center', height: '80vh', flexDirection: 'column' }}>
+          <CircularProgress />
+          <Typography sx={{ mt: 2 }}>Importing your accounts and transactions...</Typography>
+        </Box>
+      </Container>
+    );
+  }
+
   if (error) {
     return (
       <Container maxWidth="sm">
@@ -1,6 +1,6 @@
 import React, { useState, useEffect, useMemo } from 'react';
 import { useNavigate, useLocation } from 'react-router-dom';
-import { getAccounts, getTransactions, getMockTransactions } from '../utils/api';
+import { getAccounts, getTransactions, getMockTransactions, exportTransactions } from '../utils/api';
 
 // Material UI Components
 import { 
@@ -51,7 +51,7 @@ import { LocalizationProvider } from '@mui/x-date-pickers/LocalizationProvider';
 // Icons
 import SwapHorizRoundedIcon from '@mui/icons-material/SwapHorizRounded';
 import SearchRoundedIcon from '@mui/icons-material/SearchRounded';
-import FilterListRoundedIcon from '@mui/icons-material/FilterListRounded';
+import DownloadRoundedIcon from '@mui/icons-material/DownloadRounded';
 import SortRoundedIcon from '@mui/icons-material/SortRounded';
 import ArrowUpwardRoundedIcon from '@mui/icons-material/ArrowUpwardRounded';
 import ArrowDownwardRoundedIcon from '@mui/icons-material/ArrowDownwardRounded';
@@ -139,6 +139,7 @@ const Transactions = () => {
   const [loading, setLoading] = useState(true);
   const [error, setError] = useState(null);
   const [searchText, setSearchText] = useState('');
+  const [serverSearch, setServerSearch] = useState('');
   const [selectedAccount, setSelectedAccount] = useState(accountIdFromUrl || 'all');
   const [startDate, setStartDate] = useState(null);
   const [endDate, setEndDate] = useState(null);
@@ -150,6 +151,7 @@ const Transactions = () => {
   const [selectedTransaction, setSelectedTransaction] = useState(null);
   const [detailsDialogOpen, setDetailsDialogOpen] = useState(false);
   const [useMockData, setUseMockData] = useState(true);
+  const [exporting, setExporting] = useState(false);
   
   // Format currency
   const formatCurrency = (amount) => {
@@ -180,10 +182,17 @@ const Transactions = () => {
     loadAccountsData();
   }, []);
   
+  // Real data is searched by the API's full-text index; wait for typing to
+  // pause before asking it
+  useEffect(() => {
+    const timer = setTimeout(() => setServerSearch(useMockData ? '' : searchText.trim()), 300);
+    return () => clearTimeout(timer);
+  }, [searchText, useMockData]);
+  
   // Load transactions data with initial account filter if provided
   useEffect(() => {
     loadTransactionsData();
-  }, [selectedAccount, useMockData]);
+  }, [selectedAccount, useMockData, serverSearch]);
 
   // Function to load transactions - either mock or real
   const loadTransactionsData = async () => {
@@ -221,6 +230,10 @@ const Transactions = () => {
           filters.account_id = selectedAccount;
         }
         
+        if (serverSearch) {
+          filters.q = serverSearch;
+        }
+        
         const transactionData = await getTransactions(filters);
         setTransactions(transactionData || []);
       }
@@ -240,11 +253,49 @@ const Transactions = () => {
     setError(null);
   };
   
+  // Download the filtered transactions as a CSV file streamed by the server
+  // (linked accounts only, so the button is disabled while showing mock data)
+  const handleExport = async () => {
+    setExporting(true);
+    setError(null);
+    
+    try {
+      // Same window as the loaded list unless the date pickers narrow it
+      const today = new Date();
+      const defaultStartDate = new Date();
+      defaultStartDate.setMonth(today.getMonth() - 24);
+      
+      const filters = {
+        export_format: 'csv',
+        start_date: (startDate || defaultStartDate).toISOString().split('T')[0],
+        end_date: (endDate || today).toISOString().split('T')[0],
+        account_id: selectedAccount !== 'all' ? selectedAccount : null,
+        category: categoryFilter !== 'all' ? categoryFilter : null,
+        q: serverSearch
+      };
+      
+      const blob = await exportTransactions(filters);
+      const url = window.URL.createObjectURL(blob);
+      const link = document.createElement('a');
+      link.href = url;
+      link.download = 'transactions.csv';
+      document.body.appendChild(link);
+      link.click();
+      link.remove();
+      window.URL.revokeObjectURL(url);
+    } catch (err) {
+      console.error('Error exporting transactions:', err);
+      setError('Failed to export transactions. Please try again later.');
+    } finally {
+      setExporting(false);
+    }
+  };
+  
   // Filter transactions based on search and filters
   const filteredTransactions = useMemo(() => {
     return transactions.filter(transaction => {
-      // Search text filter
-      if (searchText && !transaction.name.toLowerCase().includes(searchText.toLowerCase())) {
+      // Search text filter (real data was already searched by the API)
+      if (useMockData && searchText && !transaction.name.toLowerCase().includes(searchText.toLowerCase())) {
         return false;
       }
       
@@ -279,7 +330,7 @@ const Transactions = () => {
           : b.name.localeCompare(a.name);
       }
     });
-  }, [transactions, searchText, categoryFilter, startDate, endDate, sortBy, sortDirection]);
+  }, [transactions, searchText, useMockData, categoryFilter, startDate, endDate, sortBy, sortDirection]);
   
   // Handle search change
   const handleSearchChange = (event) => {
@@ -585,7 +636,9 @@ const Transactions = () => {
               />
               <Button
                 variant="outlined"
-                startIcon={<FilterListRoundedIcon />}
+                startIcon={<DownloadRoundedIcon />}
+                onClick={handleExport}
+                disabled={useMockData || exporting}
                 sx={{
                   borderRadius: 2,
                   textTransform: 'none',
@@ -597,7 +650,7 @@ const Transactions = () => {
                   }
                 }}
               >
-                Export
+                {exporting ? 'Exporting...' : 'Export'}
               </Button>
               
               <Button
@@ -28,7 +28,17 @@ const sampleData = [
   { name: '5/2024', inflow: 4500, outflow: 3300 },
 ];
 
-const BalanceOverview = ({ totalBalance, accounts, formatCurrency, transactionData }) => {
+// The total balance at the end of each bucket, skipping dates before any account had one
+const processBalanceHistory = (balanceHistory) => {
+  if (!balanceHistory) {
+    return [];
+  }
+  return balanceHistory.dates
+    .map((date, index) => ({ name: date, balance: balanceHistory.total[index] }))
+    .filter((point) => point.balance !== null);
+};
+
+const BalanceOverview = ({ totalBalance, accounts, formatCurrency, transactionData, balanceHistory }) => {
   // Process transaction data if available
   const processMonthlyData = () => {
     if (!transactionData || transactionData.length === 0) {
@@ -66,7 +76,13 @@ const BalanceOverview = ({ totalBalance, accounts, formatCurrency, transactionDa
     });
   };
 
-  const chartData = processMonthlyData();
+  const balanceData = processBalanceHistory(balanceHistory);
+  const showBalanceHistory = balanceData.length >= 2;
+  const chartData = showBalanceHistory ? balanceData : processMonthlyData();
+
+  // Change over the charted period, once there is a history to compare against
+  const firstBalance = showBalanceHistory ? balanceData[0].balance : null;
+  const balanceChange = firstBalance ? ((totalBalance - firstBalance) / Math.abs(firstBalance)) * 100 : null;
 
   return (
     <Paper
@@ -108,19 +124,21 @@ const BalanceOverview = ({ totalBalance, accounts, formatCurrency, transactionDa
                 }}
               >
                 {formatCurrency(totalBalance)}
-                <Chip
-                  size="small"
-                  icon={totalBalance >= 0 ? <ArrowUpwardRoundedIcon fontSize="small" /> : <ArrowDownwardRoundedIcon fontSize="small" />}
-                  label={totalBalance >= 0 ? "+2.4%" : "-1.2%"}
-                  sx={{
-                    backgroundColor: totalBalance >= 0 ? 'rgba(78, 140, 184, 0.1)' : 'rgba(184, 78, 108, 0.1)',
-                    color: totalBalance >= 0 ? '#4E8CB8' : '#B84E6C',
-                    fontWeight: 600,
-                    fontSize: '0.75rem',
-                    height: 24,
-                    borderRadius: 1.5
-                  }}
-                />
+                {balanceChange !== null && (
+                  <Chip
+                    size="small"
+                    icon={balanceChange >= 0 ? <ArrowUpwardRoundedIcon fontSize="small" /> : <ArrowDownwardRoundedIcon fontSize="small" />}
+                    label={`${balanceChange >= 0 ? '+' : ''}${balanceChange.toFixed(1)}%`}
+                    sx={{
+                      backgroundColor: balanceChange >= 0 ? 'rgba(78, 140, 184, 0.1)' : 'rgba(184, 78, 108, 0.1)',
+                      color: balanceChange >= 0 ? '#4E8CB8' : '#B84E6C',
+                      fontWeight: 600,
+                      fontSize: '0.75rem',
+                      height: 24,
+                      borderRadius: 1.5
+                    }}
+                  />
+                )}
               </Typography>
               <Typography variant="body2" color="text.secondary">
                 From {accounts.length} linked accounts
@@ -158,33 +176,48 @@ const BalanceOverview = ({ totalBalance, accounts, formatCurrency, transactionDa
                   />
                   <RechartsTooltip 
                     formatter={(value) => formatCurrency(value)}
-                    labelFormatter={(label) => `Month: ${label}`}
+                    labelFormatter={(label) => showBalanceHistory ? label : `Month: ${label}`}
                     contentStyle={{ 
                       borderRadius: 12,
                       boxShadow: '0 4px 12px rgba(0, 0, 0, 0.1)',
                       border: 'none'
                     }}
                   />
-                  <Area 
-                    type="monotone" 
-                    dataKey="inflow" 
-                    name="Income"
-                    stackId="1"
-                    stroke="#6993FF" 
-                    strokeWidth={2}
-                    fillOpacity={1}
-                    fill="url(#colorInflow)" 
-                  />
-                  <Area 
-                    type="monotone" 
-                    dataKey="outflow" 
-                    name="Spending"
-                    stackId="2"
-                    stroke="#69E7FF" 
-                    strokeWidth={2}
-                    fillOpacity={1}
-                    fill="url(#colorOutflow)" 
-                  />
+                  {showBalanceHistory && (
+                    <Area 
+                      type="stepAfter" 
+                      dataKey="balance" 
+                      name="Balance"
+                      stroke="#6993FF" 
+                      strokeWidth={2}
+                      fillOpacity={1}
+                      fill="url(#colorInflow)" 
+                    />
+                  )}
+                  {!showBalanceHistory && (
+                    <Area 
+                      type="monotone" 
+                      dataKey="inflow" 
+                      name="Income"
+                      stackId="1"
+                      stroke="#6993FF" 
+                      strokeWidth={2}
+                      fillOpacity={1}
+                      fill="url(#colorInflow)" 
+                    />
+                  )}
+                  {!showBalanceHistory && (
+                    <Area 
+                      type="monotone" 
+                      dataKey="outflow" 
+                      name="Spending"
+                      stackId="2"
+                      stroke="#69E7FF" 
+                      strokeWidth={2}
+                      fillOpacity={1}
+                      fill="url(#colorOutflow)" 
+                    />
+                  )}
                 </AreaChart>
               </ResponsiveContainer>
             </Box>
@@ -1,7 +1,7 @@
 import React, { useState, useEffect, useContext, useMemo } from 'react';
 import { useNavigate } from 'react-router-dom';
 import { AuthContext } from '../../context/AuthContext';
-import { getLinkToken, getAccounts, getMockTransactions } from '../../utils/api';
+import { getLinkToken, getAccounts, getBalanceHistory, getMockTransactions } from '../../utils/api';
 import { useTheme, useMediaQuery, Box, Typography, CircularProgress, Paper, Grow, FormControlLabel, Switch } from '@mui/material';
 
 // Import components
@@ -30,6 +30,7 @@ const Dashboard = () => {
   const [loading, setLoading] = useState(true);
   const [error, setError] = useState(null);
   const [accounts, setAccounts] = useState([]);
+  const [balanceHistory, setBalanceHistory] = useState(null);
   
   // Menu states
   const [anchorEl, setAnchorEl] = useState(null);
@@ -98,8 +99,17 @@ const Dashboard = () => {
         console.log('No accounts found or error fetching accounts', accountErr);
       }
       
+      // A year of weekly balances keeps the chart small
+      let historyData = null;
+      try {
+        historyData = await getBalanceHistory({ interval: 'weekly', max_points: 60 });
+      } catch (historyErr) {
+        console.log('Error fetching balance history', historyErr);
+      }
+      
       setLinkToken(linkResponse.link_token);
       setAccounts(accountsData);
+      setBalanceHistory(historyData);
       setLoading(false);
     } catch (err) {
       console.error('Error loading dashboard data:', err);
@@ -286,6 +296,7 @@ const Dashboard = () => {
                     accounts={accounts} 
                     formatCurrency={formatCurrency}
                     transactionData={transactions}
+                    balanceHistory={balanceHistory}
                   />
                 </Box>
               </Grow>
@@ -24,6 +24,7 @@ import OverviewTab from '../transactions-tabs/OverviewTab';
 import MonthlySpendingTab from '../transactions-tabs/MonthlySpendingTab';
 import CategoriesTab from '../transactions-tabs/CategoriesTab';
 import AllTransactionsTab from '../transactions-tabs/AllTransactionsTab';
+import RecurringTab from '../transactions-tabs/RecurringTab';
 
 // API
 import { getTransactions } from '../../../utils/api';
@@ -191,6 +192,7 @@ const TransactionsDialog = ({
         <Tab label="Monthly Spending" />
         <Tab label="Categories" />
         <Tab label="All Transactions" />
+        <Tab label="Recurring" />
       </Tabs>
 
       <DialogContent sx={{ p: 0 }}>
@@ -259,6 +261,14 @@ const TransactionsDialog = ({
                 formatCurrency={formatCurrency} 
               />
             )}
+
+            {/* Recurring Tab */}
+            {activeTab === 4 && (
+              <RecurringTab 
+                accountId={account.id} 
+                formatCurrency={formatCurrency} 
+              />
+            )}
           </Box>
         )}
       </DialogContent>
@@ -0,0 +1,158 @@
+import React, { useEffect, useState } from 'react';
+import {
+  Box,
+  TableContainer,
+  Table,
+  TableBody,
+  TableCell,
+  TableHead,
+  TableRow,
+  Paper,
+  Chip,
+  Typography,
+  CircularProgress
+} from '@mui/material';
+
+// Icons
+import AutorenewRoundedIcon from '@mui/icons-material/AutorenewRounded';
+import EventRoundedIcon from '@mui/icons-material/EventRounded';
+
+// API
+import { getRecurringCharges } from '../../../utils/api';
+import { formatDate } from '../../../utils/formatters';
+
+const FREQUENCY_COLORS = {
+  weekly: '#69E7FF',
+  monthly: '#6993FF',
+  annual: '#B5A8FF',
+};
+
+// Recurring charges are detected on the server from the full history, so
+// this tab asks for them rather than deriving them from the loaded transactions
+const RecurringTab = ({ accountId, formatCurrency }) => {
+  const [charges, setCharges] = useState([]);
+  const [loading, setLoading] = useState(true);
+  const [error, setError] = useState(null);
+
+  useEffect(() => {
+    let isMounted = true;
+    setLoading(true);
+    getRecurringCharges({ account_id: accountId })
+      .then((data) => {
+        if (isMounted) {
+          setCharges(data || []);
+          setError(null);
+        }
+      })
+      .catch((err) => {
+        console.error('Error fetching recurring charges:', err);
+        if (isMounted) setError('Failed to load recurring charges.');
+      })
+      .finally(() => {
+        if (isMounted) setLoading(false);
+      });
+    return () => {
+      isMounted = false;
+    };
+  }, [accountId]);
+
+  if (loading) {
+    return (
+      <Box sx={{ display: 'flex', justifyContent: 'center', py: 6 }}>
+        <CircularProgress sx={{ color: 'primary.main' }} />
+      </Box>
+    );
+  }
+
+  if (error || charges.length === 0) {
+    return (
+      <Box sx={{ p: 4, textAlign: 'center' }}>
+        <Typography color={error ? 'error' : 'text.secondary'}>
+          {error || 'No recurring charges detected for this account yet.'}
+        </Typography>
+      </Box>
+    );
+  }
+
+  const monthlyTotal = charges
+    .filter((charge) => charge.status === 'active')
+    .reduce((sum, charge) => {
+      const perMonth = { weekly: 52 / 12, monthly: 1, annual: 1 / 12 }[charge.frequency];
+      return sum + Number(charge.amount) * perMonth;
+    }, 0);
+
+  return (
+    <Box>
+      <Typography variant="body2" color="text.secondary" sx={{ mb: 2 }}>
+        About {formatCurrency(monthlyTotal)} a month in active recurring charges
+      </Typography>
+      <TableContainer
+        component={Paper}
+        sx={{
+          maxHeight: '60vh',
+          borderRadius: 3,
+          border: '1px solid rgba(0, 0, 0, 0.08)',
+          boxShadow: 'none',
+          overflowY: 'auto'
+        }}
+      >
+        <Table stickyHeader aria-label="recurring charges table">
+          <TableHead>
+            <TableRow>
+              <TableCell sx={{ backgroundColor: 'white', py: 2, fontWeight: 600 }}>
+                Merchant
+              </TableCell>
+              <TableCell sx={{ backgroundColor: 'white', py: 2 }}>
+                <Box sx={{ display: 'flex', alignItems: 'center', fontWeight: 600 }}>
+                  <AutorenewRoundedIcon sx={{ mr: 1, fontSize: 20 }} /> Frequency
+                </Box>
+              </TableCell>
+              <TableCell sx={{ backgroundColor: 'white', py: 2 }}>
+                <Box sx={{ display: 'flex', alignItems: 'center', fontWeight: 600 }}>
+                  <EventRoundedIcon sx={{ mr: 1, fontSize: 20 }} /> Next charge
+                </Box>
+              </TableCell>
+              <TableCell align="right" sx={{ backgroundColor: 'white', py: 2, fontWeight: 600 }}>
+                Amount
+              </TableCell>
+            </TableRow>
+          </TableHead>
+          <TableBody>
+            {charges.map((charge) => (
+              <TableRow key={charge.id} hover sx={{ opacity: charge.status === 'lapsed' ? 0.5 : 1 }}>
+                <TableCell>
+                  <Typography variant="body2" fontWeight={500}>
+                    {charge.name}
+                  </Typography>
+                  <Typography variant="caption" color="text.secondary">
+                    {charge.occurrences} charges since {formatDate(charge.first_date)}
+                  </Typography>
+                </TableCell>
+                <TableCell>
+                  <Chip
+                    label={charge.frequency.charAt(0).toUpperCase() + charge.frequency.slice(1)}
+                    size="small"
+                    sx={{
+                      backgroundColor: `${FREQUENCY_COLORS[charge.frequency]}20`,
+                      color: FREQUENCY_COLORS[charge.frequency],
+                      fontWeight: 500,
+                      borderRadius: 1.5
+                    }}
+                  />
+                </TableCell>
+                <TableCell>
+                  {charge.status === 'lapsed' ? 'Lapsed' : formatDate(charge.next_date)}
+                </TableCell>
+                <TableCell align="right" sx={{ fontFamily: '"Roboto Mono", monospace', fontWeight: 500 }}>
+                  {formatCurrency(Number(charge.amount))}
+                </TableCell>
+              </TableRow>
+            ))}
+          </TableBody>
+        </Table>
+      </TableContainer>
+    </Box>
+  );
+};
+
+export default RecurringTab;
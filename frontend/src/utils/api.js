@@ -3,8 +3,38 @@ import axios from 'axios';
 // Configure axios base URL
 axios.defaults.baseURL = 'http://localhost:8000';
 
+// Last body and ETag of recent GETs, so unchanged reads are revalidated with
+// If-None-Match and answered by an empty 304 instead of the full payload
+const validatedResponses = new Map();
+const MAX_VALIDATED_RESPONSES = 20;
+
+const getWithValidators = async (url, headers = {}) => {
+  const cached = validatedResponses.get(url);
+  const res = await axios.get(url, {
+    headers: cached ? { ...headers, 'If-None-Match': cached.etag } : headers,
+    validateStatus: (status) => (status >= 200 && status < 300) || status === 304,
+  });
+  
+  if (res.status === 304 && cached) {
+    return cached.data;
+  }
+  
+  const etag = res.headers.etag;
+  validatedResponses.delete(url);
+  if (etag) {
+    validatedResponses.set(url, { etag, data: res.data });
+    // Maps iterate in insertion order, so the first key is the oldest
+    if (validatedResponses.size > MAX_VALIDATED_RESPONSES) {
+      validatedResponses.delete(validatedResponses.keys().next().value);
+    }
+  }
+  return res.data;
+};
+
 // Helper function to set auth token in headers
 export const setAuthToken = (token) => {
+  // Cached bodies belong to the previous user
+  validatedResponses.clear();
   if (token) {
     axios.defaults.headers.common['Authorization'] = `Bearer ${token}`;
     localStorage.setItem('token', token);
@@ -121,11 +151,19 @@ export const exchangePublicToken = async (publicToken) => {
   }
 };
 
+export const getJobStatus = async (jobId) => {
+  try {
+    const res = await axios.get(`/api/jobs/${jobId}/`);
+    return res.data;
+  } catch (err) {
+    throw err.response?.data || { error: 'Failed to fetch job status' };
+  }
+};
+
 // Account and transaction API calls
 export const getAccounts = async () => {
   try {
-    const res = await axios.get('/api/accounts/');
-    return res.data;
+    return await getWithValidators('/api/accounts/');
   } catch (err) {
     throw err.response?.data || { error: 'Failed to fetch accounts' };
   }
@@ -149,6 +187,25 @@ export const unlinkAllAccounts = async () => {
   }
 };
 
+// Transactions are fetched as one array per field, with account, institution
+// and category names sent once in dictionaries, and expanded back into rows
+const COLUMNAR_JSON = 'application/vnd.finance.columnar+json';
+
+const fromColumnar = ({ count, fields, dictionaries }) => {
+  const names = Object.keys(fields);
+  const rows = new Array(count);
+  for (let i = 0; i < count; i++) {
+    const row = {};
+    names.forEach((name) => {
+      const value = fields[name][i];
+      const dictionary = dictionaries[name];
+      row[name] = dictionary && value !== null ? dictionary[value] : value;
+    });
+    rows[i] = row;
+  }
+  return rows;
+};
+
 export const getTransactions = async (filters = {}) => {
   try {
     // Build query string from filters
@@ -160,13 +217,83 @@ export const getTransactions = async (filters = {}) => {
     const queryString = queryParams.toString();
     const url = `/api/transactions/${queryString ? `?${queryString}` : ''}`;
     
-    const res = await axios.get(url);
-    return res.data;
+    const data = await getWithValidators(url, { Accept: COLUMNAR_JSON });
+    return data?.fields ? fromColumnar(data) : data;
   } catch (err) {
     throw err.response?.data || { error: 'Failed to fetch transactions' };
   }
 };
 
+export const exportTransactions = async (filters = {}) => {
+  try {
+    // Build query string from filters (including export_format and gzip)
+    const queryParams = new URLSearchParams();
+    Object.entries(filters).forEach(([key, value]) => {
+      if (value) queryParams.append(key, value);
+    });
+    
+    const queryString = queryParams.toString();
+    const url = `/api/transactions/export/${queryString ? `?${queryString}` : ''}`;
+    
+    const res = await axios.get(url, { responseType: 'blob' });
+    return res.data;
+  } catch (err) {
+    throw err.response?.data || { error: 'Failed to export transactions' };
+  }
+};
+
+export const getAnalyticsSummary = async (filters = {}) => {
+  try {
+    // Build query string from filters
+    const queryParams = new URLSearchParams();
+    Object.entries(filters).forEach(([key, value]) => {
+      if (value) queryParams.append(key, value);
+    });
+    
+    const queryString = queryParams.toString();
+    const url = `/api/analytics/summary/${queryString ? `?${queryString}` : ''}`;
+    
+    return await getWithValidators(url);
+  } catch (err) {
+    throw err.response?.data || { error: 'Failed to fetch analytics summary' };
+  }
+};
+
+// Recurring charges detected on the server after each sync
+export const getRecurringCharges = async (filters = {}) => {
+  try {
+    const queryParams = new URLSearchParams();
+    Object.entries(filters).forEach(([key, value]) => {
+      if (value) queryParams.append(key, value);
+    });
+    
+    const queryString = queryParams.toString();
+    const url = `/api/recurring/${queryString ? `?${queryString}` : ''}`;
+    
+    return await getWithValidators(url);
+  } catch (err) {
+    throw err.response?.data || { error: 'Failed to fetch recurring charges' };
+  }
+};
+
+// Balances sampled per daily/weekly/monthly bucket; the server coarsens the
+// interval so a series never has more than max_points points
+export const getBalanceHistory = async (filters = {}) => {
+  try {
+    const queryParams = new URLSearchParams();
+    Object.entries(filters).forEach(([key, value]) => {
+      if (value) queryParams.append(key, value);
+    });
+    
+    const queryString = queryParams.toString();
+    const url = `/api/accounts/balance-history/${queryString ? `?${queryString}` : ''}`;
+    
+    return await getWithValidators(url);
+  } catch (err) {
+    throw err.response?.data || { error: 'Failed to fetch balance history' };
+  }
+};
+
 export const getMockTransactions = async (accountId = null) => {
   try {
     // Build query string